@@ -0,0 +1,3 @@
+"""
+Teljesítménymérések - Elemző és letöltő benchmarkok
+"""
@@ -0,0 +1,268 @@
+"""
+Elemző benchmark - Lépésenkénti futásidők a letöltött zászlókészleten
+
+Futtatás:
+    python -m benchmarks.bench_analyzer --repeat 3
+    python main.py --bench-analyzer --bench-engines kmeans palette
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from src.analyzer import ANALYZER_VERSION, FlagAnalyzer
+
+
+# Az analyze_flag lépései, futási sorrendben. A környezet közös pufferei
+# (paletta, címketérkép, szürkeárnyalat) az első használó lépés idejébe számítanak.
+STAGES = (
+    'load',
+    'extract_dominant_colors',
+    'detect_stripes',
+    'detect_geometric_shapes',
+    'analyze_layout',
+    'visual_embedding',
+    'detect_symbolic_elements',
+    'fix_crescent_detection',
+)
+
+PERCENTILES = (50, 90, 95, 99)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """A folyamat eddigi legnagyobb rezidens memóriája MB-ban"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxon KB, macOS-en bájt
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """Időtartamok összesítése (ms, a total másodpercben)"""
+    values = np.array(durations) * 1000
+    summary = {
+        'count': len(values),
+        'total_s': round(float(values.sum()) / 1000, 4),
+        'mean_ms': round(float(values.mean()), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+    for percentile in PERCENTILES:
+        summary[f'p{percentile}_ms'] = round(float(np.percentile(values, percentile)), 3)
+    return summary
+
+
+def time_flag(analyzer: FlagAnalyzer, image_path: str) -> Dict[str, Any]:
+    """Egy zászló elemzése lépésenként mérve (az elemző _timings blokkjából)"""
+    features = analyzer.analyze_flag(image_path)
+    timings = {stage: elapsed / 1000 for stage, elapsed in features.pop('_timings', {}).items()}
+    return {'timings': timings, 'colors': features.get('unique_colors', [])}
+
+
+def bench_engine(data_dir: str, engine: str, flag_files: List[Path],
+                 warmup: int, repeat: int) -> Dict[str, Any]:
+    """Egy színmotor mérése: bemelegítés, majd repeat teljes menet"""
+    analyzer = FlagAnalyzer(data_dir, color_engine=engine, record_timings=True)
+
+    # Bemelegítés: színtábla, importok, OpenCV inicializálás
+    for flag_file in flag_files[:warmup]:
+        time_flag(analyzer, str(flag_file))
+
+    stage_durations = {stage: [] for stage in STAGES}
+    flag_totals = []
+    colors = {}
+    slowest = {}
+
+    wall_start = time.perf_counter()
+    for repetition in range(repeat):
+        for flag_file in flag_files:
+            measured = time_flag(analyzer, str(flag_file))
+            for stage, elapsed in measured['timings'].items():
+                stage_durations[stage].append(elapsed)
+
+            total = sum(measured['timings'].values())
+            flag_totals.append(total)
+
+            country_code = analyzer.extract_country_code_from_path(str(flag_file))
+            slowest[country_code] = max(slowest.get(country_code, 0.0), total)
+            if repetition == 0:
+                colors[country_code] = measured['colors']
+    wall_time = time.perf_counter() - wall_start
+
+    return {
+        'engine': engine,
+        'wall_time_s': round(wall_time, 3),
+        'flags_per_second': round(len(flag_totals) / wall_time, 2) if wall_time else None,
+        'per_flag': summarize(flag_totals),
+        'stages': {stage: summarize(durations) for stage, durations in stage_durations.items()},
+        'slowest_flags': {
+            code: round(elapsed * 1000, 3)
+            for code, elapsed in sorted(slowest.items(), key=lambda x: x[1], reverse=True)[:10]
+        },
+        'colors': colors,
+    }
+
+
+def engine_agreement(first: Dict[str, List[str]], second: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Két színmotor egyezése: azonos színhalmazok aránya és átlagos Jaccard-index"""
+    common = sorted(set(first) & set(second))
+    if not common:
+        return {'flags': 0}
+
+    exact = 0
+    jaccard = []
+    differing = []
+    for country_code in common:
+        a, b = set(first[country_code]), set(second[country_code])
+        exact += a == b
+        jaccard.append(len(a & b) / len(a | b) if a | b else 1.0)
+        if a != b:
+            differing.append(country_code)
+
+    return {
+        'flags': len(common),
+        'exact_color_sets': round(exact / len(common), 4),
+        'mean_jaccard': round(float(np.mean(jaccard)), 4),
+        'differing_flags': differing,
+    }
+
+
+def run_benchmark(data_dir: str = "data", engines: Optional[List[str]] = None,
+                  warmup: int = 10, repeat: int = 3, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Benchmark futtatása a data_dir/flags zászlóin, motoronként"""
+    engines = engines or ['kmeans']
+    flag_files = sorted((Path(data_dir) / "flags").glob("*.png"))
+    if limit:
+        flag_files = flag_files[:limit]
+    if not flag_files:
+        raise FileNotFoundError(f"Nincsenek zászlók: {Path(data_dir) / 'flags'}")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'analyzer_version': ANALYZER_VERSION,
+            'flags': len(flag_files),
+            'warmup': warmup,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'cpu_count': cv2.getNumberOfCPUs(),
+        },
+        'engines': {},
+    }
+
+    for engine in engines:
+        print(f"⏱️ Mérés: {engine} motor, {len(flag_files)} zászló x {repeat} ismétlés...")
+        results['engines'][engine] = bench_engine(data_dir, engine, flag_files, warmup, repeat)
+
+    if len(engines) >= 2:
+        first, second = engines[:2]
+        results['agreement'] = engine_agreement(results['engines'][first]['colors'],
+                                                results['engines'][second]['colors'])
+
+    # A színlisták csak az egyezésszámításhoz kellettek
+    for engine_result in results['engines'].values():
+        engine_result.pop('colors')
+
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def save_results(results: Dict[str, Any], output: Optional[str] = None) -> Path:
+    """Eredmények mentése JSON-ba (alapból benchmarks/results/analyzer-<időbélyeg>.json)"""
+    if output:
+        path = Path(output)
+    else:
+        stamp = results['meta']['timestamp'].replace(':', '').replace('-', '')
+        path = RESULTS_DIR / f"analyzer-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return path
+
+
+def print_report(results: Dict[str, Any]):
+    """Olvasható összefoglaló"""
+    meta = results['meta']
+    print(f"\n📊 Elemző benchmark (v{meta['analyzer_version']}, {meta['flags']} zászló, "
+          f"{meta['repeat']} ismétlés)")
+
+    for engine, engine_result in results['engines'].items():
+        per_flag = engine_result['per_flag']
+        print(f"\n🎨 {engine}: {engine_result['wall_time_s']:.2f} s, "
+              f"{engine_result['flags_per_second']} zászló/s, "
+              f"zászlónként p50 {per_flag['p50_ms']:.1f} ms | p95 {per_flag['p95_ms']:.1f} ms")
+        print(f"  {'lépés':<26}{'össz (s)':>10}{'átlag':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for stage, summary in engine_result['stages'].items():
+            print(f"  {stage:<26}{summary['total_s']:>10.3f}{summary['mean_ms']:>10.2f}"
+                  f"{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}")
+
+    if 'agreement' in results:
+        agreement = results['agreement']
+        print(f"\n🤝 Motorok egyezése: {agreement['exact_color_sets'] * 100:.1f}% azonos színhalmaz, "
+              f"átlagos Jaccard {agreement['mean_jaccard']:.3f}")
+
+    if results.get('peak_rss_mb') is not None:
+        print(f"\n💾 Csúcs memória (RSS): {results['peak_rss_mb']} MB")
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]):
+    """Két mentett futás összevetése lépésenként (p50 és átlag változása)"""
+    print(f"\n🔁 Összevetés: {baseline['meta']['timestamp']} -> {current['meta']['timestamp']}")
+    for engine, engine_result in current['engines'].items():
+        if engine not in baseline.get('engines', {}):
+            continue
+        print(f"\n🎨 {engine}")
+        base_stages = baseline['engines'][engine]['stages']
+        rows = list(engine_result['stages'].items()) + [('per_flag', engine_result['per_flag'])]
+        base_stages = dict(base_stages, per_flag=baseline['engines'][engine]['per_flag'])
+        for stage, summary in rows:
+            if stage not in base_stages:
+                continue
+            before, after = base_stages[stage]['p50_ms'], summary['p50_ms']
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"  {stage:<26} p50 {before:>9.2f} -> {after:>9.2f} ms ({change:+.1f}%)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Zászlóelemző benchmark')
+    parser.add_argument('--data-dir', default='data', help='Adatok könyvtára')
+    parser.add_argument('--engines', nargs='+', choices=FlagAnalyzer.COLOR_ENGINES, default=['kmeans'],
+                        help='Mért színmotorok (kettő esetén egyezést is számol)')
+    parser.add_argument('--warmup', type=int, default=10, help='Bemelegítő zászlók száma')
+    parser.add_argument('--repeat', type=int, default=3, help='Teljes menetek száma')
+    parser.add_argument('--limit', type=int, help='Csak az első N zászló')
+    parser.add_argument('--output', help='Eredményfájl (alapból benchmarks/results/)')
+    parser.add_argument('--compare', help='Korábbi eredményfájl az összevetéshez')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.data_dir, args.engines, args.warmup, args.repeat, args.limit)
+    print_report(results)
+    path = save_results(results, args.output)
+    print(f"\n💾 Eredmények mentve: {path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Letöltő benchmark - Áteresztőképesség és késleltetés hálózat nélkül, helyi zászlóforrásból
+
+Futtatás:
+    python -m benchmarks.bench_downloader --concurrency 5 20 50
+    python -m benchmarks.bench_downloader --latency-ms 40 --jitter-ms 20 --error-rate 0.02
+    python -m benchmarks.bench_downloader --capacity 16 --concurrency 64 --sizes w40 w160 w640
+    python main.py --bench-downloader --bench-concurrency 10 40
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_analyzer import RESULTS_DIR, peak_rss_mb, summarize
+from src.downloader import FlagDownloader, RetryPolicy
+from src.sources import FlagSource, HttpFlagSource, LocalFlagServer, MirrorFlagSource
+
+
+class TimedSource(FlagSource):
+    """Forrás-burkoló: minden zászlókérés idejét, státuszát és méretét rögzíti"""
+
+    def __init__(self, source: FlagSource):
+        self.source = source
+        self.name = source.name
+        self.transient_errors = source.transient_errors
+        self.durations: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.bytes = 0
+
+    def describe(self) -> str:
+        return self.source.describe()
+
+    async def __aenter__(self) -> 'TimedSource':
+        await self.source.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.source.__aexit__(*exc_info)
+
+    def fetch_codes(self, headers: Optional[Dict[str, str]] = None):
+        return self.source.fetch_codes(headers)
+
+    def country_codes(self) -> Dict[str, str]:
+        return self.source.country_codes()
+
+    async def fetch_flag(self, country_code: str, size: str = "w320", headers: Optional[Dict[str, str]] = None):
+        start = time.perf_counter()
+        status, content = 0, b''  # kivétel (pl. időtúllépés) esetén 0 státusszal számít
+        try:
+            status, content, headers = await self.source.fetch_flag(country_code, size, headers)
+            return status, content, headers
+        finally:
+            self.durations.append(time.perf_counter() - start)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes += len(content)
+
+
+def bench_run(source: FlagSource, concurrency: int, size: str, extra_sizes: List[str],
+              adaptive: bool = True) -> Dict[str, Any]:
+    """Egy teljes letöltés üres célkönyvtárba, a megadott (legnagyobb) párhuzamossággal"""
+    timed = TimedSource(source)
+    with tempfile.TemporaryDirectory(prefix='bench-downloader-') as target:
+        downloader = FlagDownloader(target, source=timed, retry_policy=RetryPolicy(seed=0))
+        wall_start = time.perf_counter()
+        results = asyncio.run(downloader.download_all_flags(size=size, max_concurrent=concurrency,
+                                                            extra_sizes=extra_sizes, adaptive=adaptive,
+                                                            progress=False))
+        wall_time = time.perf_counter() - wall_start
+
+    successful = sum(1 for success in results.values() if success)
+    return {
+        'concurrency': concurrency,
+        'wall_time_s': round(wall_time, 3),
+        'flags': len(results),
+        'successful': successful,
+        'flags_per_second': round(successful / wall_time, 2) if wall_time else None,
+        'mb_per_second': round(timed.bytes / (1024 * 1024) / wall_time, 3) if wall_time else None,
+        'statuses': {str(status): count for status, count in sorted(timed.statuses.items())},
+        'retries': downloader.stats.retries,
+        'concurrency_peak': downloader.concurrency.peak,
+        'concurrency_final': downloader.concurrency.limit,
+        'concurrency_decreases': downloader.concurrency.decreases,
+        'request': summarize(timed.durations) if timed.durations else {},
+    }
+
+
+def run_benchmark(data_dir: str = "data", backend: str = "local", concurrency: Optional[List[int]] = None,
+                  repeat: int = 1, size: str = "w320", latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                  error_rate: float = 0.0, seed: int = 0, capacity: Optional[int] = None,
+                  extra_sizes: Optional[List[str]] = None, adaptive: bool = True) -> Dict[str, Any]:
+    """Letöltési benchmark a data_dir/flags tartalmával, párhuzamossági szintenként
+
+    backend: 'local' (helyi HTTP szerver valódi HTTP úttal) vagy 'mirror'
+    (közvetlen fájlolvasás, a hálózati réteg nélküli felső korlát).
+    A párhuzamossági szint az adaptív szabályozás felső korlátja
+    (adaptive=False esetén rögzített érték); a capacity feletti egyidejű
+    kérésekre a helyi szerver 429-cel válaszol.
+    """
+    concurrency = concurrency or [5, 20, 50]
+    extra_sizes = extra_sizes or []
+    flags_dir = Path(data_dir) / "flags"
+    if not any(flags_dir.glob("*.png")):
+        raise FileNotFoundError(f"Nincsenek zászlók: {flags_dir}")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'backend': backend,
+            'size': size,
+            'repeat': repeat,
+            'latency_ms': latency_ms,
+            'jitter_ms': jitter_ms,
+            'error_rate': error_rate,
+            'capacity': capacity,
+            'extra_sizes': extra_sizes,
+            'adaptive': adaptive,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'runs': [],
+    }
+
+    server = None
+    if backend == 'local':
+        server = LocalFlagServer(flags_dir, latency=latency_ms / 1000, jitter=jitter_ms / 1000,
+                                 error_rate=error_rate, capacity=capacity, seed=seed).start()
+    try:
+        for level in concurrency:
+            for repetition in range(repeat):
+                source = (HttpFlagSource(server.url, max_connections=level) if server is not None
+                          else MirrorFlagSource(flags_dir))
+                print(f"⏱️ Mérés: {backend}, {level} párhuzamos letöltés ({repetition + 1}/{repeat})...")
+                results['runs'].append(bench_run(source, level, size, extra_sizes, adaptive))
+    finally:
+        if server is not None:
+            server.stop()
+
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def save_results(results: Dict[str, Any], output: Optional[str] = None) -> Path:
+    """Eredmények mentése JSON-ba (alapból benchmarks/results/downloader-<időbélyeg>.json)"""
+    if output:
+        path = Path(output)
+    else:
+        stamp = results['meta']['timestamp'].replace(':', '').replace('-', '')
+        path = RESULTS_DIR / f"downloader-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return path
+
+
+def print_report(results: Dict[str, Any]):
+    """Olvasható összefoglaló"""
+    meta = results['meta']
+    sizes = ', '.join([meta['size']] + meta.get('extra_sizes', []))
+    print(f"\n📊 Letöltő benchmark ({meta['backend']}, {sizes}, késleltetés {meta['latency_ms']} ms "
+          f"± {meta['jitter_ms']} ms, hibaarány {meta['error_rate']}, kapacitás {meta.get('capacity') or '-'}, "
+          f"{'adaptív' if meta.get('adaptive', True) else 'rögzített'} párhuzamosság)")
+    print(f"  {'párh.':>6}{'idő (s)':>10}{'zászló/s':>10}{'MB/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+          f"{'újra':>7}{'csúcs/vég':>11}  státuszok")
+    for run in results['runs']:
+        request = run['request']
+        statuses = ', '.join(f"{status}: {count}" for status, count in run['statuses'].items())
+        limits = f"{run.get('concurrency_peak', '-')}/{run.get('concurrency_final', '-')}"
+        print(f"  {run['concurrency']:>6}{run['wall_time_s']:>10.2f}{run['flags_per_second']:>10.1f}"
+              f"{run['mb_per_second']:>8.2f}{request.get('p50_ms', 0):>9.1f}{request.get('p95_ms', 0):>9.1f}"
+              f"{request.get('p99_ms', 0):>9.1f}{request.get('max_ms', 0):>9.1f}"
+              f"{run.get('retries', 0):>7}{limits:>11}  {statuses}")
+
+    if results.get('peak_rss_mb') is not None:
+        print(f"\n💾 Csúcs memória (RSS): {results['peak_rss_mb']} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Zászlóletöltő benchmark (hálózat nélkül)')
+    parser.add_argument('--data-dir', default='data', help='Adatok könyvtára (a data/flags a forrás)')
+    parser.add_argument('--backend', choices=['local', 'mirror'], default='local',
+                        help='Helyi HTTP szerver vagy közvetlen tükörolvasás')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[5, 20, 50],
+                        help='Mért párhuzamossági szintek')
+    parser.add_argument('--repeat', type=int, default=1, help='Ismétlések szintenként')
+    parser.add_argument('--size', default='w320', help='Kért zászlóméret')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Szimulált szerverkésleltetés (local)')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Véletlen többletkésleltetés (local)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='503 válaszok aránya (local)')
+    parser.add_argument('--capacity', type=int, help='Egyidejű kérések a helyi szerveren; felette 429 (local)')
+    parser.add_argument('--sizes', nargs='+', default=[], help='További letöltött méretek (pl. w40 w160 w640)')
+    parser.add_argument('--fixed', action='store_true', help='Rögzített párhuzamosság az adaptív helyett')
+    parser.add_argument('--seed', type=int, default=0, help='A szimuláció véletlenmagja')
+    parser.add_argument('--output', help='Eredményfájl (alapból benchmarks/results/)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.data_dir, args.backend, args.concurrency, args.repeat, args.size,
+                            args.latency_ms, args.jitter_ms, args.error_rate, args.seed, args.capacity,
+                            args.sizes, not args.fixed)
+    print_report(results)
+    path = save_results(results, args.output)
+    print(f"\n💾 Eredmények mentve: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,43 +4,72 @@ Világzászló Interaktív Alkalmazás - Főprogram
 
 import asyncio
 import sys
+import time
 from pathlib import Path
 import argparse
+from typing import List, Optional
 
 # Helyi modulok importálása
 from src.downloader import FlagDownloader
 from src.analyzer import FlagAnalyzer
+from src.cache import DEFAULT_CACHE_BYTES
+from src.instrumentation import SlowestFlagProfiler
+from src.pipeline import AnalysisPipeline
 from src.search import FlagSearchEngine
+from src.sources import FLAGCDN_SIZES, source_from_spec
 
 
 class WorldFlagsApp:
     """Főalkalmazás osztály"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", color_engine: str = "kmeans",
+                 cache_bytes: int = DEFAULT_CACHE_BYTES, flag_source: Optional[str] = None):
         self.data_dir = Path(data_dir)
-        self.downloader = FlagDownloader(data_dir)
-        self.analyzer = FlagAnalyzer(data_dir)
+        self.downloader = FlagDownloader(data_dir, source=source_from_spec(flag_source))
+        self.analyzer = FlagAnalyzer(data_dir, color_engine=color_engine, cache_bytes=cache_bytes)
         self.search_engine = FlagSearchEngine(data_dir)
     
-    async def setup_data(self):
-        """Adatok letöltése és elemzése"""
+    async def setup_data(self, workers: int = 1, force: bool = False,
+                         stages: Optional[List[str]] = None, download_concurrency: int = 16,
+                         download_sizes: Optional[List[str]] = None, derive_sizes: Optional[List[str]] = None,
+                         refresh: bool = False,
+                         pipeline: bool = False):
+        """Adatok letöltése és elemzése
+        
+        pipeline=True esetén a letöltött zászlók elemzése már letöltés közben,
+        a memóriában lévő bájtokból indul (AnalysisPipeline); a második lépés
+        ekkor csak átveszi az eredményeket és elemzi a maradékot.
+        """
         print("🏳️ Világzászló Alkalmazás Inicializálása")
         print("=" * 50)
         
-        # 1. Zászlók letöltése
-        print("\n📥 1. Zászlók letöltése...")
+        # 1. Zászlók letöltése (futószalagos módban közben elemzés is)
+        print("\n📥 1. Zászlók letöltése" + (" és elemzése..." if pipeline else "..."))
+        streaming = AnalysisPipeline(self.analyzer, workers=workers, force=force) if pipeline else None
         try:
-            results = await self.downloader.download_all_flags(size="w320", max_concurrent=5)
-            successful = sum(1 for success in results.values() if success)
-            print(f"✅ {successful} zászló sikeresen letöltve!")
+            if streaming is not None:
+                streaming.start()
+            results = await self.downloader.download_all_flags(size="w320", max_concurrent=download_concurrency,
+                                                               extra_sizes=download_sizes or (),
+                                                               derive_sizes=derive_sizes or (), refresh=refresh,
+                                                               on_flag=streaming.submit if streaming else None)
+            # A "{méret}/{kód}" kulcsok a további (letöltött vagy előállított) méretek képei
+            successful = sum(1 for key, success in results.items() if success and '/' not in key)
+            extra_images = sum(1 for key, success in results.items() if success and '/' in key)
+            print(f"✅ {successful} zászló sikeresen letöltve!"
+                  + (f" (további méretek: {extra_images} kép)" if extra_images else ""))
         except Exception as e:
             print(f"❌ Hiba a letöltés során: {e}")
             return False
+        finally:
+            if streaming is not None:
+                streaming.close()
         
         # 2. Zászlók elemzése
         print("\n🔍 2. Zászlók elemzése...")
         try:
-            features = self.analyzer.analyze_all_flags()
+            features = self.analyzer.analyze_all_flags(workers=workers, force=force, stages=stages,
+                                                        keep_checkpoint=pipeline)
             print(f"✅ {len(features)} zászló sikeresen elemezve!")
         except Exception as e:
             print(f"❌ Hiba az elemzés során: {e}")
@@ -139,6 +168,54 @@ class WorldFlagsApp:
         if total_count > 10:
             print(f"\n... és még {total_count - 10} találat.")
     
+    def display_similar(self, query: str, k: int = 5):
+        """A megadott zászlóhoz vizuálisan leghasonlóbb zászlók megjelenítése"""
+        search_engine = self.search_engine
+        if search_engine.similarity_index is None:
+            print("❌ Nincsenek vizuális beágyazások! Futtasd: python main.py --setup")
+            return
+        
+        country_code = search_engine.resolve_country(query)
+        if country_code is None or country_code not in search_engine.similarity_index:
+            print(f"❌ Ismeretlen vagy nem elemzett ország: '{query}'")
+            return
+        
+        country_name = search_engine.countries.get(country_code, country_code.upper())
+        print(f"\n🔎 {country_name} ({country_code.upper()}) zászlójához leghasonlóbb zászlók:")
+        for i, (code, score) in enumerate(search_engine.find_similar(country_code, k), 1):
+            name = search_engine.countries.get(code, code.upper())
+            print(f"  {i:2d}. {name} ({code.upper()}) - hasonlóság: {score:.3f}")
+    
+    def display_identification(self, image_path: str, k: int = 5, engine: str = "signature"):
+        """Feltöltött/megadott kép azonosítása a zászlók képaláírás vagy kulcspont-leíró indexén"""
+        search_engine = self.search_engine
+        if engine == "descriptors":
+            start = time.perf_counter()
+            candidates = search_engine.recognize_photo(Path(image_path).read_bytes(), k)
+            elapsed = (time.perf_counter() - start) * 1000
+            
+            if candidates:
+                print(f"\n📷 {image_path} - felismert zászlók ({elapsed:.1f} ms):")
+                for i, (code, inliers) in enumerate(candidates, 1):
+                    name = search_engine.countries.get(code, code.upper())
+                    print(f"  {i:2d}. {name} ({code.upper()}) - igazolt párok: {inliers}")
+                return
+            print(f"⚠️ Nincs geometriailag igazolt találat ({elapsed:.1f} ms), képaláírás alapú keresés:")
+        
+        if search_engine.identification_index is None:
+            print("❌ Nincsenek vizuális beágyazások! Futtasd: python main.py --setup")
+            return
+        
+        start = time.perf_counter()
+        signature = self.analyzer.query_signature(Path(image_path).read_bytes())
+        candidates = search_engine.identify(signature, k)
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        print(f"\n📷 {image_path} - legvalószínűbb zászlók ({elapsed:.1f} ms):")
+        for i, (code, distance) in enumerate(candidates, 1):
+            name = search_engine.countries.get(code, code.upper())
+            print(f"  {i:2d}. {name} ({code.upper()}) - távolság: {distance:.4f}")
+    
     def show_help(self):
         """Súgó megjelenítése"""
         print("\n🤖 Zászlókereső Súgó")
@@ -169,9 +246,9 @@ class WorldFlagsApp:
     
     def show_stats(self):
         """Statisztikák megjelenítése"""
-        features = self.analyzer.load_features()
+        stats = self.analyzer.feature_statistics()
         
-        if not features:
+        if not stats['total']:
             print("❌ Nincs elemzett adat!")
             return
         
@@ -179,16 +256,11 @@ class WorldFlagsApp:
         print("=" * 20)
         
         # Alapstatisztikák
-        total_flags = len(features)
+        total_flags = stats['total']
         print(f"📈 Összesen elemzett zászló: {total_flags}")
         
-        # Színstatisztikák
-        all_colors = []
-        for flag_data in features.values():
-            all_colors.extend(flag_data.get('unique_colors', []))
-        
-        from collections import Counter
-        color_counts = Counter(all_colors)
+        # Színstatisztikák (az oszlopos tárból, a teljes JSON betöltése nélkül)
+        color_counts = stats['colors']
         
         print("\n🌈 Leggyakoribb színek:")
         for color, count in color_counts.most_common(10):
@@ -196,14 +268,9 @@ class WorldFlagsApp:
             print(f"  • {color}: {count} zászló ({percentage:.1f}%)")
         
         # Mintázat statisztikák
-        stripe_count = sum(1 for f in features.values() 
-                          if f.get('stripes', {}).get('has_horizontal_stripes') or
-                             f.get('stripes', {}).get('has_vertical_stripes'))
-        band_count = sum(1 for f in features.values() 
-                         if f.get('stripes', {}).get('has_horizontal_bands') or
-                            f.get('stripes', {}).get('has_vertical_bands'))
-        star_count = sum(1 for f in features.values() 
-                        if f.get('shapes', {}).get('stars', 0) > 0)
+        stripe_count = stats['stripes']
+        band_count = stats['bands']
+        star_count = stats['stars']
         
         print("\n🔷 Mintázatok:")
         print(f"  • Csíkos zászlók: {stripe_count} ({stripe_count/total_flags*100:.1f}%)")
@@ -216,38 +283,131 @@ def main():
     parser = argparse.ArgumentParser(description='Világzászló Interaktív Alkalmazás')
     parser.add_argument('--setup', action='store_true', help='Adatok letöltése és elemzése')
     parser.add_argument('--search', type=str, help='Egyetlen keresés végrehajtása')
+    parser.add_argument('--similar', type=str, help='Vizuálisan hasonló zászlók egy országkódhoz vagy országnévhez')
+    parser.add_argument('--similar-k', type=int, default=5, help='Hasonló zászlók száma (--similar)')
+    parser.add_argument('--identify', type=str, help='Zászló felismerése egy képfájlból (fénykép, képernyőkép)')
+    parser.add_argument('--identify-k', type=int, default=5, help='Jelöltek száma (--identify)')
+    parser.add_argument('--identify-engine', choices=['signature', 'descriptors'], default='signature',
+                        help='Felismerés képaláírással (gyors, egyenes képekre) vagy kulcspont-leírókkal '
+                             '(fényképekre) (--identify)')
     parser.add_argument('--interactive', action='store_true', help='Interaktív keresési mód')
     parser.add_argument('--stats', action='store_true', help='Statisztikák megjelenítése')
     parser.add_argument('--streamlit', action='store_true', help='Streamlit webes felület indítása')
     parser.add_argument('--data-dir', type=str, default='data', help='Adatok könyvtára')
+    parser.add_argument('--flag-source', type=str,
+                        help='Zászlóforrás: flagcdn (alapértelmezett), http(s) URL, vagy helyi könyvtár/tarball (--setup)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Elemzés már letöltés közben, a letöltött bájtokból, a --workers folyamattal (--setup)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Meglévő zászlók újraellenőrzése feltételes kérésekkel (ETag/Last-Modified) és frissítése (--setup)')
+    parser.add_argument('--download-concurrency', type=int, default=16,
+                        help='Egyidejű letöltések felső korlátja; a tényleges szám ehhez igazodik (--setup)')
+    parser.add_argument('--download-sizes', nargs='+', choices=FLAGCDN_SIZES,
+                        help='További letöltött méretek a flags/{méret}/ könyvtárakba (--setup)')
+    parser.add_argument('--derive-sizes', nargs='+', choices=FLAGCDN_SIZES,
+                        help='Helyben, a letöltött képek kicsinyítésével előállított méretek (--setup)')
+    parser.add_argument('--workers', type=int, default=1, help='Párhuzamos elemző folyamatok száma (--setup)')
+    parser.add_argument('--color-engine', choices=FlagAnalyzer.COLOR_ENGINES, default='kmeans',
+                        help='Színkinyerő motor: kmeans vagy gyors paletta-kvantálás (--setup)')
+    parser.add_argument('--force', action='store_true', help='Minden zászló újraelemzése a manifesttől függetlenül (--setup)')
+    parser.add_argument('--stages', nargs='+', choices=list(FlagAnalyzer.FEATURE_GROUPS),
+                        help='Csak ezek a jellemzőcsoportok (és a tőlük függők) újraszámolása (--setup)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                        help='Elemzési gyorsítótár mérete MB-ban, 0: kikapcsolva (--setup)')
+    parser.add_argument('--timings', action='store_true',
+                        help='Lépésenkénti elemzési idők _timings blokkban a jellemzők között (--setup)')
+    parser.add_argument('--profile-slowest', type=int, default=0,
+                        help='cProfile a leglassabb N zászlóról, data/profiles/*.prof (--setup)')
+    parser.add_argument('--bench-analyzer', action='store_true', help='Elemző benchmark a letöltött zászlókon')
+    parser.add_argument('--bench-engines', nargs='+', choices=FlagAnalyzer.COLOR_ENGINES, default=['kmeans'],
+                        help='Mért színmotorok (--bench-analyzer)')
+    parser.add_argument('--bench-repeat', type=int, default=3, help='Mérési ismétlések száma (--bench-analyzer)')
+    parser.add_argument('--bench-downloader', action='store_true',
+                        help='Letöltő benchmark helyi HTTP szerverről (data/flags), hálózat nélkül')
+    parser.add_argument('--bench-concurrency', nargs='+', type=int, default=[5, 20, 50],
+                        help='Mért párhuzamossági szintek (--bench-downloader)')
+    parser.add_argument('--bench-compare', type=str, help='Korábbi benchmark eredményfájl összevetéshez (--bench-analyzer)')
     
     args = parser.parse_args()
     
-    app = WorldFlagsApp(args.data_dir)
+    app = WorldFlagsApp(args.data_dir, color_engine=args.color_engine,
+                        cache_bytes=args.cache_size * 1024 * 1024, flag_source=args.flag_source)
     
     # Ha nincs argumentum, alapértelmezett művelet
-    if not any([args.setup, args.search, args.interactive, args.stats, args.streamlit]):
+    if not any([args.setup, args.search, args.similar, args.identify, args.interactive, args.stats,
+                args.streamlit, args.bench_analyzer, args.bench_downloader]):
         print("🏳️ Világzászló Interaktív Alkalmazás")
         print("Használat: python main.py [opciók]")
         print("\nOpciók:")
         print("  --setup          Adatok letöltése és elemzése")
+        print("  --flag-source    Zászlóforrás: flagcdn | URL | helyi könyvtár/tarball (--setup)")
+        print("  --pipeline       Letöltés és elemzés átfedésben (--setup)")
+        print("  --refresh        Letöltések újraellenőrzése, csak a változott zászlók frissülnek (--setup)")
+        print("  --download-concurrency N  Egyidejű letöltések felső korlátja (--setup)")
+        print("  --download-sizes w40 w1280  További letöltött méretek (--setup)")
+        print("  --derive-sizes w40 w160  Helyben kicsinyített méretek (--setup)")
+        print("  --workers N      Párhuzamos elemzés N folyamattal (--setup)")
+        print("  --force          Teljes újraelemzés (--setup)")
+        print("  --color-engine   Színmotor: kmeans | palette (--setup)")
+        print("  --stages csoport Csak a megadott jellemzőcsoportok újraszámolása (--setup)")
+        print("  --cache-size MB  Elemzési gyorsítótár mérete, 0: kikapcsolva (--setup)")
+        print("  --timings        Lépésenkénti idők a jellemzőkben (--setup)")
+        print("  --profile-slowest N  cProfile a leglassabb N zászlóról (--setup)")
         print("  --interactive    Interaktív keresési mód")
         print("  --search 'query' Egyetlen keresés")
+        print("  --similar td     Vizuálisan hasonló zászlók (--similar-k N darab)")
+        print("  --identify kép.jpg  Zászló felismerése képből (--identify-k N jelölt)")
+        print("  --identify-engine descriptors  Fényképtűrő felismerés kulcspontokkal (--identify)")
         print("  --stats          Statisztikák")
         print("  --streamlit      Webes felület")
+        print("  --bench-analyzer Elemző benchmark (lépésenkénti idők, JSON eredmény)")
+        print("  --bench-downloader  Letöltő benchmark helyi szerverről (áteresztés, késleltetés)")
         print("  --help           Ez a súgó")
         print("\nPélda:")
         print("  python main.py --setup")
         print("  python main.py --interactive")
         print("  python main.py --search 'piros zászlók'")
+        print("  python main.py --similar Csád")
         return
     
     try:
         # Adatok inicializálása
         if args.setup:
-            asyncio.run(app.setup_data())
+            profiler = None
+            app.analyzer.record_timings = args.timings
+            if args.profile_slowest > 0:
+                profiler = SlowestFlagProfiler(args.profile_slowest, app.data_dir / "profiles")
+                app.analyzer.instrumentation = profiler
+            
+            asyncio.run(app.setup_data(workers=args.workers, force=args.force, stages=args.stages,
+                                       download_concurrency=args.download_concurrency,
+                                       download_sizes=args.download_sizes, derive_sizes=args.derive_sizes,
+                                       refresh=args.refresh,
+                                       pipeline=args.pipeline))
+            
+            if profiler is not None:
+                # Párhuzamos futásnál a profilok a munkafolyamatokban készülnek, csak fájlként érhetők el
+                print(profiler.report(top=15))
+                print(f"🔬 Profilok: {profiler.output_dir}/*.prof")
             return
         
+        # Elemző benchmark
+        if args.bench_analyzer:
+            from benchmarks.bench_analyzer import main as bench_main
+            
+            bench_args = ['--data-dir', args.data_dir, '--repeat', str(args.bench_repeat),
+                          '--engines', *args.bench_engines]
+            if args.bench_compare:
+                bench_args += ['--compare', args.bench_compare]
+            return bench_main(bench_args)
+        
+        # Letöltő benchmark
+        if args.bench_downloader:
+            from benchmarks.bench_downloader import main as bench_main
+            
+            return bench_main(['--data-dir', args.data_dir,
+                               '--concurrency', *map(str, args.bench_concurrency)])
+        
         # Streamlit felület
         if args.streamlit:
             print("🌐 Streamlit webes felület indítása...")
@@ -279,6 +439,16 @@ def main():
             app.display_results(results, args.search)
             return
         
+        # Hasonló zászlók
+        if args.similar:
+            app.display_similar(args.similar, args.similar_k)
+            return
+        
+        # Zászló felismerése képből
+        if args.identify:
+            app.display_identification(args.identify, args.identify_k, args.identify_engine)
+            return
+        
         # Interaktív mód
         if args.interactive:
             app.interactive_search()
@@ -23,7 +23,6 @@ def setup_deployment():
     
     # Download and process flags if not already done
     countries_file = data_dir / "countries.json"
-    features_file = data_dir / "flag_features.json"
     
     try:
         # Initialize downloader
@@ -47,11 +46,12 @@ def setup_deployment():
             except Exception as e:
                 print(f"⚠️  Warning: Could not download flag for {country}: {e}")
         
-        # Analyze flags if not already done
-        if not features_file.exists():
-            print("🔍 Analyzing flags...")
-            analyzer = FlagAnalyzer(data_dir)
-            analyzer.analyze_all_flags()
+        # Analyze flags: the committed manifest (content hashes, no local mtimes)
+        # makes this incremental, so only flags whose image, analyzer version or
+        # extractor versions changed are re-analyzed - none on a fresh checkout
+        print("🔍 Analyzing flags...")
+        analyzer = FlagAnalyzer(data_dir)
+        analyzer.analyze_all_flags()
         
         print("✅ Setup complete! Application ready for deployment.")
         
@@ -6,21 +6,192 @@ import cv2
 import numpy as np
 from PIL import Image
 import json
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
-import webcolors
+from typing import Dict, List, Mapping, Tuple, Any, Optional
 from collections import Counter
+from itertools import chain
 from sklearn.cluster import KMeans
-import math
+from threadpoolctl import threadpool_limits
+import cProfile
+from functools import cached_property
+
+try:
+    from .cache import DEFAULT_CACHE_BYTES, AnalysisCache, image_digest
+    from .colors import ColorNameLUT, bin_colors, exact_color_names
+    from .context import FlagContext
+    from .instrumentation import InstrumentationSink
+    from .knowledge import KnowledgeBase, load_knowledge_base
+    from .similarity import appearance_part, color_grid, flag_embedding, image_signature
+    from .store import (CHECKPOINT_JSONL, FeatureCheckpoint, FeatureColumns, FeatureReader,
+                        features_path, load_features, write_features)
+except ImportError:
+    from cache import DEFAULT_CACHE_BYTES, AnalysisCache, image_digest
+    from colors import ColorNameLUT, bin_colors, exact_color_names
+    from context import FlagContext
+    from instrumentation import InstrumentationSink
+    from knowledge import KnowledgeBase, load_knowledge_base
+    from similarity import appearance_part, color_grid, flag_embedding, image_signature
+    from store import (CHECKPOINT_JSONL, FeatureCheckpoint, FeatureColumns, FeatureReader,
+                       features_path, load_features, write_features)
+
+
+# Az elemző algoritmusok verziója - kimenetet érintő változáskor növelendő,
+# így a manifest alapján minden zászló újraelemzésre kerül
+ANALYZER_VERSION = "1.7"
+
+# A PNG fájlok első bájtjai (feltöltött kép formátumának felismeréséhez)
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Munkafolyamatonkénti állapot (a process pool inicializálója tölti ki)
+_worker_analyzer = None
+_worker_thread_limits = None
+
+
+def convert_numpy(obj):
+    """Numpy típusok konvertálása JSON-kompatibilis Python típusokra"""
+    if isinstance(obj, (np.integer, np.int64, np.int32)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float64, np.float32)):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, tuple):
+        return tuple(convert_numpy(item) for item in obj)
+    return obj
+
+
+def clean_for_json(data):
+    """Rekurzív konvertálás JSON mentéshez"""
+    if isinstance(data, dict):
+        return {key: clean_for_json(value) for key, value in data.items()}
+    elif isinstance(data, (list, tuple)):
+        return [clean_for_json(item) for item in data]
+    else:
+        return convert_numpy(data)
+
+
+def _init_worker(analyzer: 'FlagAnalyzer'):
+    """Munkafolyamat inicializálása - egy szálra korlátozott OpenCV és BLAS"""
+    global _worker_analyzer, _worker_thread_limits
+    
+    # Túlterhelés elkerülése: minden folyamat csak egy natív szálat használ.
+    # A könyvtárak ekkor már betöltődtek, így a *_NUM_THREADS környezeti
+    # változók hatástalanok; a korlát futásidőben állítódik be.
+    cv2.setNumThreads(1)
+    _worker_thread_limits = threadpool_limits(limits=1)
+    
+    _worker_analyzer = analyzer
+
+
+def _analyze_flag_task(image_path: str) -> Tuple[str, Dict[str, Any], float]:
+    """Egy zászló elemzése munkafolyamatban, időméréssel"""
+    start = time.perf_counter()
+    features = _worker_analyzer.analyze_flag(image_path)
+    return image_path, features, time.perf_counter() - start
+
+
+def _analyze_bytes_task(job: Tuple[str, bytes]) -> Tuple[str, Dict[str, Any], float]:
+    """Egy memóriában átadott (pl. épp letöltött) zászlókép elemzése munkafolyamatban"""
+    image_path, content = job
+    start = time.perf_counter()
+    features = _worker_analyzer.analyze_flag(image_path, content)
+    return image_path, features, time.perf_counter() - start
+
+
+def _refresh_flag_task(job: Tuple[str, Dict[str, Any], List[str]]) -> Tuple[str, Dict[str, Any], float]:
+    """Egy zászló elavult jellemzőcsoportjainak újraszámolása munkafolyamatban"""
+    image_path, features, groups = job
+    start = time.perf_counter()
+    features = _worker_analyzer.refresh_features(image_path, features, groups)
+    return image_path, features, time.perf_counter() - start
 
 
 class FlagAnalyzer:
     """Zászlóelemző osztály színek, formák és szimbólumok felismerésére"""
     
-    def __init__(self, data_dir: str = "data"):
+    # Elérhető színkinyerő motorok
+    COLOR_ENGINES = ('kmeans', 'palette')
+    
+    # A paletta motor K-means-ének determinisztikus kezdései: a leggyakoribb
+    # színekből induló legtávolabbi-pont kezdések száma (az n_init megfelelője)
+    PALETTE_KMEANS_STARTS = 8
+    
+    # Detektoronkénti munkafelbontás: a képpiramis legdurvább szintje, amely
+    # még legalább ekkora széles. A paletta kis felbontáson készül; a
+    # címketérkép (sávok, régiók, szimmetria) és a formák a 320 px-es
+    # referencián futnak, ehhez vannak hangolva a pixel alapú küszöbök
+    # (vékony sávszegélyek, kontúrterületek).
+    WORKING_WIDTHS = {
+        'colors': 160,
+        'bands': 320,
+        'shapes': 320,
+    }
+    
+    # Formadetektorok és az előszűrésük küszöbei: sávosnak (kihagyhatónak) az a
+    # zászló számít, amely egy tengely mentén legalább ennyire tiszta, és a
+    # sávok irányában a palettaélek aránya legfeljebb ennyi
+    SHAPE_DETECTORS = ('contours', 'stars', 'crosses')
+    SHAPE_CASCADE_PURITY = 0.95
+    SHAPE_CASCADE_EDGE_DENSITY = 0.001
+    
+    # Jellemzőcsoportok: (kinyerő verziója, függőségek), függőségi sorrendben.
+    # Egy kinyerő kimenetét érintő változáskor elég a csoport verzióját
+    # növelni: a manifest zászlónként tárolja a verziókat, így a következő
+    # --setup csak az elavult csoportokat és a tőlük függőket számolja újra,
+    # a rekord többi része változatlan marad. A sávok és az elrendezés a
+    # színek palettáját és színneveit, a formák előszűrése a sávprofilt használja.
+    FEATURE_GROUPS = {
+        'dominant_colors': ('4', ()),
+        'stripes': ('1', ('dominant_colors',)),
+        'shapes': ('1', ('stripes',)),
+        'layout': ('1', ('dominant_colors',)),
+        'symbolic': ('1', ()),
+        'complexity_score': ('1', ('dominant_colors', 'stripes', 'shapes', 'symbolic')),
+        'embedding': ('1', ('dominant_colors', 'stripes', 'shapes', 'layout')),
+    }
+    
+    # Színjelzők a jellemzők között (a domináns színekből)
+    COLOR_FLAGS = ('has_red', 'has_blue', 'has_green', 'has_yellow', 'has_white', 'has_black',
+                   'is_tricolor', 'is_bicolor')
+    
+    # Szimbolikus elemek a tudásbázisból: (attribútum, jellemző, részlet címke),
+    # a details lista sorrendjében. A félhold utalásokat a fix_crescent_detection
+    # a tudásbázis 'crescent' táblájára szűkíti.
+    SYMBOLIC_ATTRIBUTES = (
+        ('human', 'has_human', 'Human'),
+        ('animal', 'has_animal', 'Animal'),
+        ('plant', 'has_plant', 'Plant'),
+        ('weapon', 'has_weapon', 'Weapon'),
+        ('building', 'has_building', 'Building'),
+        ('celestial', 'has_celestial', 'Celestial'),
+        ('crescent_reference', 'has_crescent', 'Crescent'),
+        ('union_jack', 'has_union_jack', 'Union Jack'),
+        ('cross', 'has_cross', 'Cross'),
+    )
+    
+    def __init__(self, data_dir: str = "data", color_engine: str = "kmeans",
+                 instrumentation: Optional[InstrumentationSink] = None, record_timings: bool = False,
+                 cache_bytes: int = DEFAULT_CACHE_BYTES):
+        if color_engine not in self.COLOR_ENGINES:
+            raise ValueError(f"Ismeretlen színmotor: {color_engine} (lehetséges: {', '.join(self.COLOR_ENGINES)})")
+        
         self.data_dir = Path(data_dir)
+        self.color_engine = color_engine
         self.flags_dir = self.data_dir / "flags"
         self.features_file = self.data_dir / "flag_features.json"
+        self.manifest_file = self.data_dir / "flag_features.manifest.json"
+        self.checkpoint_file = self.data_dir / CHECKPOINT_JSONL
+        self.cache_dir = self.data_dir / "cache"
+        
+        # Tartalomcímzett eredmény gyorsítótár (cache_bytes=0: kikapcsolva)
+        self.analysis_cache = AnalysisCache(self.cache_dir / "analysis", cache_bytes) if cache_bytes else None
+        
+        # Műszerezés: lépésenkénti események fogadója és a _timings blokk kérése
+        self.instrumentation = instrumentation
+        self.record_timings = record_timings
         
         # Színkategóriák definiálása
         self.color_categories = {
@@ -40,46 +211,72 @@ class FlagAnalyzer:
             'brown': [(139, 69, 19), (160, 82, 45), (210, 180, 140)]
         }
     
-    def load_image(self, image_path: str) -> Tuple[np.ndarray, np.ndarray]:
-        """Kép betöltése OpenCV és PIL formátumban"""
-        # OpenCV formátum (BGR)
-        cv_image = cv2.imread(image_path)
-        if cv_image is None:
-            raise ValueError(f"Nem sikerült betölteni a képet: {image_path}")
-        
-        # RGB formátum
-        rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-        
-        return cv_image, rgb_image
+    @property
+    def knowledge(self) -> KnowledgeBase:
+        """A közös tudásbázis (folyamatonként egyszer betöltve, így a munkafolyamatokba sem kell átadni)"""
+        return load_knowledge_base()
     
-    def extract_dominant_colors(self, image: np.ndarray, n_colors: int = 5, min_percentage: float = 1.0) -> List[Dict]:
-        """Domináns színek kinyerése K-means klaszterezéssel"""
-        # Kép átméretezése a gyorsabb feldolgozásért
-        height, width = image.shape[:2]
-        if height * width > 50000:  # Ha túl nagy
-            scale = math.sqrt(50000 / (height * width))
-            new_height = int(height * scale)
-            new_width = int(width * scale)
-            image = cv2.resize(image, (new_width, new_height))
-        
-        # Pixelek átformázása
-        pixels = image.reshape(-1, 3)
-        
-        # K-means klaszterezés
-        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-        kmeans.fit(pixels)
-        
-        # Színek és arányaik
-        colors = kmeans.cluster_centers_.astype(int)
-        labels = kmeans.labels_
+    def context(self, image) -> FlagContext:
+        """Elemzési környezet: FlagContext változatlanul, tömb esetén becsomagolva"""
+        if isinstance(image, FlagContext):
+            return image
+        return FlagContext.from_array(image)
+    
+    def working_context(self, image, detector: str) -> FlagContext:
+        """A detektor munkafelbontásához tartozó piramisszint környezete"""
+        return self.context(image).at_width(self.WORKING_WIDTHS[detector])
+    
+    def palette(self, image, n_colors: int = 5, engine: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """A környezethez tartozó (megjegyzett) színpaletta"""
+        ctx = self.working_context(image, 'colors')
+        engine = engine or self.color_engine
+        
+        def extract():
+            if engine == 'palette':
+                _, bin_counts, bin_sums = self.color_histogram(ctx)
+                return self.palette_from_histogram(bin_counts, bin_sums, n_colors)
+            return self.extract_palette(ctx.rgb, n_colors, engine)
+        
+        return ctx.memo(('palette', n_colors, engine), extract)
+    
+    def color_histogram(self, image) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """A környezethez tartozó (megjegyzett) kvantált színhisztogram"""
+        ctx = self.context(image)
+        return ctx.memo('histogram', lambda: self.compute_histogram(ctx.rgb))
+    
+    def label_map(self, image, n_colors: int = 5, engine: Optional[str] = None) -> np.ndarray:
+        """A környezethez tartozó (megjegyzett) palettacímke-térkép"""
+        ctx = self.working_context(image, 'bands')
+        color_ctx = self.working_context(ctx, 'colors')
+        engine = engine or self.color_engine
+        colors, _ = self.palette(ctx, n_colors, engine)
+        
+        def build():
+            if color_ctx is ctx:
+                return self.build_label_map(ctx.rgb, colors, self.color_histogram(ctx))
+            # A dobozok színe a paletta (durvább) szintjének hisztogramjából jön,
+            # a sávok szintjén csak a pixelek dobozkódja kell
+            return self.build_label_map(ctx.rgb, colors, self.color_histogram(color_ctx), self.color_codes(ctx))
+        
+        return ctx.memo(('labels', n_colors, engine), build)
+    
+    def color_codes(self, image) -> np.ndarray:
+        """A környezet pixeleinek (megjegyzett) kvantált színkódja (H, W)"""
+        ctx = self.context(image)
+        return ctx.memo('codes', lambda: self.palette_codes(ctx.rgb))
+    
+    def extract_dominant_colors(self, image, n_colors: int = 5, min_percentage: float = 1.0,
+                                engine: Optional[str] = None,
+                                palette: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Dict]:
+        """Domináns színek kinyerése (K-means vagy paletta-kvantálás)"""
+        if palette is None:
+            palette = self.palette(image, n_colors, engine)
+        colors, color_counts = palette
         
-        # Színek gyakorisága
-        color_counts = Counter(labels)
-        total_pixels = len(labels)
+        total_pixels = color_counts.sum()
         
         dominant_colors = []
-        for i, color in enumerate(colors):
-            count = color_counts[i]
+        for color, count in zip(colors, color_counts):
             percentage = (count / total_pixels) * 100
             
             # Kiszűrjük a túl kis százalékú színeket (zaj)
@@ -99,98 +296,419 @@ class FlagAnalyzer:
         # Rendezés arány szerint
         return sorted(dominant_colors, key=lambda x: x['percentage'], reverse=True)
     
+    def extract_palette(self, image: np.ndarray, n_colors: int = 5,
+                        engine: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Színpaletta (középpontok és pixelszámok) a beállított motorral"""
+        engine = engine or self.color_engine
+        
+        if engine == 'palette':
+            return self.quantize_palette(image, n_colors)
+        return self.cluster_kmeans(image, n_colors)
+    
+    def build_label_map(self, image: np.ndarray, colors: np.ndarray,
+                        histogram: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                        codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Pixelenkénti palettacímke-térkép (legközelebbi palettaszín indexe)
+        
+        A zászlókon kevés különböző szín van: elég a kvantált hisztogram
+        foglalt dobozait (az átlagszínük alapján) címkézni, a pixelek a
+        dobozkódjukkal egyetlen indexeléssel kapják meg a címkét. Ha a
+        dobozkódok (codes) más piramisszintről jönnek, mint a hisztogram, a
+        ott üres dobozok a doboz középszínét kapják.
+        """
+        histogram_codes, bin_counts, bin_sums = histogram if histogram is not None else self.compute_histogram(image)
+        if codes is None:
+            codes = histogram_codes
+            occupied = np.flatnonzero(bin_counts)
+        else:
+            occupied = np.flatnonzero(np.bincount(codes.ravel(), minlength=32768))
+        
+        means = bin_colors(occupied, bin_counts[occupied], bin_sums[occupied])
+        distances = np.linalg.norm(means[:, None, :] - np.asarray(colors, dtype=np.float64)[None, :, :], axis=2)
+        
+        bin_labels = np.zeros(32768, dtype=np.uint8)
+        bin_labels[occupied] = np.argmin(distances, axis=1)
+        return bin_labels[codes]
+    
+    def layout_regions(self, height: int, width: int) -> Dict[str, Tuple[slice, slice]]:
+        """Elrendezés-elemzés régiói (sor- és oszlopszeletek)"""
+        return {
+            'top_left': (slice(0, height//2), slice(0, width//2)),
+            'top_right': (slice(0, height//2), slice(width//2, width)),
+            'bottom_left': (slice(height//2, height), slice(0, width//2)),
+            'bottom_right': (slice(height//2, height), slice(width//2, width)),
+            'center': (slice(height//4, 3*height//4), slice(width//4, 3*width//4))
+        }
+    
+    def region_label_counts(self, labels: np.ndarray, n_labels: int) -> Dict[str, np.ndarray]:
+        """Palettacímkék darabszáma régiónként (a címketérkép szeleteiből)"""
+        height, width = labels.shape
+        return {
+            region_name: np.bincount(labels[rows, cols].ravel(), minlength=n_labels)
+            for region_name, (rows, cols) in self.layout_regions(height, width).items()
+        }
+    
+    def label_symmetry(self, labels: np.ndarray) -> Dict[str, float]:
+        """Tükörszimmetria: a tükörképükkel azonos címkéjű pixelek aránya
+        
+        A 'horizontal' a bal-jobb, a 'vertical' a fent-lent tükrözést méri.
+        """
+        left_right, top_bottom = self.mirror_agreement(labels)
+        return {'horizontal': round(float(left_right), 3), 'vertical': round(float(top_bottom), 3)}
+    
+    @staticmethod
+    def mirror_agreement(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Bal-jobb és fent-lent tüköregyezés aránya"""
+        left_right = (labels == labels[..., :, ::-1]).mean(axis=(-2, -1))
+        top_bottom = (labels == labels[..., ::-1, :]).mean(axis=(-2, -1))
+        return left_right, top_bottom
+    
+    def cluster_kmeans(self, image: np.ndarray, n_colors: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Színközéppontok és pixelszámok K-means klaszterezéssel
+        
+        A kép méretét a hívó választja: az elemzés a színek munkafelbontásán
+        (képpiramis) hívja, így külön átméretezés nem kell.
+        """
+        # Pixelek átformázása
+        pixels = image.reshape(-1, 3)
+        
+        # K-means klaszterezés
+        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
+        kmeans.fit(pixels)
+        
+        # Színek és gyakoriságuk
+        colors = kmeans.cluster_centers_.astype(int)
+        counts = np.bincount(kmeans.labels_, minlength=n_colors)
+        
+        return colors, counts
+    
+    def quantize_palette(self, image: np.ndarray, n_colors: int = 5,
+                         fringe_fraction: float = 0.002,
+                         merge_distance: float = 24.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Színközéppontok és pixelszámok súlyozott hisztogramból
+        
+        A zászlók kevés, egyszínű felületből állnak, ezért a pixeleket
+        5 bites csatornánként kvantálva deduplikáljuk. A ritka (élsimítási)
+        színek a legközelebbi jelentős színbe olvadnak, klaszterezés csak
+        akkor fut, ha n_colors-nál több jelentős szín marad.
+        """
+        _, bin_counts, bin_sums = self.compute_histogram(image)
+        return self.palette_from_histogram(bin_counts, bin_sums, n_colors, fringe_fraction, merge_distance)
+    
+    def compute_histogram(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pontos hisztogram a kvantált színkódokon (32x32x32 doboz)
+        
+        Visszaad: pixelenkénti dobozkód (H, W), dobozonkénti darabszám és
+        csatornánkénti színösszeg (32768 x 3).
+        """
+        pixels = image.reshape(-1, 3)
+        codes = self.palette_codes(pixels)
+        bin_counts = np.bincount(codes, minlength=32768)
+        bin_sums = np.stack([
+            np.bincount(codes, weights=pixels[:, channel], minlength=32768)
+            for channel in range(3)
+        ], axis=1)
+        return codes.reshape(image.shape[:2]), bin_counts, bin_sums
+    
+    @staticmethod
+    def palette_codes(pixels: np.ndarray) -> np.ndarray:
+        """5 bites csatornánkénti színkód (0..32767) minden pixelre"""
+        quantized = (np.asarray(pixels) >> 3).astype(np.int32)
+        return (quantized[..., 0] << 10) | (quantized[..., 1] << 5) | quantized[..., 2]
+    
+    def palette_from_histogram(self, bin_counts: np.ndarray, bin_sums: np.ndarray, n_colors: int = 5,
+                               fringe_fraction: float = 0.002,
+                               merge_distance: float = 24.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Paletta a kvantált színhisztogramból (darabszámok és csatornaösszegek dobozonként)"""
+        means, counts, sums, owner, n_kept = self._merge_palette_bins(bin_counts, bin_sums,
+                                                                      fringe_fraction, merge_distance)
+        if n_kept <= n_colors:
+            return self._palette_from_labels(owner, counts, sums, n_kept)
+        
+        # Valóban sokszínű zászló: súlyozott K-means a deduplikált színeken,
+        # determinisztikus kezdésekből egyszerre, a legkisebb hibájú eredménnyel
+        seed_counts = np.bincount(owner, weights=counts)[:n_colors]
+        seed_sums = np.stack([np.bincount(owner, weights=sums[:, channel])[:n_colors]
+                              for channel in range(3)], axis=1)
+        starts = [seed_sums / seed_counts[:, None]]
+        starts += [self.farthest_point_seeds(means, counts, first, n_colors)
+                   for first in range(min(self.PALETTE_KMEANS_STARTS, len(means)))]
+        labels, inertia = self.weighted_kmeans(means, counts, np.stack(starts))
+        return self._palette_from_labels(labels[int(np.argmin(inertia))], counts, sums, n_colors)
+    
+    def _merge_palette_bins(self, bin_counts: np.ndarray, bin_sums: np.ndarray,
+                            fringe_fraction: float, merge_distance: float):
+        """Foglalt dobozok gyakoriság szerint, jelentős színekhez rendelve
+        
+        Visszaad: dobozátlagok, darabszámok, csatornaösszegek, a dobozok
+        jelentős-szín indexe és a jelentős színek száma.
+        """
+        n_pixels = int(bin_counts.sum())
+        
+        occupied = np.flatnonzero(bin_counts)
+        counts = bin_counts[occupied].astype(np.float64)
+        sums = bin_sums[occupied]
+        
+        # Gyakoriság szerint csökkenő sorrend
+        order = np.argsort(-counts, kind='stable')
+        counts, sums = counts[order], sums[order]
+        means = sums / counts[:, None]
+        
+        # Jelentős színek: a pixelek legalább fringe_fraction részét adják
+        is_seed = counts >= max(1.0, fringe_fraction * n_pixels)
+        is_seed[0] = True
+        
+        # Egymáshoz nagyon közeli jelentős színek összevonása (kvantálási határ)
+        seed_indices = np.flatnonzero(is_seed)
+        kept = []
+        owner = np.empty(len(counts), dtype=np.int64)
+        for index in seed_indices:
+            if kept:
+                distances = np.linalg.norm(means[kept] - means[index], axis=1)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] < merge_distance:
+                    owner[index] = nearest
+                    continue
+            owner[index] = len(kept)
+            kept.append(index)
+        
+        # Élsimítási szegélyek hozzárendelése a legközelebbi jelentős színhez
+        fringe = np.flatnonzero(~is_seed)
+        if len(fringe):
+            distances = np.linalg.norm(means[fringe, None, :] - means[kept][None, :, :], axis=2)
+            owner[fringe] = np.argmin(distances, axis=1)
+        
+        return means, counts, sums, owner, len(kept)
+    
+    @staticmethod
+    def _palette_from_labels(labels: np.ndarray, counts: np.ndarray, sums: np.ndarray,
+                             n_labels: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Palettaszínek és pixelszámok a dobozok címkéi szerint (üres címkék nélkül)"""
+        label_counts = np.bincount(labels, weights=counts, minlength=n_labels)
+        label_sums = np.stack([
+            np.bincount(labels, weights=sums[:, channel], minlength=n_labels)
+            for channel in range(3)
+        ], axis=1)
+        
+        nonempty = label_counts > 0
+        colors = (label_sums[nonempty] / label_counts[nonempty, None]).astype(int)
+        return colors, label_counts[nonempty].astype(int)
+    
+    @staticmethod
+    def farthest_point_seeds(points: np.ndarray, weights: np.ndarray, first: int,
+                             n_clusters: int) -> np.ndarray:
+        """Súlyozott legtávolabbi-pont kezdőközéppontok (a k-means++ determinisztikus változata)"""
+        chosen = [first]
+        distances = ((points - points[first]) ** 2).sum(axis=1)
+        for _ in range(n_clusters - 1):
+            index = int(np.argmax(weights * distances))
+            chosen.append(index)
+            distances = np.minimum(distances, ((points - points[index]) ** 2).sum(axis=1))
+        return points[chosen]
+    
+    @staticmethod
+    def weighted_kmeans(points: np.ndarray, weights: np.ndarray, centers: np.ndarray,
+                        max_iter: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+        """Súlyozott Lloyd-iteráció több kezdésből egyszerre
+        
+        points: (P, 3), weights: (P,), centers: (S, K, 3) - S kezdés K
+        középponttal. Visszaad: kezdésenkénti pontcímkék (S, P) és súlyozott
+        négyzetes hiba (S,). Üres klaszter a korábbi középpontján marad.
+        """
+        n_starts, n_clusters = centers.shape[:2]
+        keys_offset = (np.arange(n_starts) * n_clusters)[:, None]
+        tiled_weights = np.tile(weights, n_starts)
+        tiled_sums = [np.tile(weights * points[:, channel], n_starts) for channel in range(3)]
+        labels = None
+        
+        for _ in range(max_iter):
+            distances = ((points[None, :, None, :] - centers[:, None, :, :]) ** 2).sum(axis=3)
+            new_labels = np.argmin(distances, axis=2)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+            
+            keys = (labels + keys_offset).ravel()
+            cluster_weights = np.bincount(keys, weights=tiled_weights, minlength=n_starts * n_clusters)
+            cluster_sums = np.stack([
+                np.bincount(keys, weights=channel_sums, minlength=n_starts * n_clusters)
+                for channel_sums in tiled_sums
+            ], axis=1)
+            nonempty = cluster_weights > 0
+            flat_centers = centers.reshape(-1, 3).copy()
+            flat_centers[nonempty] = cluster_sums[nonempty] / cluster_weights[nonempty, None]
+            centers = flat_centers.reshape(n_starts, n_clusters, 3)
+        
+        inertia = (weights[None, :] * np.take_along_axis(distances, labels[..., None], axis=2)[..., 0]).sum(axis=1)
+        return labels, inertia
+    
+    @cached_property
+    def color_lut(self) -> ColorNameLUT:
+        """Színnév-keresőtábla (egyszer épül fel, lemezen gyorsítótárazva)"""
+        return ColorNameLUT.load_or_build(self.color_categories, self.cache_dir)
+    
     def get_color_name(self, rgb_color: Tuple[int, int, int]) -> str:
         """RGB szín neve meghatározása finomabb kategorizálással"""
-        try:
-            # Pontos színnév keresése
-            closest_name = webcolors.rgb_to_name(rgb_color)
+        # Pontos színnév keresése
+        rgb_color = tuple(int(c) for c in rgb_color[:3])
+        closest_name = exact_color_names().get(rgb_color)
+        if closest_name:
             return closest_name
-        except ValueError:
-            # Legközelebbi színkategória keresése
-            min_distance = float('inf')
-            closest_category = 'unknown'
-            
-            for category, category_colors in self.color_categories.items():
-                for cat_color in category_colors:
-                    distance = sum((a - b) ** 2 for a, b in zip(rgb_color, cat_color))
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_category = category
-            
-            # Speciális fekete szín felismerés - szigorúbb küszöb
-            r, g, b = rgb_color
-            if max(r, g, b) < 40:  # Csak nagyon sötét színek legyenek feketék
-                return 'black'
-            
-            # Speciális kék árnyalatok felismerése
-            if b > r and b > g:  # Kék dominál
-                if b > 180 and (r + g) < 200:  # Világos kék
-                    if r > 100 or g > 100:  # Van benne világosság
-                        return 'lightblue'
-                    else:  # Sötét kék
-                        return 'darkblue'
-                elif b > 120:  # Közepes kék
-                    return 'blue'
-            
-            # Speciális zöld árnyalatok felismerése
-            if g > r and g > b:  # Zöld dominál
-                if g > 180 and (r + b) < 200:  # Világos zöld
-                    if r > 100 or b > 100:
-                        return 'lightgreen'
-                    else:
-                        return 'darkgreen'
-            
-            # Ha fekete lett volna, de nem elég sötét, akkor a legközelebbi kategóriát adjuk vissza
-            if closest_category == 'black' and max(r, g, b) >= 40:
-                # Keressük a második legközelebbi színt
-                second_min_distance = float('inf')
-                second_category = 'unknown'
-                for category, category_colors in self.color_categories.items():
-                    if category == 'black':
-                        continue
-                    for cat_color in category_colors:
-                        distance = sum((a - b) ** 2 for a, b in zip(rgb_color, cat_color))
-                        if distance < second_min_distance:
-                            second_min_distance = distance
-                            second_category = category
-                return second_category
-            
-            return closest_category
-    
-    def detect_stripes(self, image: np.ndarray) -> Dict[str, Any]:
-        """Csíkok és sávok felismerése a zászlón"""
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        height, width = gray.shape
         
-        # Vízszintes csíkok/sávok detektálása
-        horizontal_profile = np.mean(gray, axis=1)
-        horizontal_diff = np.abs(np.diff(horizontal_profile))
-        horizontal_peaks = len([x for x in horizontal_diff if x > np.std(horizontal_diff)])
+        # Legközelebbi színkategória a keresőtáblából (RGB távolság, majd a
+        # fekete, kék és zöld különszabályok a szín tényleges értékére)
+        return self.color_lut.name(rgb_color)
+    
+    def detect_stripes(self, image) -> Dict[str, Any]:
+        """Csíkok és sávok felismerése a zászlón (futamhossz-szegmentálás a címketérképen)"""
+        ctx = self.context(image)
+        bands = self.segment_bands(ctx)
         
-        # Függőleges csíkok/sávok detektálása  
-        vertical_profile = np.mean(gray, axis=0)
-        vertical_diff = np.abs(np.diff(vertical_profile))
-        vertical_peaks = len([x for x in vertical_diff if x > np.std(vertical_diff)])
+        horizontal_count = bands['horizontal']['count']
+        vertical_count = bands['vertical']['count']
         
         # Sáv vs csík megkülönböztetés (sáv = kevesebb, de szélesebb rész)
         # Csík: sok keskeny rész (>4), Sáv: kevés széles rész (2-4)
-        has_horizontal_bands = 2 <= horizontal_peaks <= 4
-        has_vertical_bands = 2 <= vertical_peaks <= 4
-        has_horizontal_stripes = horizontal_peaks > 4
-        has_vertical_stripes = vertical_peaks > 4
+        has_horizontal_bands = 2 <= horizontal_count <= 4
+        has_vertical_bands = 2 <= vertical_count <= 4
+        has_horizontal_stripes = horizontal_count > 4
+        has_vertical_stripes = vertical_count > 4
         
         return {
             'has_horizontal_stripes': has_horizontal_stripes,
             'has_vertical_stripes': has_vertical_stripes,
             'has_horizontal_bands': has_horizontal_bands,
             'has_vertical_bands': has_vertical_bands,
-            'horizontal_stripe_count': horizontal_peaks,
-            'vertical_stripe_count': vertical_peaks
+            'horizontal_stripe_count': horizontal_count,
+            'vertical_stripe_count': vertical_count,
+            'bands': bands
+        }
+    
+    def segment_bands(self, image, min_purity: float = 0.6,
+                      min_run_fraction: float = 0.01) -> Dict[str, Dict[str, Any]]:
+        """Sávhatárok, -szélességek és -színek tengelyenként, egy NumPy menetben
+        
+        Minden sor (illetve oszlop) a leggyakoribb palettaszínét kapja; az
+        egymás utáni azonos színű sorok egy sávot alkotnak. Egy tengely akkor
+        sávos, ha legalább két sáv van és a sorok átlagosan min_purity
+        arányban a saját sávszínükből állnak. A szegmentálás a sávok
+        munkafelbontásán fut, a sávhatárok az eredeti kép pixeleiben jönnek vissza.
+        """
+        ctx = self.context(image)
+        height, width = self.working_context(ctx, 'bands').shape
+        name_table, row_counts, column_counts = self.band_profiles(ctx)
+        scale_y, scale_x = ctx.shape[0] / height, ctx.shape[1] / width
+        
+        return {
+            'horizontal': self._segment_axis(row_counts, width, name_table, min_purity, min_run_fraction, scale_y),
+            'vertical': self._segment_axis(column_counts, height, name_table, min_purity, min_run_fraction, scale_x)
+        }
+    
+    def band_profiles(self, image) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Színnév-tábla, valamint soronkénti és oszloponkénti színnév-hisztogram"""
+        ctx = self.working_context(image, 'bands')
+        
+        def profiles():
+            colors, _ = self.palette(ctx)
+            name_table, name_ids = self.palette_name_ids(colors)
+            named = name_ids[self.label_map(ctx)]
+            return (name_table,
+                    self.axis_label_counts(named, len(name_table)),
+                    self.axis_label_counts(named.T, len(name_table)))
+        
+        return ctx.memo(('band_profiles', self.color_engine), profiles)
+    
+    def palette_name_ids(self, colors: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """Palettacímkék -> színnév-azonosítók (azonos nevű klaszterek összevonása)"""
+        color_names = [self.get_color_name(tuple(color)) for color in colors]
+        name_table = list(dict.fromkeys(color_names))
+        name_ids = np.array([name_table.index(name) for name in color_names], dtype=np.int64)
+        return name_table, name_ids
+    
+    @staticmethod
+    def axis_label_counts(labels: np.ndarray, n_labels: int) -> np.ndarray:
+        """Soronkénti címkehisztogram (sorok x címkék) egyetlen bincount hívással"""
+        length = labels.shape[0]
+        offsets = labels + (np.arange(length) * n_labels)[:, None]
+        return np.bincount(offsets.ravel(), minlength=length * n_labels).reshape(length, n_labels)
+    
+    def _segment_axis(self, row_counts: np.ndarray, span: int, name_table: List[str],
+                      min_purity: float, min_run_fraction: float, scale: float = 1.0) -> Dict[str, Any]:
+        """Futamhossz-szegmentálás a soronkénti színnév-hisztogramon (határok scale-lel nagyítva)"""
+        length = row_counts.shape[0]
+        modes = np.argmax(row_counts, axis=1)
+        purity = row_counts[np.arange(length), modes] / span
+        
+        # Élsimítási futamok (a tengely min_run_fraction részénél keskenyebb)
+        # beolvasztása az előző sávba, majd újraszegmentálás
+        starts, widths = self._runs(modes)
+        keep = widths >= max(2, int(round(min_run_fraction * length)))
+        if keep.any() and not keep.all():
+            first_kept = int(np.argmax(keep))
+            source = np.where(keep, np.arange(len(keep)), first_kept)
+            source = np.maximum.accumulate(source)
+            modes = np.repeat(modes[starts][source], widths)
+            starts, widths = self._runs(modes)
+        
+        run_purity = np.add.reduceat(purity, starts) / widths
+        mean_purity = float(purity.mean())
+        is_banded = len(starts) >= 2 and mean_purity >= min_purity
+        
+        segments = []
+        if is_banded:
+            segments = [
+                {
+                    'start': int(round(start * scale)),
+                    'width': int(round(width * scale)),
+                    'share': round(float(width) / length, 3),
+                    'color': name_table[int(modes[start])],
+                    'purity': round(float(band_purity), 3)
+                }
+                for start, width, band_purity in zip(starts, widths, run_purity)
+            ]
+        
+        return {
+            'count': len(segments),
+            'equal_width': bool(segments) and int(widths.max() - widths.min()) <= max(2, 0.05 * length),
+            'purity': round(mean_purity, 3),
+            'segments': segments
         }
     
-    def detect_geometric_shapes(self, image: np.ndarray) -> Dict[str, Any]:
-        """Geometriai formák felismerése"""
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    @staticmethod
+    def _runs(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Azonos értékű futamok kezdőindexei és hosszai"""
+        change = np.flatnonzero(values[1:] != values[:-1]) + 1
+        starts = np.concatenate(([0], change))
+        widths = np.diff(np.concatenate((starts, [len(values)])))
+        return starts, widths
+    
+    def shape_cascade(self, image) -> List[str]:
+        """Olcsó előosztályozás: a biztosan eredménytelen formadetektorok listája
+        
+        A megjegyzett sávprofilból és palettacímke-térképből, élkép nélkül: ha
+        a zászló egy tengely mentén tiszta sávokból áll (vagy egyszínű), és a
+        sávok irányában (vízszintes sávoknál soron belül) alig van palettaél,
+        akkor kontúr, csillag és kereszt sem lehet rajta, mindhárom detektor
+        kihagyható.
+        """
+        ctx = self.context(image)
+        _, row_counts, column_counts = self.band_profiles(ctx)
+        labels = self.label_map(ctx)
+        
+        for axis_counts, edges in ((row_counts, lambda: labels[:, 1:] != labels[:, :-1]),
+                                   (column_counts, lambda: labels[1:, :] != labels[:-1, :])):
+            purity = axis_counts.max(axis=1).sum() / max(1, axis_counts.sum())
+            if purity < self.SHAPE_CASCADE_PURITY:
+                continue
+            if np.count_nonzero(edges()) <= self.SHAPE_CASCADE_EDGE_DENSITY * labels.size:
+                return list(self.SHAPE_DETECTORS)
+        
+        return []
+    
+    def detect_geometric_shapes(self, image) -> Dict[str, Any]:
+        """Geometriai formák felismerése (a shape_cascade által kizárt detektorok nélkül)"""
+        skipped = self.shape_cascade(image)
+        ctx = self.working_context(image, 'shapes')
         
         # Többféle módszerrel keressük a csillagokat
         shapes = {
@@ -199,12 +717,14 @@ class FlagAnalyzer:
             'rectangles': 0,
             'stars': 0,
             'crosses': 0,
-            'total_shapes': 0
+            'total_shapes': 0,
+            'skipped': skipped
         }
         
         # 1. Kontúr alapú keresés
-        edges = cv2.Canny(gray, 30, 100, apertureSize=3)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours = []
+        if 'contours' not in skipped:
+            contours, _ = cv2.findContours(ctx.edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         for contour in contours:
             area = cv2.contourArea(contour)
@@ -244,20 +764,21 @@ class FlagAnalyzer:
         
         # 2. Template matching csillagokhoz (egyszerű heurisztika)
         # Keressük a tipikus csillag formákat
-        star_patterns = self.detect_star_patterns(gray)
-        shapes['stars'] += star_patterns
+        if 'stars' not in skipped:
+            shapes['stars'] += self.detect_star_patterns(ctx)
         
         # 3. Kereszt felismerés
-        cross_patterns = self.detect_cross_patterns(gray)
-        shapes['crosses'] += cross_patterns
+        if 'crosses' not in skipped:
+            shapes['crosses'] += self.detect_cross_patterns(ctx)
         
         shapes['total_shapes'] = shapes['circles'] + shapes['triangles'] + shapes['rectangles'] + shapes['stars'] + shapes['crosses']
         
         return shapes
     
-    def detect_star_patterns(self, gray: np.ndarray) -> int:
+    def detect_star_patterns(self, image) -> int:
         """Csillag mintázatok felismerése heurisztikával"""
-        height, width = gray.shape
+        ctx = self.working_context(image, 'shapes')
+        height, width = ctx.shape
         stars = 0
         
         # Keressük a sötét pontokat világos háttéren (vagy fordítva)
@@ -269,12 +790,11 @@ class FlagAnalyzer:
         ]
         
         for x1, y1, x2, y2 in regions:
-            region = gray[y1:y2, x1:x2]
-            if region.size == 0:
+            if x2 <= x1 or y2 <= y1:
                 continue
                 
-            # Threshold alkalmazása
-            _, thresh = cv2.threshold(region, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            # Threshold alkalmazása (Otsu maszk a környezetből)
+            thresh = ctx.otsu(x1, y1, x2, y2)
             
             # Kis objektumok keresése (potenciális csillagok)
             contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -291,8 +811,9 @@ class FlagAnalyzer:
         
         return min(stars, 10)  # Maximum 10 csillag per zászló
     
-    def detect_cross_patterns(self, gray: np.ndarray) -> int:
+    def detect_cross_patterns(self, image) -> int:
         """Kereszt mintázatok felismerése"""
+        gray = self.working_context(image, 'shapes').gray
         height, width = gray.shape
         crosses = 0
         
@@ -313,7 +834,59 @@ class FlagAnalyzer:
         
         return crosses
     
-    def detect_symbolic_elements(self, image: np.ndarray, country_code: str) -> Dict[str, Any]:
+    def color_signature(self, image) -> Tuple[np.ndarray, np.ndarray]:
+        """Színkategória-arányok és térbeli színrács a színszint képéből
+        
+        A hisztogram a színszinten már elkészült (megjegyzett) példány, így
+        teljes elemzés közben nem kerül külön számításba.
+        """
+        color_ctx = self.working_context(image, 'colors')
+        _, bin_counts, bin_sums = self.color_histogram(color_ctx)
+        
+        # A foglalt dobozok kategóriája az átlagszínükből (a keresőtábla
+        # egységes celláiban ez a doboz bármely színéével azonos)
+        lut = self.color_lut
+        occupied = np.flatnonzero(bin_counts)
+        means = bin_colors(occupied, bin_counts[occupied], bin_sums[occupied])
+        categories = lut.lookup(np.rint(means))
+        fractions = np.bincount(categories, weights=bin_counts[occupied], minlength=len(lut.names))
+        fractions /= max(fractions.sum(), 1)
+        return fractions, color_grid(color_ctx.rgb)
+    
+    def visual_embedding(self, image, features: Dict[str, Any]) -> List[float]:
+        """Rögzített hosszú vizuális beágyazás (színkategória-arányok, színrács, szerkezet)"""
+        fractions, grid = self.color_signature(image)
+        embedding = flag_embedding(fractions, grid, features)
+        return [round(float(value), 4) for value in embedding]
+    
+    def query_signature(self, image) -> np.ndarray:
+        """Gyors képaláírás egy ismeretlen képhez (színek, színrács, méretarány)
+        
+        Az elemzés gyors része fut csak (sávok, formák és k-means nélkül), így
+        egy feltöltött kép interaktívan azonosítható. Bájtok esetén a kép a
+        memóriában dekódolódik, a színszinthez elég felbontásra kicsinyítve.
+        """
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            data = bytes(image)
+            # PNG-nél a kicsinyítő dekódolás nem gyorsít (teljes dekódolás és
+            # átméretezés), a teljes kép viszont pixelre egyezhet egy ismert
+            # zászlóval, így az elemzési gyorsítótárban is kereshető
+            min_width = 0 if data.startswith(PNG_SIGNATURE) else self.WORKING_WIDTHS['colors']
+            image = FlagContext.from_bytes(data, min_width=min_width)
+        ctx = self.context(image)
+        height, width = ctx.shape
+        
+        cache = self.analysis_cache
+        pixels = cache.get(self.pixel_cache_key(ctx)) if cache is not None else None
+        if pixels is not None and pixels.get('embedding'):
+            embedding = np.asarray(pixels['embedding'], dtype=np.float32)
+        else:
+            fractions, grid = self.color_signature(ctx)
+            # Ugyanaz a súlyozás és kerekítés, mint a mentett beágyazásoké
+            embedding = np.round(flag_embedding(fractions, grid, {}), 4)
+        return image_signature(appearance_part(embedding), width / height)
+    
+    def detect_symbolic_elements(self, image, country_code: str) -> Dict[str, Any]:
         """Szimbolikus elemek felismerése (ember, állat, növény, fegyver)"""
         # Tudásbázis alapú felismerés - országkód alapján
         symbolic_elements = {
@@ -329,563 +902,305 @@ class FlagAnalyzer:
             'details': []
         }
         
-        # Ember/emberi alak (címerekben, szimbólumokban)
-        human_countries = {
-            'md': 'eagle with human elements',  # Moldova - sas emberi elemekkel
-            'al': 'double-headed eagle',        # Albánia - kétfejű sas
-            'rs': 'coat of arms with crown',    # Szerbia - címer koronával
-            'me': 'coat of arms with crown',    # Montenegró - címer koronával
-            'ba': 'coat of arms',               # Bosznia - címer
-            'mk': 'sun with human face',        # Macedónia - nap emberi arccal
-            'im': 'three legs (triskelion)',    # Man-sziget - három láb
-            'si': 'coat of arms with Triglav',  # Szlovénia - címer Triglavval
-            'sk': 'double cross',               # Szlovákia - kettős kereszt
-            'hr': 'coat of arms with crown',    # Horvátország - címer koronával
-            'es': 'coat of arms',               # Spanyolország - címer
-            'pt': 'coat of arms',               # Portugália - címer
-            'ad': 'coat of arms',               # Andorra - címer
-            'sm': 'coat of arms with towers',   # San Marino - címer tornyokkal
-        }
-        
-        # Állatok (főként címerekben)
-        animal_countries = {
-            'al': 'double-headed eagle',        # Albánia - kétfejű sas
-            'md': 'eagle',                      # Moldova - sas
-            'me': 'eagle',                      # Montenegró - sas
-            'rs': 'eagle',                      # Szerbia - sas
-            'za': 'springbok and other animals', # Dél-Afrika - springbok és más állatok
-            'zm': 'eagle',                      # Zambia - sas
-            'zw': 'bird (Zimbabwe bird)',       # Zimbabwe - Zimbabwe madár
-            'ug': 'crane',                      # Uganda - daru
-            'ke': 'lion and cock',              # Kenya - oroszlán és kakas
-            'mw': 'lion',                       # Malawi - oroszlán
-            'ls': 'horse',                      # Lesotho - ló
-            'sz': 'lion and elephant',          # Szváziföld - oroszlán és elefánt
-            'fj': 'dove',                       # Fiji - galamb
-            'pg': 'bird of paradise',           # Pápua Új-Guinea - paradicsommadár
-            'sb': 'eagle',                      # Salamon-szigetek - sas
-            'vu': 'boar tusk',                  # Vanuatu - vaddisznó agyar
-            'bt': 'dragon',                     # Bhután - sárkány
-            'lk': 'lion',                       # Srí Lanka - oroszlán
-            'kg': 'eagle',                      # Kirgizisztán - sas
-            'kz': 'eagle',                      # Kazahsztán - sas
-            'mn': 'horse (soyombo symbol)',     # Mongólia - ló (soyombo szimbólum)
-            'pe': 'vicuña',                     # Peru - vikunya
-            'bo': 'condor',                     # Bolívia - kondor
-            'ec': 'condor',                     # Ecuador - kondor
-            'gt': 'quetzal bird',               # Guatemala - quetzal madár
-            'mx': 'eagle',                      # Mexikó - sas
-            'do': 'parrot',                     # Dominikai Köztársaság - papagáj
-            'gd': 'nutmeg (armadillo)',         # Grenada - szerecsendió (tatú)
-            'ag': 'sun with bird',              # Antigua és Barbuda - nap madárral
-            'bb': 'trident with fish',          # Barbados - háromágú szigony hallal
-            'bz': 'jaguar and tree',            # Belize - jaguár és fa
-            'pa': 'harpy eagle',                # Panama - hárpia sas
-            'py': 'lion',                       # Paraguay - oroszlán
-            've': 'horse',                      # Venezuela - ló
-            'gf': 'rooster',                    # Francia Guyana - kakas
-            'gy': 'jaguar',                     # Guyana - jaguár
-            # Union Jack-es zászlók állatokkal
-            'au': 'kangaroo and emu',           # Ausztrália - kenguru és emu (címerben)
-            'nz': 'kiwi bird',                  # Új-Zéland - kiwi madár (címerben)
-            'tc': 'lobster and conch',          # Turks és Caicos - languszta és kagyló (címerben)
-            'fk': 'sheep',                      # Falkland-szigetek - bárány (címerben)
-            'bm': 'lion',                       # Bermuda - oroszlán (címerben)
-            'ky': 'sea turtle',                 # Kajmán-szigetek - tengeri teknős (címerben)
-        }
-        
-        # Növények - CSAK valóban látható növényeket tartalmazó zászlók
-        plant_countries = {
-            # Nyilvánvaló növények a zászlón
-            'ca': 'red maple leaf',             # Kanada - piros juharlevél (központi elem)
-            'lb': 'green cedar tree',           # Libanon - zöld cédrusfa (központi elem)
-            'cy': 'olive branches',             # Ciprus - olajfa ágak (térkép alatt)
-            'bz': 'mahogany tree',              # Belize - mahagóni fa (címerben)
-            'nf': 'norfolk pine tree',          # Norfolk-sziget - Norfolk fenyő (címerben)
-            
-            # Kisebb növény elemek címerekben (csak biztos esetek)
-            'fj': 'coconut palm',               # Fiji - kókuszpálma (címerben)
-            'sc': 'coco de mer palm',           # Seychelle-szigetek - coco de mer pálma (címerben)
-            'vu': 'fern leaf',                  # Vanuatu - páfránylevél (címerben)
-            'pg': 'bird of paradise plant',     # Pápua Új-Guinea - paradicsommadár növény (címerben)
-            'sl': 'oil palm tree',              # Sierra Leone - olajpálma (címerben)
-            
-            # Egyéb biztos növény esetek
-            'cc': 'coconut palm and crescent',  # Kókusz-szigetek - kókuszpálma és félhold
-            'tc': 'cactus plant',               # Turks és Caicos - kaktusz (címerben)
-            
-            # Hiányzó országok növényekkel
-            'mo': 'lotus flower',               # Macau - lótuszvirág (címerben)
-            'hk': 'bauhinia flower',            # Hong Kong - bauhinia virág (címerben)
-            'er': 'olive branch',               # Eritrea - olajág (címerben)
-            'gt': 'quetzal bird and ceiba tree', # Guatemala - quetzal madár és ceiba fa (címerben)
-            'ht': 'palm tree',                  # Haiti - pálmafa (címerben)
-            'sm': 'oak and laurel branches',    # San Marino - tölgy és babér ágak (címerben)
-            've': 'orchid flower',              # Venezuela - orchidea virág (címerben)
-            'pe': 'vicuña and cinchona tree',   # Peru - vicuña és cinchona fa (címerben)
-            'mx': 'cactus and eagle',           # Mexikó - kaktusz és sas (címerben)
-            'ec': 'condor and mountain plants', # Ecuador - kondor és hegyi növények (címerben)
-            'cr': 'coffee plant',               # Costa Rica - kávéplanta (címerben)
-        }
-        
-        # Fegyverek (kardok, nyilak, lándzsák)
-        weapon_countries = {
-            'sa': 'sword',                      # Szaúd-Arábia - kard
-            'ao': 'machete and gear',           # Angola - machete és fogaskerék
-            'mz': 'rifle and hoe',              # Mozambik - puska és kapa
-            'ke': 'spears and shield',          # Kenya - lándzsák és pajzs
-            'sz': 'spear and shield',           # Szváziföld - lándzsa és pajzs
-            'ls': 'club and shield',            # Lesotho - buzogány és pajzs
-            'bw': 'gear wheels',                # Botswana - fogaskerekek
-            'zm': 'eagle over tools',           # Zambia - sas szerszámok felett
-            'zw': 'rifle and hoe',              # Zimbabwe - puska és kapa
-            'ug': 'spear',                      # Uganda - lándzsa
-            'mw': 'sun over spear',             # Malawi - nap lándzsa felett
-            'za': 'spear and knobkerrie',       # Dél-Afrika - lándzsa és buzogány
-            'na': 'sun and eagle',              # Namíbia - nap és sas
-            'bz': 'tools and weapons',          # Belize - szerszámok és fegyverek
-            'gt': 'rifles crossed',             # Guatemala - keresztezett puskák
-            'ni': 'volcano and tools',          # Nicaragua - vulkán és szerszámok
-            'ht': 'cannon and flags',           # Haiti - ágyú és zászlók
-            'do': 'bible and cross',            # Dominikai Köztársaság - biblia és kereszt
-            'bb': 'trident',                    # Barbados - háromágú szigony
-            'ag': 'anchor',                     # Antigua és Barbuda - horgony
-            'kn': 'sugar mill',                 # Saint Kitts és Nevis - cukormalom
-            'lc': 'roses and bamboo',           # Saint Lucia - rózsák és bambusz
-            'vc': 'gems',                       # Saint Vincent és Grenadines - drágakövek
-            'gd': 'nutmeg',                     # Grenada - szerecsendió
-            'tt': 'birds and ships',            # Trinidad és Tobago - madarak és hajók
-            'sr': 'star over tools',            # Suriname - csillag szerszámok felett
-            'gy': 'arrowhead',                  # Guyana - nyílhegy
-            'gf': 'canoe',                      # Francia Guyana - kenu
-            'br': 'order and progress',         # Brazília - rend és haladás
-            'ar': 'sun with face',              # Argentína - nap arccal
-            'cl': 'condor and deer',            # Chile - kondor és szarvas
-            'pe': 'tree and cornucopia',        # Peru - fa és bőségszaru
-            'bo': 'llama and tree',             # Bolívia - láma és fa
-            'ec': 'condor and mountain',        # Ecuador - kondor és hegy
-            'co': 'condor and cornucopia',      # Kolumbia - kondor és bőségszaru
-            've': 'horse and cornucopia',       # Venezuela - ló és bőségszaru
-            'py': 'star and wreath',            # Paraguay - csillag és koszorú
-            'uy': 'sun and stripes',            # Uruguay - nap és csíkok
-        }
-        
-        # Épületek/építmények
-        building_countries = {
-            'kh': 'angkor wat',                 # Kambodzsa - Angkor Wat
-            'af': 'mosque',                     # Afganisztán - mecset
-            'iq': 'takbir (god is great)',      # Irak - takbir
-            'ir': 'sword and tulip',            # Irán - kard és tulipán
-            'sa': 'sword and palm tree',        # Szaúd-Arábia - kard és pálmafa
-            'ae': 'falcon',                     # Egyesült Arab Emírségek - sólyom
-            'bh': 'dhow boat',                  # Bahrein - dhow csónak
-            'qa': 'serrated edge',              # Katar - fogazott él
-            'kw': 'dhow boat',                  # Kuvait - dhow csónak
-            'om': 'khanjar dagger',             # Omán - khanjar tőr
-            'ye': 'eagle',                      # Jemen - sas
-            'jo': 'seven pointed star',         # Jordánia - hétágú csillag
-            'sy': 'hawk of quraish',            # Szíria - Quraish sólyom
-            'lb': 'cedar tree',                 # Libanon - cédrusfa
-            'il': 'star of david',              # Izrael - Dávid csillaga
-            'ps': 'eagle',                      # Palesztina - sas
-            'cy': 'dove and olive branch',      # Ciprus - galamb és olajág
-            'tr': 'crescent and star',          # Törökország - félhold és csillag
-            'gr': 'cross',                      # Görögország - kereszt
-            'bg': 'coat of arms',               # Bulgária - címer
-            'ro': 'coat of arms',               # Románia - címer
-            'hu': 'coat of arms',               # Magyarország - címer
-            'sk': 'double cross',               # Szlovákia - kettős kereszt
-            'cz': 'coat of arms',               # Csehország - címer
-            'pl': 'eagle',                      # Lengyelország - sas
-            'de': 'federal eagle',              # Németország - szövetségi sas
-            'at': 'federal eagle',              # Ausztria - szövetségi sas
-            'ch': 'swiss cross',                # Svájc - svájci kereszt
-            'li': 'crown',                      # Liechtenstein - korona
-            'lu': 'coat of arms',               # Luxemburg - címer
-            'be': 'coat of arms',               # Belgium - címer
-            'nl': 'coat of arms',               # Hollandia - címer
-            'fr': 'tricolor',                   # Franciaország - tricolor
-            'mc': 'coat of arms',               # Monaco - címer
-            'ad': 'coat of arms',               # Andorra - címer
-            'es': 'coat of arms',               # Spanyolország - címer
-            'pt': 'coat of arms',               # Portugália - címer
-            'it': 'coat of arms',               # Olaszország - címer
-            'sm': 'towers',                     # San Marino - tornyok
-            'va': 'papal keys',                 # Vatikán - pápai kulcsok
-            'mt': 'george cross',               # Málta - György kereszt
-            'si': 'triglav mountain',           # Szlovénia - Triglav hegy
-            'hr': 'coat of arms',               # Horvátország - címer
-            'ba': 'coat of arms',               # Bosznia - címer
-            'rs': 'coat of arms',               # Szerbia - címer
-            'me': 'coat of arms',               # Montenegró - címer
-            'mk': 'sun of vergina',             # Macedónia - Vergina nap
-            'xk': 'map and stars',              # Koszovó - térkép és csillagok
-            'cr': 'volcanoes and sea',          # Costa Rica - vulkánok és tenger (landscape)
-            'sv': 'volcanoes',                  # Salvador - vulkánok (landscape)
-            'ni': 'volcanoes',                  # Nicaragua - vulkánok (landscape)
-            'bw': 'pattern design',             # Botswana - mintázat design
-        }
-        
-        # Égi testek (nap, hold, csillagok - már meglévő csillag adatokkal kiegészítve)
-        celestial_countries = {
-            'ar': 'sun with face',              # Argentína - nap arccal
-            'uy': 'sun with face',              # Uruguay - nap arccal
-            'mk': 'sun with rays',              # Macedónia - nap sugarakkal
-            'rw': 'sun',                        # Ruanda - nap
-            'mw': 'sun',                        # Malawi - nap
-            'na': 'sun',                        # Namíbia - nap
-            'ki': 'sun over waves',             # Kiribati - nap hullámok felett
-            'ne': 'sun',                        # Niger - nap
-            'jp': 'sun',                        # Japán - nap
-            'bd': 'sun',                        # Banglades - nap
-            'tw': 'sun',                        # Tajvan - nap
-            'ph': 'sun and stars',              # Fülöp-szigetek - nap és csillagok
-            'my': 'crescent moon and star',     # Malajzia - félhold és csillag
-            'sg': 'crescent moon and stars',    # Szingapúr - félhold és csillagok
-            'pk': 'crescent moon and star',     # Pakisztán - félhold és csillag
-            'tr': 'crescent moon and star',     # Törökország - félhold és csillag
-            'az': 'crescent moon and star',     # Azerbajdzsán - félhold és csillag
-            'tm': 'crescent moon and stars',    # Türkmenisztán - félhold és csillagok
-            'uz': 'crescent moon and stars',    # Üzbegisztán - félhold és csillagok
-            'dz': 'crescent moon and star',     # Algéria - félhold és csillag
-            'tn': 'crescent moon and star',     # Tunézia - félhold és csillag
-            'mr': 'crescent moon and star',     # Mauritánia - félhold és csillag
-            'mv': 'crescent moon',              # Maldív-szigetek - félhold
-            'cc': 'crescent moon',              # Kókusz-szigetek - félhold
-            'la': 'moon phases',                # Laosz - hold fázisai
-            'sr': 'star',                       # Suriname - csillag
-        }
-        
-        # Félhold - iszlám országok és mások félhold szimbólummal
-        crescent_countries = {
-            # Főbb iszlám országok félhold és csillaggal
-            'tr': 'red crescent and star',      # Törökország - piros félhold és csillag
-            'pk': 'white crescent and star',    # Pakisztán - fehér félhold és csillag zöld mezőn
-            'my': 'yellow crescent and star',   # Malajzia - sárga félhold és csillag kék mezőn
-            'sg': 'white crescent and stars',   # Szingapúr - fehér félhold és csillagok piros mezőn
-            'dz': 'red crescent and star',      # Algéria - piros félhold és csillag fehér mezőn
-            'tn': 'red crescent and star',      # Tunézia - piros félhold és csillag fehér mezőn
-            'mr': 'yellow crescent and star',   # Mauritánia - sárga félhold és csillag zöld mezőn
-            'mv': 'white crescent',             # Maldív-szigetek - fehér félhold piros mezőn
-            'cc': 'white crescent',             # Kókusz-szigetek - fehér félhold zöld mezőn
-            
-            # Közép-ázsiai iszlám országok
-            'az': 'white crescent and star',    # Azerbajdzsán - fehér félhold és csillag
-            'tm': 'white crescent and stars',   # Türkmenisztán - fehér félhold és csillagok
-            'uz': 'white crescent and stars',   # Üzbegisztán - fehér félhold és csillagok
-            
-            # Arab országok
-            'ae': 'crescent references',        # Egyesült Arab Emírségek - félhold utalások
-            'qa': 'crescent references',        # Katar - félhold utalások
-            'bh': 'crescent references',        # Bahrein - félhold utalások
-            'kw': 'crescent references',        # Kuvait - félhold utalások
-            'om': 'crescent references',        # Omán - félhold utalások
-            'ye': 'crescent references',        # Jemen - félhold utalások
-            'sa': 'islamic crescent',           # Szaúd-Arábia - iszlám félhold
-            'jo': 'crescent references',        # Jordánia - félhold utalások
-            'sy': 'green stars (islam)',       # Szíria - zöld csillagok (iszlám)
-            'iq': 'takbir (islamic)',          # Irak - takbir (iszlám)
-            'ir': 'islamic symbols',           # Irán - iszlám szimbólumok
-            'af': 'islamic symbols',           # Afganisztán - iszlám szimbólumok
-            'lb': 'crescent references',        # Libanon - félhold utalások
-            'ps': 'crescent references',        # Palesztina - félhold utalások
-            
-            # Afrikai iszlám országok
-            'eg': 'crescent references',        # Egyiptom - félhold utalások
-            'ly': 'crescent and star',          # Líbia - félhold és csillag
-            'sd': 'crescent references',        # Szudán - félhold utalások
-            'so': 'star (islamic)',            # Szomália - csillag (iszlám)
-            'dj': 'crescent references',        # Djibouti - félhold utalások
-            'er': 'crescent references',        # Eritrea - félhold utalások
-            'et': 'crescent references',        # Etiópia - félhold utalások (keresztény többség, de iszlám kisebbség)
-            'td': 'crescent references',        # Csád - félhold utalások
-            'ne': 'crescent references',        # Niger - félhold utalások
-            'ml': 'crescent references',        # Mali - félhold utalások
-            'bf': 'crescent references',        # Burkina Faso - félhold utalások
-            'sn': 'crescent references',        # Szenegál - félhold utalások
-            'gm': 'crescent references',        # Gambia - félhold utalások
-            'gn': 'crescent references',        # Guinea - félhold utalások
-            'gw': 'crescent references',        # Guinea-Bissau - félhold utalások
-            'sl': 'crescent references',        # Sierra Leone - félhold utalások
-            'lr': 'crescent references',        # Libéria - félhold utalások
-            'ci': 'crescent references',        # Elefántcsontpart - félhold utalások
-            'gh': 'crescent references',        # Ghána - félhold utalások
-            'tg': 'crescent references',        # Togo - félhold utalások
-            'bj': 'crescent references',        # Benin - félhold utalások
-            'ng': 'crescent references',        # Nigéria - félhold utalások
-            'cm': 'crescent references',        # Kamerun - félhold utalások
-            'cf': 'crescent references',        # Közép-afrikai Köztársaság - félhold utalások
-            'cg': 'crescent references',        # Kongói Köztársaság - félhold utalások
-            'ga': 'crescent references',        # Gabon - félhold utalások
-            'gq': 'crescent references',        # Egyenlítői-Guinea - félhold utalások
-            'km': 'green and crescent',         # Comore-szigetek - zöld és félhold
-            
-            # Ázsiai iszlám országok
-            'id': 'crescent references',        # Indonézia - félhold utalások
-            'bn': 'crescent references',        # Brunei - félhold utalások
-            'bd': 'crescent references',        # Banglades - félhold utalások
-            'kz': 'crescent references',        # Kazahsztán - félhold utalások
-            'kg': 'crescent references',        # Kirgizisztán - félhold utalások
-            'tj': 'crescent references',        # Tádzsikisztán - félhold utalások
-            'kp': 'crescent references',        # Észak-Korea - félhold utalások (kis iszlám közösség)
-            
-            # Balkáni iszlám közösségek
-            'al': 'crescent references',        # Albánia - félhold utalások (iszlám többség)
-            'xk': 'crescent references',        # Koszovó - félhold utalások (iszlám többség)
-            'ba': 'crescent references',        # Bosznia - félhold utalások (jelentős iszlám közösség)
-            'mk': 'crescent references',        # Macedónia - félhold utalások (iszlám kisebbség)
-            'bg': 'crescent references',        # Bulgária - félhold utalások (iszlám kisebbség)
-            'rs': 'crescent references',        # Szerbia - félhold utalások (iszlám kisebbség)
-            'me': 'crescent references',        # Montenegró - félhold utalások (iszlám kisebbség)
-            
-            # Egyéb országok iszlám közösségekkel
-            'in': 'crescent references',        # India - félhold utalások (nagy iszlám kisebbség)
-            'ru': 'crescent references',        # Oroszország - félhold utalások (iszlám köztársaságok)
-            'cn': 'crescent references',        # Kína - félhold utalások (ujgurok)
-            'th': 'crescent references',        # Thaiföld - félhold utalások (déli iszlám közösség)
-            'ph': 'crescent references',        # Fülöp-szigetek - félhold utalások (déli iszlám közösség)
-            'mm': 'crescent references',        # Mianmar - félhold utalások (iszlám kisebbség)
-            'lk': 'crescent references',        # Srí Lanka - félhold utalások (iszlám kisebbség)
-            'np': 'crescent references',        # Nepál - félhold utalások (iszlám kisebbség)
-            'bt': 'crescent references',        # Bhután - félhold utalások (iszlám kisebbség)
-            
-            # Kaukázusi régió
-            'ge': 'crescent references',        # Grúzia - félhold utalások (iszlám közösségek)
-            'am': 'crescent references',        # Örményország - félhold utalások (kis iszlám közösség)
-        }
-        
-        # Ellenőrizzük az aktuális országot
-        if country_code in human_countries:
-            symbolic_elements['has_human'] = True
-            symbolic_elements['details'].append(f"Human: {human_countries[country_code]}")
-        
-        if country_code in animal_countries:
-            symbolic_elements['has_animal'] = True
-            symbolic_elements['details'].append(f"Animal: {animal_countries[country_code]}")
-        
-        if country_code in plant_countries:
-            symbolic_elements['has_plant'] = True
-            symbolic_elements['details'].append(f"Plant: {plant_countries[country_code]}")
-        
-        if country_code in weapon_countries:
-            symbolic_elements['has_weapon'] = True
-            symbolic_elements['details'].append(f"Weapon: {weapon_countries[country_code]}")
-        
-        if country_code in building_countries:
-            symbolic_elements['has_building'] = True
-            symbolic_elements['details'].append(f"Building: {building_countries[country_code]}")
-        
-        if country_code in celestial_countries:
-            symbolic_elements['has_celestial'] = True
-            symbolic_elements['details'].append(f"Celestial: {celestial_countries[country_code]}")
-        
-        if country_code in crescent_countries:
-            symbolic_elements['has_crescent'] = True
-            symbolic_elements['details'].append(f"Crescent: {crescent_countries[country_code]}")
-        
-        # Union Jack (brit zászló) - CSAK azok az országok amelyeknek zászlójában VALÓBAN megjelenik
-        union_jack_countries = {
-            'gb': 'United Kingdom flag',            # Nagy-Britannia - maga az Union Jack
-            'au': 'Union Jack in canton',           # Ausztrália - bal felső sarokban
-            'nz': 'Union Jack in canton',           # Új-Zéland - bal felső sarokban  
-            'fj': 'Union Jack in canton',           # Fiji - bal felső sarokban
-            'tv': 'Union Jack in canton',           # Tuvalu - bal felső sarokban
-            'ck': 'Union Jack in canton',           # Cook-szigetek - bal felső sarokban
-            'nu': 'Union Jack in canton',           # Niue - bal felső sarokban
-            'pn': 'Union Jack in canton',           # Pitcairn-szigetek - bal felső sarokban
-            'sh': 'Union Jack in canton',           # Szent Ilona - bal felső sarokban
-            'tc': 'Union Jack in canton',           # Turks és Caicos - bal felső sarokban
-            'vg': 'Union Jack in canton',           # Brit Virgin-szigetek - bal felső sarokban
-            'ai': 'Union Jack in canton',           # Anguilla - bal felső sarokban
-            'ms': 'Union Jack in canton',           # Montserrat - bal felső sarokban
-            'fk': 'Union Jack in canton',           # Falkland-szigetek - bal felső sarokban
-            'gs': 'Union Jack in canton',           # Dél-Georgia - bal felső sarokban
-            'io': 'Union Jack in canton',           # Brit Indiai-óceáni Terület - bal felső sarokban
-            'ky': 'Union Jack in canton',           # Kajmán-szigetek - bal felső sarokban
-            'bm': 'Union Jack in canton',           # Bermuda - bal felső sarokban
-            'gb-eng': 'St Georges cross',           # Anglia - Szent György kereszt (Union Jack része)
-            # ELTÁVOLÍTOTT országok - ezek SAJÁT zászlókkal rendelkeznek, NEM Union Jack-kel:
-            # 'gb-sct': Skócia - kék zászló fehér X kereszttel (Saint Andrew's Cross)
-            # 'gb-wls': Wales - fehér-zöld zászló piros sárkánnyal  
-            # 'je': Jersey - fehér zászló piros kereszttel és címerrel
-            # 'gg': Guernsey - fehér zászló piros kereszttel és címerrel
-            # 'im': Man-sziget - piros zászló három lábbal (triskelion)
-        }
-        
-        if country_code in union_jack_countries:
-            symbolic_elements['has_union_jack'] = True
-            symbolic_elements['details'].append(f"Union Jack: {union_jack_countries[country_code]}")
-        
-        # Keresztek - országok amelyeknek zászlójában kereszt van
-        cross_countries = {
-            # Skandináv keresztek
-            'dk': 'Nordic cross (Dannebrog)',      # Dánia - skandináv kereszt
-            'se': 'Nordic cross',                  # Svédország - skandináv kereszt
-            'no': 'Nordic cross',                  # Norvégia - skandináv kereszt
-            'fi': 'Nordic cross',                  # Finnország - skandináv kereszt
-            'is': 'Nordic cross',                  # Izland - skandináv kereszt
-            'fo': 'Nordic cross',                  # Feröer-szigetek - skandináv kereszt
-            'ax': 'Nordic cross',                  # Åland-szigetek - skandináv kereszt
-            'sj': 'Nordic cross',                  # Svalbard - skandináv kereszt
-            
-            # Nyilvánvaló keresztek (teljes zászló)
-            'ch': 'Swiss cross',                   # Svájc - svájci kereszt
-            'gr': 'Greek cross',                   # Görögország - görög kereszt
-            'to': 'Red cross on white',            # Tonga - piros kereszt fehér mezőn
-            'ge': 'Five crosses',                  # Grúzia - öt kereszt
-            'mt': 'Maltese cross',                 # Málta - máltai kereszt
-            
-            # Kettős keresztek
-            'sk': 'Double cross',                  # Szlovákia - kettős kereszt
-            'hu': 'Double cross',                  # Magyarország - kettős kereszt
-            'lt': 'Double cross',                  # Litvánia - kettős kereszt
-            
-            # Ortodox/keresztény keresztek
-            'md': 'Orthodox cross',                # Moldova - ortodox kereszt
-            'am': 'Armenian cross',                # Örményország - örmény kereszt
-            'do': 'Cross in coat of arms',         # Dominikai Köztársaság - kereszt a címerben
-            'et': 'Cross in coat of arms',         # Etiópia - kereszt a címerben
-            'er': 'Cross elements',                # Eritrea - kereszt elemek
-            
-            # Union Jack keresztek (Szent György és Szent András)
-            'gb': 'Union Jack crosses',            # Egyesült Királyság - Union Jack keresztek
-            'gb-eng': 'St Georges cross',          # Anglia - Szent György kereszt
-            'gb-sct': 'St Andrews cross',          # Skócia - Szent András kereszt (X kereszt)
-            
-            # Koronafüggő területek saját kereszteikkel
-            'je': 'Red cross on white',            # Jersey - piros kereszt fehér mezőn
-            'gg': 'Red cross on white',            # Guernsey - piros kereszt fehér mezőn
-            'au': 'Union Jack and Southern Cross', # Ausztrália - Union Jack + déli kereszt
-            'nz': 'Union Jack and Southern Cross', # Új-Zéland - Union Jack + déli kereszt
-            'fj': 'Union Jack cross in canton',    # Fiji - Union Jack kereszt
-            'tv': 'Union Jack cross in canton',    # Tuvalu - Union Jack kereszt
-            
-            # Címerbeli keresztek (európai országok)
-            'va': 'Papal cross',                   # Vatikán - pápai kereszt
-            'sm': 'Cross in coat of arms',         # San Marino - kereszt a címerben
-            'ad': 'Cross elements',                # Andorra - kereszt elemek
-            'pt': 'Cross of Christ',               # Portugália - Krisztus keresztje
-            'es': 'Cross in coat of arms',         # Spanyolország - kereszt a címerben
-            'it': 'Cross elements',                # Olaszország - kereszt elemek
-            'fr': 'Cross references',              # Franciaország - kereszt utalások
-            'be': 'Cross in coat of arms',         # Belgium - kereszt a címerben
-            'nl': 'Cross in coat of arms',         # Hollandia - kereszt a címerben
-            'de': 'Cross in coat of arms',         # Németország - kereszt a címerben
-            'at': 'Cross in coat of arms',         # Ausztria - kereszt a címerben
-            'pl': 'Cross elements',                # Lengyelország - kereszt elemek
-            'cz': 'Cross in coat of arms',         # Csehország - kereszt a címerben
-            'si': 'Cross in coat of arms',         # Szlovénia - kereszt a címerben
-            'hr': 'Cross in coat of arms',         # Horvátország - kereszt a címerben
-            'ba': 'Cross elements',                # Bosznia - kereszt elemek
-            'rs': 'Cross in coat of arms',         # Szerbia - kereszt a címerben
-            'me': 'Cross in coat of arms',         # Montenegró - kereszt a címerben
-            'al': 'Cross references',              # Albánia - kereszt utalások
-            'mk': 'Cross elements',                # Macedónia - kereszt elemek
-            'ro': 'Cross in coat of arms',         # Románia - kereszt a címerben
-            'by': 'Cross elements',                # Fehéroroszország - kereszt elemek
-            'ru': 'Cross elements',                # Oroszország - kereszt elemek
-            'ee': 'Cross elements',                # Észtország - kereszt elemek
-            'lv': 'Cross elements',                # Lettország - kereszt elemek
-            
-            # Keresztény országok keresztekkel
-            'cy': 'Cross elements',                # Ciprus - kereszt elemek
-            'lb': 'Cross references',              # Libanon - kereszt utalások
-            'ph': 'Cross references',              # Fülöp-szigetek - kereszt utalások
-            'tl': 'Cross elements',                # Kelet-Timor - kereszt elemek
-            
-            # Déli kereszt (csillagkép)
-            'br': 'Southern Cross constellation',  # Brazília - déli kereszt csillagkép
-            'ws': 'Southern Cross constellation',  # Szamoa - déli kereszt csillagkép
-            'pg': 'Southern Cross constellation',  # Pápua Új-Guinea - déli kereszt csillagkép
-            'sb': 'Southern Cross constellation',  # Salamon-szigetek - déli kereszt csillagkép
-            'fm': 'Southern Cross constellation',  # Mikronézia - déli kereszt csillagkép
-        }
-        
-        if country_code in cross_countries:
-            symbolic_elements['has_cross'] = True
-            symbolic_elements['details'].append(f"Cross: {cross_countries[country_code]}")
+        # Az ország tényei a tudásbázisból, a részletek rögzített sorrendjében
+        facts = self.knowledge.country(country_code)
+        for attribute, key, label in self.SYMBOLIC_ATTRIBUTES:
+            if attribute in facts:
+                symbolic_elements[key] = True
+                symbolic_elements['details'].append(f"{label}: {facts[attribute]}")
         
         return symbolic_elements
     
-    def analyze_layout(self, image: np.ndarray) -> Dict[str, Any]:
+    def analyze_layout(self, image,
+                       palette: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Dict[str, Any]:
         """Zászló elrendezésének elemzése"""
-        height, width = image.shape[:2]
+        ctx = self.context(image)
+        height, width = ctx.shape
         
         # Aspect ratio
         aspect_ratio = width / height
         
-        # Szín eloszlás régiók szerint
-        regions = {
-            'top_left': image[:height//2, :width//2],
-            'top_right': image[:height//2, width//2:],
-            'bottom_left': image[height//2:, :width//2],
-            'bottom_right': image[height//2:, width//2:],
-            'center': image[height//4:3*height//4, width//4:3*width//4]
-        }
+        # Szín eloszlás régiók szerint - egyetlen címketérképből számolva
+        band_ctx = self.working_context(ctx, 'bands')
+        if palette is None:
+            colors, _ = self.palette(ctx)
+            labels = self.label_map(ctx)
+            region_counts = band_ctx.memo(('regions', self.color_engine),
+                                          lambda: self.region_label_counts(labels, len(colors)))
+            symmetry = band_ctx.memo(('symmetry', self.color_engine),
+                                     lambda: self.label_symmetry(labels))
+        else:
+            colors, _ = palette
+            labels = self.build_label_map(band_ctx.rgb, colors, self.color_histogram(band_ctx))
+            region_counts = self.region_label_counts(labels, len(colors))
+            symmetry = self.label_symmetry(labels)
+        color_names = [self.get_color_name(tuple(color)) for color in colors]
         
         region_colors = {}
-        for region_name, region in regions.items():
-            dominant = self.extract_dominant_colors(region, n_colors=3)
-            region_colors[region_name] = dominant[0]['name'] if dominant else 'unknown'
+        for region_name, counts in region_counts.items():
+            region_colors[region_name] = color_names[int(np.argmax(counts))] if counts.sum() else 'unknown'
         
         return {
             'aspect_ratio': round(aspect_ratio, 2),
             'width': width,
             'height': height,
             'region_colors': region_colors,
+            'symmetry': symmetry,
             'is_square': abs(aspect_ratio - 1.0) < 0.1,
             'is_horizontal': aspect_ratio > 1.5,
             'is_vertical': aspect_ratio < 0.7
         }
     
-    def analyze_flag(self, image_path: str) -> Dict[str, Any]:
-        """Teljes zászlóelemzés"""
-        try:
-            cv_image, rgb_image = self.load_image(image_path)
-            
-            # Országkód kinyerése a fájlnévből
-            country_code = Path(image_path).stem.split('_')[0]
-            
-            # Alapvető elemzések
-            dominant_colors = self.extract_dominant_colors(rgb_image)
-            stripes = self.detect_stripes(rgb_image)
-            shapes = self.detect_geometric_shapes(rgb_image)
-            layout = self.analyze_layout(rgb_image)
-            symbolic = self.detect_symbolic_elements(rgb_image, country_code)
+    @property
+    def instrumented(self) -> bool:
+        """Mérni kell-e az elemzési lépéseket (fogadó vagy _timings blokk miatt)"""
+        return self.instrumentation is not None or self.record_timings
+    
+    def _stage(self, country_code: str, stage: str, timings: Optional[Dict[str, float]], func, *args):
+        """Egy elemzési lépés futtatása; mérés és események csak műszerezéskor"""
+        if timings is None:
+            return func(*args)
+        
+        sink = self.instrumentation
+        if sink is not None:
+            sink.stage_started(country_code, stage)
+        start = time.perf_counter()
+        result = func(*args)
+        duration = time.perf_counter() - start
+        timings[stage] = duration
+        if sink is not None:
+            sink.stage_finished(country_code, stage, duration)
+        return result
+    
+    def _start_profiler(self) -> Optional[cProfile.Profile]:
+        """cProfile indítása, ha a fogadó profilt kér"""
+        if self.instrumentation is None or not self.instrumentation.profile:
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    
+    def _finish_flag(self, country_code: str, timings: Optional[Dict[str, float]],
+                     profiler: Optional[cProfile.Profile]):
+        """Zászló vége: profilozó leállítása és a fogadó értesítése"""
+        if profiler is not None:
+            profiler.disable()
+        if self.instrumentation is not None and timings is not None:
+            self.instrumentation.flag_finished(country_code, timings, profiler)
+    
+    def analyze_flag(self, image_path: str, content: Optional[bytes] = None) -> Dict[str, Any]:
+        """Teljes zászlóelemzés
+        
+        content megadásakor a kép ezekből a bájtokból dekódolódik (cv2.imdecode),
+        a fájl újraolvasása nélkül; az image_path ekkor csak az országkódhoz kell.
+        """
+        load = FlagContext.from_path if content is None else lambda path: FlagContext.from_bytes(content, path)
+        if not self.instrumented:
+            try:
+                # Egyszer dekódolt kép, közös pufferekkel minden detektornak
+                ctx = load(image_path)
+            except Exception as e:
+                print(f"Hiba a zászló elemzésekor ({image_path}): {e}")
+                return {}
             
-            # Színkategóriák
-            color_names = [color['name'] for color in dominant_colors]
-            unique_colors = list(set(color_names))
+            return self.analyze_context(ctx)
+        
+        country_code = self.extract_country_code_from_path(image_path)
+        timings = {}
+        profiler = self._start_profiler()
+        try:
+            ctx = self._stage(country_code, 'load', timings, load, image_path)
+        except Exception as e:
+            print(f"Hiba a zászló elemzésekor ({image_path}): {e}")
+            self._finish_flag(country_code, timings, profiler)
+            return {}
+        
+        return self.analyze_context(ctx, timings, profiler)
+    
+    def analyze_context(self, ctx: FlagContext, timings: Optional[Dict[str, float]] = None,
+                        profiler: Optional[cProfile.Profile] = None) -> Dict[str, Any]:
+        """Teljes zászlóelemzés egy (akár előtöltött) elemzési környezeten
+        
+        Műszerezéskor a lépések ideje a timings szótárba kerül (az analyze_flag
+        már a betöltés idejével adja át); record_timings esetén a jellemzők
+        _timings blokkjába is, ezredmásodpercben.
+        """
+        image_path = ctx.image_path
+        # Országkód kinyerése a fájlnévből
+        country_code = ctx.country_code
+        if timings is None and self.instrumented:
+            timings = {}
+        
+        try:
+            # Képtartalomból származó jellemzők (gyorsítótárból, ha ugyanez a kép már elemezve volt)
+            pixels = self.cached_pixel_features(ctx, timings)
+            symbolic = self._stage(country_code, 'detect_symbolic_elements', timings,
+                                   self.detect_symbolic_elements, ctx, country_code)
             
             # Összesített jellemzők
             features = {
                 'file_path': image_path,
-                'dominant_colors': dominant_colors,
-                'unique_colors': unique_colors,
-                'color_count': len(unique_colors),
-                'stripes': stripes,
-                'shapes': shapes,
-                'layout': layout,
+                'dominant_colors': pixels['dominant_colors'],
+                'unique_colors': pixels['unique_colors'],
+                'color_count': pixels['color_count'],
+                'stripes': pixels['stripes'],
+                'shapes': pixels['shapes'],
+                'layout': pixels['layout'],
                 'symbolic': symbolic,
-                'has_red': 'red' in unique_colors,
-                'has_blue': 'blue' in unique_colors,
-                'has_green': 'green' in unique_colors,
-                'has_yellow': 'yellow' in unique_colors,
-                'has_white': 'white' in unique_colors,
-                'has_black': 'black' in unique_colors,
-                'is_tricolor': len(unique_colors) == 3,
-                'is_bicolor': len(unique_colors) == 2,
-                'complexity_score': self.calculate_complexity(shapes, stripes, len(unique_colors), symbolic)
+                **{key: pixels[key] for key in self.COLOR_FLAGS},
+                'complexity_score': self.calculate_complexity(pixels['shapes'], pixels['stripes'],
+                                                              pixels['color_count'], symbolic)
             }
             
             # Félhold felismerés javítása
-            features = self.fix_crescent_detection(features)
+            features = self._stage(country_code, 'fix_crescent_detection', timings,
+                                   self.fix_crescent_detection, features)
+            features['embedding'] = pixels['embedding']
+            
+            if self.record_timings:
+                features['_timings'] = {stage: round(duration * 1000, 3) for stage, duration in timings.items()}
             
             return features
             
         except Exception as e:
             print(f"Hiba a zászló elemzésekor ({image_path}): {e}")
             return {}
+        finally:
+            self._finish_flag(country_code, timings, profiler)
+    
+    def pixel_features(self, ctx: FlagContext, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """A csak a képtartalomtól függő jellemzők (színek, sávok, formák, elrendezés, beágyazás)
+        
+        Az országkódtól (tudásbázistól) függő részek - szimbolikus elemek,
+        félhold, komplexitás - nincsenek benne, így pixelre azonos zászlók
+        (pl. us és um) és feltöltött képek eredménye közösen tárolható.
+        """
+        country_code = ctx.country_code
+        dominant_colors = self._stage(country_code, 'extract_dominant_colors', timings,
+                                      self.extract_dominant_colors, ctx)
+        stripes = self._stage(country_code, 'detect_stripes', timings, self.detect_stripes, ctx)
+        shapes = self._stage(country_code, 'detect_geometric_shapes', timings,
+                             self.detect_geometric_shapes, ctx)
+        layout = self._stage(country_code, 'analyze_layout', timings, self.analyze_layout, ctx)
+        
+        pixels = self.color_summary(dominant_colors)
+        pixels.update(stripes=stripes, shapes=shapes, layout=layout)
+        
+        # Vizuális beágyazás a hasonló zászlók kereséséhez (csak szerkezeti jellemzőket olvas)
+        pixels['embedding'] = self._stage(country_code, 'visual_embedding', timings,
+                                          self.visual_embedding, ctx, pixels)
+        return pixels
+    
+    def color_summary(self, dominant_colors: List[Dict]) -> Dict[str, Any]:
+        """A dominant_colors csoport mezői: színek, egyedi színnevek, színszám és színjelzők"""
+        # Színkategóriák
+        color_names = [color['name'] for color in dominant_colors]
+        unique_colors = list(dict.fromkeys(color_names))  # Dominancia sorrendjében
+        
+        return {
+            'dominant_colors': dominant_colors,
+            'unique_colors': unique_colors,
+            'color_count': len(unique_colors),
+            'has_red': 'red' in unique_colors,
+            'has_blue': 'blue' in unique_colors,
+            'has_green': 'green' in unique_colors,
+            'has_yellow': 'yellow' in unique_colors,
+            'has_white': 'white' in unique_colors,
+            'has_black': 'black' in unique_colors,
+            'is_tricolor': len(unique_colors) == 3,
+            'is_bicolor': len(unique_colors) == 2,
+        }
+    
+    def cached_pixel_features(self, ctx: FlagContext,
+                              timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """pixel_features a tartalomcímzett gyorsítótáron át
+        
+        A kulcs a dekódolt pixelek hash-e, az elemző verziója és paraméterei.
+        Műszerezéskor (mérés, profilozás) a gyorsítótár kimarad, hogy a
+        lépések valódi ideje látsszon.
+        """
+        cache = self.analysis_cache
+        if cache is None or timings is not None:
+            return self.pixel_features(ctx, timings)
+        
+        key = self.pixel_cache_key(ctx)
+        pixels = cache.get(key)
+        if pixels is None:
+            pixels = clean_for_json(self.pixel_features(ctx))
+            cache.put(key, pixels)
+        return pixels
+    
+    def pixel_cache_key(self, ctx: FlagContext) -> str:
+        """A pixel_features gyorsítótár kulcsa: pixelhash, elemzőverzió, paraméterek, kinyerők"""
+        return AnalysisCache.key(image_digest(ctx.rgb), ANALYZER_VERSION,
+                                 f"{self.params_fingerprint()}-{self.extractors_fingerprint()}")
+    
+    def extract_group(self, group: str, ctx: FlagContext, features: Dict[str, Any]) -> Dict[str, Any]:
+        """Egy jellemzőcsoport mezői újraszámolva (a függőségei a features-ből olvasva)"""
+        if group == 'dominant_colors':
+            return self.color_summary(self.extract_dominant_colors(ctx))
+        if group == 'stripes':
+            return {'stripes': self.detect_stripes(ctx)}
+        if group == 'shapes':
+            return {'shapes': self.detect_geometric_shapes(ctx)}
+        if group == 'layout':
+            return {'layout': self.analyze_layout(ctx)}
+        if group == 'symbolic':
+            symbolic = self.detect_symbolic_elements(ctx, ctx.country_code)
+            fixed = self.fix_crescent_detection({'file_path': ctx.image_path, 'symbolic': symbolic})
+            return {'symbolic': fixed['symbolic']}
+        if group == 'complexity_score':
+            return {'complexity_score': self.calculate_complexity(features['shapes'], features['stripes'],
+                                                                  features['color_count'], features['symbolic'])}
+        if group == 'embedding':
+            return {'embedding': self.visual_embedding(ctx, features)}
+        raise ValueError(f"Ismeretlen jellemzőcsoport: {group}")
+    
+    def refresh_features(self, image_path: str, features: Dict[str, Any], groups: List[str]) -> Dict[str, Any]:
+        """Meglévő jellemzők adott csoportjainak újraszámolása, a rekord többi része változatlan
+        
+        A groups csoportok függőségi sorrendben futnak (lásd groups_with_dependents),
+        így egy függő csoport már a frissített értékeket látja.
+        """
+        try:
+            ctx = FlagContext.from_path(image_path)
+            refreshed = dict(features)
+            for group in groups:
+                refreshed.update(self.extract_group(group, ctx, refreshed))
+            return refreshed
+        except Exception as e:
+            print(f"Hiba a zászló részleges elemzésekor ({image_path}): {e}")
+            return {}
+    
+    def extractor_versions(self) -> Dict[str, str]:
+        """A jellemzőcsoportok kinyerőinek jelenlegi verziója"""
+        return {group: version for group, (version, _) in self.FEATURE_GROUPS.items()}
+    
+    def extractors_fingerprint(self) -> str:
+        """Rövid ujjlenyomat a kinyerők verzióiról (gyorsítótár kulcshoz)"""
+        encoded = json.dumps(self.extractor_versions(), sort_keys=True).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()[:12]
+    
+    def groups_with_dependents(self, groups) -> List[str]:
+        """A csoportok és (közvetve) tőlük függő csoportok, függőségi sorrendben"""
+        unknown = set(groups) - set(self.FEATURE_GROUPS)
+        if unknown:
+            raise ValueError(f"Ismeretlen jellemzőcsoport: {', '.join(sorted(unknown))} "
+                             f"(lehetséges: {', '.join(self.FEATURE_GROUPS)})")
+        
+        selected = set(groups)
+        for group, (_, depends) in self.FEATURE_GROUPS.items():
+            if selected.intersection(depends):
+                selected.add(group)
+        return [group for group in self.FEATURE_GROUPS if group in selected]
+    
+    def stale_groups(self, entry: Dict[str, Any], previous: Optional[Dict]) -> List[str]:
+        """Elavult verziójú csoportok egy különben érvényes manifest bejegyzésben
+        
+        A kinyerőverziók előtti bejegyzések a jelenlegi verziókkal készültnek számítanak.
+        """
+        previous_versions = (previous or {}).get('extractors', entry['extractors'])
+        return [group for group, version in entry['extractors'].items() if previous_versions.get(group) != version]
     
     def calculate_complexity(self, shapes: Dict, stripes: Dict, color_count: int, symbolic: Dict = None) -> float:
         """Zászló komplexitási pontszámának kiszámítása"""
@@ -929,103 +1244,319 @@ class FlagAnalyzer:
         
         return round(score, 2)
     
-    def analyze_all_flags(self) -> Dict[str, Dict]:
-        """Összes letöltött zászló elemzése"""
+    def analyze_all_flags(self, workers: int = 1, chunksize: Optional[int] = None,
+                          force: bool = False,
+                          stages: Optional[List[str]] = None, keep_checkpoint: bool = False) -> Mapping[str, Dict]:
+        """Összes letöltött zászló elemzése (workers > 1 esetén párhuzamosan)
+        
+        Csak azokat a zászlókat elemzi újra, amelyeknek a képe, az elemző
+        verziója vagy paraméterei változtak a manifest szerint (force=True
+        esetén mindet).
+        
+        A változatlan zászlóknál csak az elavult verziójú jellemzőcsoportok
+        (FEATURE_GROUPS) és a tőlük függők számolódnak újra; stages megadásakor
+        ezek a csoportok (és függőik) minden zászlón, a rekord többi része marad.
+        
+        Minden elkészült zászló azonnal egy JSONL ellenőrzőpont-sorba kerül,
+        így megszakadt futás után a befejezett zászlók kimaradnak; egy
+        megszakadt force futást a következő futás (force-szal vagy anélkül)
+        teljes újraelemzésként folytat és fejez be. Visszaadja
+        a mentett jellemzőket országkód szerint: a jellemzőtárra mutató
+        FeatureReader leképezést, amely a zászlókat a fájlból, egyenként olvassa.
+        keep_checkpoint=True esetén force mellett is átveszi az ellenőrzőpontot
+        (a futószalagos letöltés már ennek a futásnak az eredményeit írta bele).
+        """
         if not self.flags_dir.exists():
             print("Nincsenek letöltött zászlók!")
             return {}
         
-        flag_features = {}
-        flag_files = list(self.flags_dir.glob("*.png"))
-        
-        print(f"Zászlók elemzése kezdődik... ({len(flag_files)} fájl)")
-        
-        for i, flag_file in enumerate(flag_files, 1):
-            print(f"Elemzés: {flag_file.name} ({i}/{len(flag_files)})")
-            
-            # Országkód kinyerése a fájlnévből
-            country_code = flag_file.stem.split('_')[0]
+        # Rendezett lista a determinisztikus kimeneti sorrendért
+        flag_files = sorted(self.flags_dir.glob("*.png"))
+        self.groups_with_dependents(stages or [])  # ismeretlen csoport: hiba még a munka előtt
+        
+        # Megszakadt futás ellenőrzőpontja
+        checkpoint = FeatureCheckpoint(self.checkpoint_file)
+        resumed_entries = checkpoint.load()
+        
+        # Korábbi eredmények, manifest és gyorsítótár (új force futásnál tiszta
+        # lap; egy megszakadt force futás force nélkül is teljesként folytatódik)
+        if self.analysis_cache is not None:
+            self.analysis_cache.writers = max(1, workers)
+        if force and not keep_checkpoint and not checkpoint.forced:
+            if self.analysis_cache is not None:
+                self.analysis_cache.clear()
+            checkpoint.reset(force=True)
+            resumed_entries = {}
+        elif checkpoint.forced:
+            print("Megszakadt teljes újraelemzés folytatása az ellenőrzőpontról")
+        force = force or checkpoint.forced
+        existing_features = FeatureReader(None if force else features_path(self.data_dir))
+        previous_entries = {} if force else self.load_manifest().get('flags', {})
+        
+        manifest_entries = {}
+        stale_files = []
+        refresh_jobs = []
+        resumed = set()
+        for flag_file in flag_files:
+            country_code = self.extract_country_code_from_path(str(flag_file))
+            previous = previous_entries.get(country_code)
+            entry = self.fingerprint_flag(flag_file)
+            manifest_entries[country_code] = entry
             
-            # Elemzés
-            features = self.analyze_flag(str(flag_file))
-            if features:
-                flag_features[country_code] = features
-        
-        # Eredmények mentése (numpy típusok konvertálása)
-        def convert_numpy(obj):
-            if isinstance(obj, (np.integer, np.int64, np.int32)):
-                return int(obj)
-            elif isinstance(obj, (np.floating, np.float64, np.float32)):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, tuple):
-                return tuple(convert_numpy(item) for item in obj)
-            return obj
-        
-        # Rekurzív konvertálás
-        def clean_for_json(data):
-            if isinstance(data, dict):
-                return {key: clean_for_json(value) for key, value in data.items()}
-            elif isinstance(data, (list, tuple)):
-                return [clean_for_json(item) for item in data]
+            resumed_entry = resumed_entries.get(country_code)
+            if self.is_entry_current(entry, resumed_entry) and not self.stale_groups(entry, resumed_entry):
+                resumed.add(country_code)
+            elif country_code not in existing_features or not self.is_entry_current(entry, previous):
+                stale_files.append(flag_file)
             else:
-                return convert_numpy(data)
-        
-        cleaned_features = clean_for_json(flag_features)
-        
-        with open(self.features_file, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_features, f, ensure_ascii=False, indent=2)
+                # Változatlan kép: csak az elavult (vagy kért) csoportok és függőik
+                groups = self.groups_with_dependents(self.stale_groups(entry, previous) + list(stages or []))
+                if groups:
+                    refresh_jobs.append((str(flag_file), existing_features.get(country_code), groups))
+        
+        skipped = len(flag_files) - len(stale_files) - len(refresh_jobs) - len(resumed)
+        print(f"Zászlók elemzése kezdődik... ({len(stale_files)} fájl, {skipped} változatlan"
+              + (f", {len(refresh_jobs)} részleges" if refresh_jobs else "")
+              + (f", {len(resumed)} folytatva az ellenőrzőpontról)" if resumed else ")"))
+        if refresh_jobs:
+            refreshed_groups = Counter(group for _, _, groups in refresh_jobs for group in groups)
+            print("Újraszámolt csoportok: " + ", ".join(f"{group} ({count})" for group, count in refreshed_groups.items()))
+        
+        analyzed = set()
+        timings = {}
+        
+        wall_start = time.perf_counter()
+        total = len(stale_files) + len(refresh_jobs)
+        analyses = chain(self._iter_flag_analyses(stale_files, workers, chunksize),
+                         self._iter_group_refreshes(refresh_jobs, workers))
+        try:
+            for i, (image_path, features, elapsed) in enumerate(analyses, 1):
+                flag_name = Path(image_path).name
+                print(f"Elemzés: {flag_name} ({i}/{total})")
+                
+                # Országkód kinyerése a fájlnévből
+                country_code = self.extract_country_code_from_path(image_path)
+                timings[country_code] = elapsed
+                
+                # Azonnal lemezre: összeomlás esetén sem vész el
+                if features:
+                    checkpoint.append(country_code, manifest_entries[country_code], clean_for_json(features))
+                    analyzed.add(country_code)
+        finally:
+            checkpoint.close()
+        wall_time = time.perf_counter() - wall_start
+        
+        # Összefésülés a meglévő tárral, zászlónként (a lemezről törölt zászlók kimaradnak)
+        fresh = analyzed | resumed
+        stale_codes = {self.extract_country_code_from_path(str(flag_file)) for flag_file in stale_files}
+        stale_codes.update(self.extract_country_code_from_path(image_path) for image_path, _, _ in refresh_jobs)
+        
+        def merged_features():
+            for country_code in manifest_entries:
+                if country_code in fresh:
+                    yield country_code, checkpoint.get(country_code)
+                elif country_code in existing_features:
+                    yield country_code, existing_features.get(country_code)
+        
+        saved = write_features(self.data_dir, merged_features())
+        
+        # Sikertelen elemzés esetén nem kerül a manifestbe, így legközelebb újrapróbáljuk
+        manifest_entries = {
+            code: entry for code, entry in manifest_entries.items()
+            if code in fresh or (code in existing_features and code not in stale_codes)
+        }
+        self.save_manifest(manifest_entries)
+        checkpoint.reset()
+        
+        print(f"\nElemzés befejezve! {len(analyzed)} zászló elemezve, {skipped + len(resumed)} átvéve.")
+        cache = self.analysis_cache
+        if cache is not None and cache.hits:
+            # Párhuzamos futásnál a találatok a munkafolyamatokban számolódnak
+            print(f"Gyorsítótár: {cache.hits} találat, {cache.misses} új elemzés")
+        print(f"Eredmények mentve: {self.features_file} ({saved} zászló)")
+        self.print_timing_summary(timings, wall_time, workers)
+        
+        return FeatureReader(features_path(self.data_dir))
+    
+    def analysis_params(self) -> Dict[str, Any]:
+        """Az eredményeket befolyásoló elemzési paraméterek"""
+        params = {
+            'color_engine': self.color_engine,
+            'n_colors': 5,
+            'min_percentage': 1.0,
+            'working_widths': self.WORKING_WIDTHS,
+            'knowledge_base': self.knowledge.version,
+        }
+        # A _timings blokk a kimenet része, de csak kérésre (az ujjlenyomat alapból változatlan)
+        if self.record_timings:
+            params['record_timings'] = True
+        return params
+    
+    def params_fingerprint(self) -> str:
+        """Rövid ujjlenyomat az elemzési paraméterekről"""
+        encoded = json.dumps(self.analysis_params(), sort_keys=True).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()[:12]
+    
+    def fingerprint_flag(self, flag_file: Path, content: Optional[bytes] = None) -> Dict[str, Any]:
+        """Manifest bejegyzés egy zászlófájlhoz (hash, méret, verzió)
         
-        print(f"\nElemzés befejezve! {len(flag_features)} zászló elemezve.")
-        print(f"Eredmények mentve: {self.features_file}")
+        A bejegyzés csak a fájl tartalmától függ (helyi módosítási időtől
+        nem), így a manifest gépek között hordozható és a tárolóban tartható.
+        content: a fájl már memóriában lévő tartalma (a hash ebből számolódik).
+        """
+        if content is None:
+            content = flag_file.read_bytes()
         
-        return flag_features
+        return {
+            'file': flag_file.name,
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'size': len(content),
+            'analyzer_version': ANALYZER_VERSION,
+            'params': self.params_fingerprint(),
+            'extractors': self.extractor_versions(),
+        }
     
-    def load_features(self) -> Dict[str, Dict]:
-        """Mentett jellemzők betöltése"""
-        if self.features_file.exists():
-            with open(self.features_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+    def is_entry_current(self, entry: Dict[str, Any], previous: Optional[Dict]) -> bool:
+        """Igaz, ha a korábbi elemzés a jelenlegi bemenetekre is érvényes"""
+        if not previous:
+            return False
+        return all(previous.get(key) == entry[key] for key in ('sha256', 'analyzer_version', 'params'))
+    
+    def load_manifest(self) -> Dict[str, Any]:
+        """Elemzési manifest betöltése"""
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Hibás manifest, teljes újraelemzés következik: {e}")
         return {}
     
+    def save_manifest(self, entries: Dict[str, Dict]):
+        """Elemzési manifest mentése a jellemzőfájl mellé"""
+        manifest = {
+            'analyzer_version': ANALYZER_VERSION,
+            'params': self.analysis_params(),
+            'extractors': self.extractor_versions(),
+            'flags': dict(sorted(entries.items())),
+        }
+        # Determinisztikus kimenet: változatlan elemzés után a fájl is bájtra azonos
+        with open(self.manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+    
+    def save_features(self, flag_features: Dict[str, Dict]):
+        """Jellemzők mentése JSONL és JSON fájlba (numpy típusok konvertálásával)"""
+        write_features(self.data_dir, (
+            (country_code, clean_for_json(features)) for country_code, features in flag_features.items()
+        ))
+    
+    def _iter_flag_analyses(self, flag_files: List[Path], workers: int = 1,
+                            chunksize: Optional[int] = None):
+        """(útvonal, jellemzők, időtartam) hármasok a bemeneti sorrendben"""
+        paths = [str(flag_file) for flag_file in flag_files]
+        
+        if workers <= 1 or len(paths) <= 1:
+            for image_path in paths:
+                start = time.perf_counter()
+                features = self.analyze_flag(image_path)
+                yield image_path, features, time.perf_counter() - start
+            return
+        
+        # Darabolt ütemezés: munkafolyamatonként kb. négy adag
+        if chunksize is None:
+            chunksize = max(1, len(paths) // (workers * 4))
+        
+        print(f"Párhuzamos elemzés: {workers} folyamat, adagméret: {chunksize}")
+        
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            # Az executor.map a bemeneti sorrendet tartja meg
+            yield from executor.map(_analyze_flag_task, paths, chunksize=chunksize)
+    
+    def _iter_group_refreshes(self, jobs: List[Tuple[str, Dict[str, Any], List[str]]], workers: int = 1):
+        """(útvonal, jellemzők, időtartam) hármasok a részleges újraszámolásokra"""
+        if workers <= 1 or len(jobs) <= 1:
+            for image_path, features, groups in jobs:
+                start = time.perf_counter()
+                features = self.refresh_features(image_path, features, groups)
+                yield image_path, features, time.perf_counter() - start
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            yield from executor.map(_refresh_flag_task, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+    
+    def print_timing_summary(self, timings: Dict[str, float], wall_time: float, workers: int = 1):
+        """Zászlónkénti időmérés összesítése"""
+        if not timings:
+            return
+        
+        durations = np.array(list(timings.values()))
+        slowest = sorted(timings.items(), key=lambda x: x[1], reverse=True)[:5]
+        
+        print(f"\n⏱️ Időmérés ({len(durations)} zászló, {workers} folyamat):")
+        print(f"  Teljes idő: {wall_time:.2f} s")
+        print(f"  Összesített elemzési idő: {durations.sum():.2f} s")
+        print(f"  Átlag: {durations.mean() * 1000:.1f} ms | "
+              f"medián: {np.median(durations) * 1000:.1f} ms | "
+              f"p95: {np.percentile(durations, 95) * 1000:.1f} ms")
+        print("  Leglassabb zászlók:")
+        for country_code, elapsed in slowest:
+            print(f"    • {country_code}: {elapsed * 1000:.1f} ms")
+    
+    def load_features(self) -> Dict[str, Dict]:
+        """Mentett jellemzők betöltése (JSONL vagy JSON)"""
+        return load_features(self.data_dir)
+    
+    def load_columns(self) -> Optional[FeatureColumns]:
+        """Oszlopos jellemzőtár (memóriába leképezve, szükség esetén egyszer felépítve)"""
+        return FeatureColumns.load_or_build(self.data_dir)
+    
     def get_flags_by_color(self, color_name: str) -> List[str]:
         """Adott színt tartalmazó zászlók keresése"""
-        features = self.load_features()
-        matching_flags = []
-        
-        for country_code, flag_data in features.items():
-            if color_name.lower() in [c.lower() for c in flag_data.get('unique_colors', [])]:
-                matching_flags.append(country_code)
-        
-        return matching_flags
+        columns = self.load_columns()
+        if columns is None:
+            return []
+        return columns.select(columns.has_color(color_name))
     
     def get_flags_by_pattern(self, pattern: str) -> List[str]:
         """Adott mintázatú zászlók keresése"""
-        features = self.load_features()
-        matching_flags = []
+        columns = self.load_columns()
+        if columns is None:
+            return []
+        
+        pattern = pattern.lower()
+        if pattern == 'stripes':
+            mask = columns.column('stripes.has_horizontal_stripes') | columns.column('stripes.has_vertical_stripes')
+        elif pattern == 'bands':
+            mask = columns.column('stripes.has_horizontal_bands') | columns.column('stripes.has_vertical_bands')
+        elif pattern == 'stars':
+            mask = columns.column('shapes.stars') > 0
+        elif pattern == 'cross':
+            mask = columns.column('shapes.crosses') > 0
+        elif pattern == 'circle':
+            mask = columns.column('shapes.circles') > 0
+        else:
+            return []
         
-        for country_code, flag_data in features.items():
-            stripes = flag_data.get('stripes', {})
-            shapes = flag_data.get('shapes', {})
-            
-            if pattern.lower() == 'stripes':
-                if stripes.get('has_horizontal_stripes') or stripes.get('has_vertical_stripes'):
-                    matching_flags.append(country_code)
-            elif pattern.lower() == 'bands':
-                if stripes.get('has_horizontal_bands') or stripes.get('has_vertical_bands'):
-                    matching_flags.append(country_code)
-            elif pattern.lower() == 'stars':
-                if shapes.get('stars', 0) > 0:
-                    matching_flags.append(country_code)
-            elif pattern.lower() == 'cross':
-                if shapes.get('crosses', 0) > 0:
-                    matching_flags.append(country_code)
-            elif pattern.lower() == 'circle':
-                if shapes.get('circles', 0) > 0:
-                    matching_flags.append(country_code)
-        
-        return matching_flags
+        return columns.select(mask)
+    
+    def feature_statistics(self) -> Dict[str, Any]:
+        """Összesítő statisztikák az oszlopos tárból (zászlók, színek, mintázatok)"""
+        columns = self.load_columns()
+        if columns is None:
+            return {'total': 0, 'colors': Counter(), 'stripes': 0, 'bands': 0, 'stars': 0}
+        
+        return {
+            'total': len(columns),
+            'colors': columns.color_counts(),
+            'stripes': len(self.get_flags_by_pattern('stripes')),
+            'bands': len(self.get_flags_by_pattern('bands')),
+            'stars': len(self.get_flags_by_pattern('stars')),
+        }
     
     def extract_country_code_from_path(self, file_path: str) -> str:
         """Országkód kinyerése a fájl útvonalából"""
@@ -1034,35 +1565,14 @@ class FlagAnalyzer:
     def fix_crescent_detection(self, features: Dict) -> Dict:
         """Félhold felismerés javítása tudásbázis alapján"""
         
-        # Precíz félhold országok adatbázisa (CSAK valóban félholdas zászlók!)
-        crescent_countries = {
-            # Valódi félhold és csillag kombinációk (látható a zászlón)
-            'tr': 'White crescent and star on red',        # Törökország - fehér félhold és csillag piros mezőn
-            'pk': 'White crescent and star on green',      # Pakisztán - fehér félhold és csillag zöld mezőn
-            'my': 'Yellow crescent and star on blue',      # Malajzia - sárga félhold és csillag kék mezőn
-            'sg': 'White crescent and stars on red',       # Szingapúr - fehér félhold és csillagok piros mezőn
-            'dz': 'Red crescent and star on white',        # Algéria - piros félhold és csillag fehér mezőn
-            'tn': 'Red crescent and star on white',        # Tunézia - piros félhold és csillag fehér mezőn
-            'mr': 'Yellow crescent and star',              # Mauritánia - sárga félhold és csillag
-            'mv': 'White crescent on green',               # Maldív-szigetek - fehér félhold zöld mezőn
-            'ly': 'White crescent and star',               # Líbia - fehér félhold és csillag
-            'km': 'White crescent and stars',              # Comore-szigetek - fehér félhold és csillagok
-            
-            # Közép-ázsiai országok valódi félholddal
-            'az': 'White crescent and star on blue',       # Azerbajdzsán - fehér félhold és csillag kék mezőn
-            'tm': 'White crescent and stars',              # Türkmenisztán - fehér félhold és csillagok
-            'uz': 'White crescent and stars',              # Üzbegisztán - fehér félhold és csillagok
-            
-            # Délkelet-ázsiai iszlám országok
-            'bn': 'Yellow crescent on black and white'     # Brunei - sárga félhold fekete-fehér mezőn
-        }
-        
         country_code = self.extract_country_code_from_path(features.get('file_path', ''))
         
-        if country_code in crescent_countries:
+        # Precíz félhold tábla (CSAK valóban félholdas zászlók!)
+        crescent = self.knowledge.lookup('crescent', country_code)
+        if crescent is not None:
             # Csak a tudásbázisban szereplő országok kapnak félhold jelölést
             features['symbolic']['has_crescent'] = True
-            features['symbolic']['details'].append(f"Crescent: {crescent_countries[country_code]}")
+            features['symbolic']['details'].append(f"Crescent: {crescent}")
         else:
             # Minden más ország esetén töröljük a félhold jelölést
             features['symbolic']['has_crescent'] = False
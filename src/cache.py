@@ -0,0 +1,154 @@
+"""
+Gyorsítótár modul - Tartalomcímzett, méretkorlátos elemzési eredmény gyorsítótár
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+# Alapértelmezett méretkorlát; egy bejegyzés néhány kB, így ez bőven elég
+# a teljes zászlókészlet több paraméterváltozatára
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+# Kilakoltatáskor a korlát ekkora hányadáig ürül (ne fusson minden írásnál)
+EVICTION_TARGET = 0.8
+
+
+def image_digest(rgb: np.ndarray) -> str:
+    """A dekódolt pixelek tartalomhash-e (méret + RGB bájtok)
+
+    A fájl helyett a pixelek a kulcs, így az eltérően tömörített, de
+    pixelre azonos PNG-k és a memóriából dekódolt feltöltések is egyeznek.
+    """
+    digest = hashlib.sha256(np.asarray(rgb.shape, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(rgb).data)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Lemezes gyorsítótár: képtartalom + elemzőverzió + paraméterek -> jellemzők
+
+    Bejegyzésenként egy JSON fájl a kulcs első két karaktere szerinti
+    alkönyvtárban. Találatkor a fájl módosítási ideje frissül, így az
+    mtime a legutóbbi használat ideje; a korlát túllépésekor a legrégebben
+    használt bejegyzések törlődnek (LRU). Több folyamat is írhatja: az
+    írás átmeneti fájlon át atomi, a közben törölt bejegyzés egyszerű hiány.
+    A folyamatok csak a saját írásaikat látják, ezért mindegyik újraolvassa
+    a tényleges lemezhasználatot, mielőtt a legutóbbi mérés óta írt adata
+    elérné a szabad hely writers-ed részét; így együtt sem lépik túl a korlátot.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_CACHE_BYTES, writers: int = 1):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.writers = writers
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self._unsynced = 0
+
+    @staticmethod
+    def key(digest: str, analyzer_version: str, params_fingerprint: str) -> str:
+        """Gyorsítótár kulcs a tartalomhash-ből, az elemző verziójából és paramétereiből"""
+        return hashlib.sha256(f"{digest}:{analyzer_version}:{params_fingerprint}".encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> Path:
+        """Egy bejegyzés fájlja (kétkarakteres alkönyvtárakba szórva)"""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Bejegyzés kiolvasása (None, ha nincs vagy sérült); találatkor a használati idő frissül"""
+        path = self.path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Bejegyzés mentése (JSON-kompatibilis érték), szükség esetén kilakoltatással"""
+        path = self.path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            previous = path.stat().st_size if path.exists() else 0
+        except OSError:
+            previous = 0
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, path)
+            written = path.stat().st_size - previous
+        except OSError as e:
+            print(f"Nem sikerült menteni az elemzési gyorsítótárba: {e}")
+            return
+
+        if self._size is None:
+            self.sync()
+        else:
+            self._size += written
+            self._unsynced += max(0, written)
+            # A többi folyamat írásai csak a lemezről látszanak
+            headroom = self.max_bytes - (self._size - self._unsynced)
+            if self._size > self.max_bytes or self._unsynced * max(1, self.writers) >= headroom:
+                self.sync()
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def sync(self):
+        """A méretbecslés igazítása a tényleges lemezhasználathoz"""
+        self._size = self.disk_usage()
+        self._unsynced = 0
+
+    def entries(self):
+        """(mtime, méret, útvonal) minden bejegyzésre"""
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for path in self.cache_dir.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def disk_usage(self) -> int:
+        """A bejegyzések összmérete bájtban"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """A legrégebben használt bejegyzések törlése a korlát EVICTION_TARGET hányadáig"""
+        entries = sorted(self.entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+        self._size = size
+        self._unsynced = 0
+
+    def clear(self):
+        """Minden bejegyzés törlése"""
+        for _, _, path in self.entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self._size = 0
+        self._unsynced = 0
@@ -21,6 +21,7 @@ try:
     from downloader import FlagDownloader
     from analyzer import FlagAnalyzer
     from search import FlagSearchEngine
+    from sizes import SizeResolver
 except ImportError as e:
     st.error(f"Import hiba: {e}")
     st.error("Ellenőrizd, hogy a downloader.py, analyzer.py és search.py fájlok elérhetőek-e!")
@@ -29,6 +30,9 @@ except ImportError as e:
 class FlagChatInterface:
     """Párbeszédes zászlókereső felület"""
     
+    # A találati rácsban megjelenített zászlók szélessége (px)
+    FLAG_DISPLAY_WIDTH = 200
+    
     def __init__(self):
         """Inicializálás"""
         self.data_dir = Path(__file__).parent.parent / "data"
@@ -37,6 +41,7 @@ class FlagChatInterface:
         self.downloader = FlagDownloader(self.data_dir)
         self.analyzer = FlagAnalyzer(self.data_dir)
         self.search_engine = FlagSearchEngine(self.data_dir)
+        self.flag_sizes = SizeResolver(self.data_dir / "flags")
         
         # Országok betöltése
         with open(self.data_dir / "countries.json", 'r', encoding='utf-8') as f:
@@ -220,12 +225,11 @@ class FlagChatInterface:
     def display_flag_image(self, country_code: str, country_name: str) -> bool:
         """Zászló kép megjelenítése"""
         try:
-            # Keressük meg a zászló fájlt
-            flag_files = list(self.data_dir.glob(f"flags/{country_code}_*.png"))
-            if flag_files:
-                flag_path = flag_files[0]
+            # A legkisebb, a megjelenítéshez még elég széles letöltött méret
+            flag_path = self.flag_sizes.path(country_code, min_width=self.FLAG_DISPLAY_WIDTH)
+            if flag_path is not None:
                 image = Image.open(flag_path)
-                st.image(image, caption=f"{country_name} ({country_code.upper()})", width=200)
+                st.image(image, caption=f"{country_name} ({country_code.upper()})", width=self.FLAG_DISPLAY_WIDTH)
                 return True
             else:
                 st.write(f"🏳️ {country_name} ({country_code.upper()}) - Kép nem elérhető")
@@ -404,6 +408,83 @@ class FlagChatInterface:
         if total_count > 0:
             st.success(f"Minden {total_count} találat megjelenítve!")
     
+    def display_identification(self, image_bytes: bytes, k: int = 6, photo: bool = False):
+        """Feltöltött kép azonosítása: a legközelebbi zászlók távolsággal (vagy fényképen igazolt párokkal)"""
+        st.write("## 📷 Zászló felismerése")
+        
+        if photo:
+            start = time.perf_counter()
+            try:
+                matches = self.search_engine.recognize_photo(image_bytes, k)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                return
+            elapsed = (time.perf_counter() - start) * 1000
+            
+            if matches:
+                st.image(image_bytes, caption="Feltöltött kép", width=240)
+                st.caption(f"⏱️ {elapsed:.0f} ms")
+                cols_per_row = 3
+                for i in range(0, len(matches), cols_per_row):
+                    cols = st.columns(cols_per_row)
+                    for j, (code, inliers) in enumerate(matches[i:i + cols_per_row]):
+                        with cols[j]:
+                            name = self.countries.get(code, code.upper())
+                            self.display_flag_image(code, f"{i + j + 1}. {name}")
+                            st.caption(f"Igazolt párok: {inliers}")
+                return
+            st.info("Nincs geometriailag igazolt találat - képaláírás alapú keresés:")
+        
+        if self.search_engine.identification_index is None:
+            st.warning("Nincsenek vizuális beágyazások - használd az oldalsávban a 'Zászlók elemzése' gombot!")
+            return
+        
+        start = time.perf_counter()
+        try:
+            signature = self.analyzer.query_signature(image_bytes)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+        candidates = self.search_engine.identify(signature, k)
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        st.image(image_bytes, caption="Feltöltött kép", width=240)
+        st.caption(f"⏱️ {elapsed:.0f} ms")
+        
+        cols_per_row = 3
+        for i in range(0, len(candidates), cols_per_row):
+            cols = st.columns(cols_per_row)
+            for j, (code, distance) in enumerate(candidates[i:i + cols_per_row]):
+                with cols[j]:
+                    name = self.countries.get(code, code.upper())
+                    self.display_flag_image(code, f"{i + j + 1}. {name}")
+                    st.caption(f"Távolság: {distance:.4f}")
+    
+    def display_similar(self, country_code: str, k: int = 6):
+        """A kiválasztott zászlóhoz vizuálisan leghasonlóbb zászlók a mentett beágyazások alapján"""
+        country_name = self.countries.get(country_code, country_code.upper())
+        st.write(f"## 🪞 {country_name} zászlójához hasonló zászlók")
+        
+        if self.search_engine.similarity_index is None:
+            st.warning("Nincsenek vizuális beágyazások - használd az oldalsávban a 'Zászlók elemzése' gombot!")
+            return
+        
+        similar = self.search_engine.find_similar(country_code, k)
+        if not similar:
+            st.info(f"{country_name} zászlója még nincs elemezve.")
+            return
+        
+        self.display_flag_image(country_code, country_name)
+        
+        cols_per_row = 3
+        for i in range(0, len(similar), cols_per_row):
+            cols = st.columns(cols_per_row)
+            for j, (code, score) in enumerate(similar[i:i + cols_per_row]):
+                with cols[j]:
+                    name = self.countries.get(code, code.upper())
+                    self.display_flag_image(code, f"{i + j + 1}. {name}")
+                    st.caption(f"Hasonlóság: {score:.3f}")
+    
     def display_help(self):
         """Súgó megjelenítése"""
         st.write("## 🤖 Zászlókereső Súgó")
@@ -447,25 +528,20 @@ class FlagChatInterface:
     
     def display_stats(self):
         """Statisztikák megjelenítése"""
-        features = self.analyzer.load_features()
+        stats = self.analyzer.feature_statistics()
         
-        if not features:
+        if not stats['total']:
             st.warning("Nincs elemzett adat. Először elemezd a zászlókat!")
             return
         
         st.write("## 📊 Zászló Statisztikák")
         
         # Alapstatisztikák
-        total_flags = len(features)
+        total_flags = stats['total']
         st.metric("Összesen elemzett zászló", total_flags)
         
-        # Színstatisztikák
-        all_colors = []
-        for flag_data in features.values():
-            all_colors.extend(flag_data.get('unique_colors', []))
-        
-        from collections import Counter
-        color_counts = Counter(all_colors)
+        # Színstatisztikák (az oszlopos tárból, a teljes JSON betöltése nélkül)
+        color_counts = stats['colors']
         
         st.write("### Leggyakoribb színek:")
         for color, count in color_counts.most_common(10):
@@ -473,14 +549,9 @@ class FlagChatInterface:
             st.write(f"- **{color}**: {count} zászló ({percentage:.1f}%)")
         
         # Mintázat statisztikák
-        stripe_count = sum(1 for f in features.values() 
-                          if f.get('stripes', {}).get('has_horizontal_stripes') or 
-                             f.get('stripes', {}).get('has_vertical_stripes'))
-        band_count = sum(1 for f in features.values() 
-                        if f.get('stripes', {}).get('has_horizontal_bands') or 
-                           f.get('stripes', {}).get('has_vertical_bands'))
-        star_count = sum(1 for f in features.values() 
-                        if f.get('shapes', {}).get('stars', 0) > 0)
+        stripe_count = stats['stripes']
+        band_count = stats['bands']
+        star_count = stats['stars']
         
         st.write("### Mintázatok:")
         st.write(f"- **Csíkos zászlók**: {stripe_count} ({stripe_count/total_flags*100:.1f}%)")
@@ -537,6 +608,35 @@ class FlagChatInterface:
             
             st.write("---")
             
+            # Zászló felismerése feltöltött képből (a memóriában, lemezre írás nélkül)
+            st.subheader("📷 Felismerés képből")
+            uploaded_image = st.file_uploader(
+                "Tölts fel egy zászlóképet:",
+                type=['png', 'jpg', 'jpeg', 'webp', 'bmp'],
+                help="Fénykép vagy képernyőkép egy zászlóról",
+                key="identify_upload"
+            )
+            photo_mode = st.checkbox(
+                "Fénykép (forgatott, torzított kép)",
+                value=False,
+                help="Kulcspont-leírós felismerés geometriai ellenőrzéssel; lassabb, de fényképeken is működik"
+            )
+            identify_button = st.button("🔎 Melyik zászló?", disabled=uploaded_image is None)
+            
+            st.write("---")
+            
+            # Vizuálisan hasonló zászlók egy kiválasztott zászlóhoz
+            st.subheader("🪞 Hasonló zászlók")
+            similar_code = st.selectbox(
+                "Válassz egy zászlót:",
+                options=sorted(self.countries, key=lambda code: self.countries[code]),
+                format_func=lambda code: f"{self.countries[code]} ({code.upper()})",
+                key="similar_country"
+            )
+            similar_button = st.button("🪞 Hasonlók keresése")
+            
+            st.write("---")
+            
             # Terület típus szűrők
             st.subheader("🌍 Terület típusok")
             
@@ -778,6 +878,7 @@ class FlagChatInterface:
                         successful = sum(1 for success in results.values() if success)
                         st.success(f"✅ {successful} zászló letöltve!")
                         st.session_state.flags_downloaded = True
+                        self.flag_sizes.refresh()
                         st.rerun()
                     except Exception as e:
                         st.error(f"❌ Hiba: {e}")
@@ -822,6 +923,14 @@ class FlagChatInterface:
             st.session_state.show_stats = False
             return
         
+        if identify_button and uploaded_image is not None:
+            self.display_identification(uploaded_image.getvalue(), photo=photo_mode)
+            return
+        
+        if similar_button and similar_code:
+            self.display_similar(similar_code)
+            return
+        
         # Kérés feldolgozása és eredmények megjelenítése
         if search_button or st.session_state.get('example_query'):
             if st.session_state.get('example_query'):
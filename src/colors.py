@@ -0,0 +1,229 @@
+"""
+Színelnevező modul - Előre számolt színnév-keresőtábla és CIELAB konverzió
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import webcolors
+
+
+# A táblát befolyásoló szabályok verziója - szabályváltozáskor növelendő
+LUT_VERSION = 2
+
+
+@lru_cache(maxsize=1)
+def exact_color_names() -> Dict[Tuple[int, int, int], str]:
+    """Pontos CSS3 színnevek RGB szerint (a webcolors.rgb_to_name eredményével)"""
+    if hasattr(webcolors, 'names'):
+        css3_names = webcolors.names('css3')
+    else:  # webcolors < 24.6
+        css3_names = webcolors.CSS3_NAMES_TO_HEX.keys()
+
+    exact = {}
+    for name in css3_names:
+        rgb = tuple(webcolors.name_to_rgb(name))
+        exact[rgb] = webcolors.rgb_to_name(rgb)
+    return exact
+
+
+def bin_colors(bins: np.ndarray, bin_counts: np.ndarray, bin_sums: np.ndarray) -> np.ndarray:
+    """A 32x32x32-es kvantált kocka dobozainak színe: átlagszín, üres doboznál a doboz közepe
+
+    A bins dobozkódok (0..32767), a bin_counts és bin_sums ugyanezekre a
+    dobozokra vonatkozó darabszámok és csatornánkénti összegek.
+    """
+    centers = np.stack([(bins >> 10) & 31, (bins >> 5) & 31, bins & 31], axis=-1) * 8 + 4
+    counts = bin_counts[..., None]
+    return np.where(counts > 0, bin_sums / np.maximum(counts, 1), centers)
+
+
+class ColorNameLUT:
+    """Színkategória-keresőtábla egy 32x32x32-es kvantált RGB kockán
+
+    A kategóriák a FlagAnalyzer.get_color_name szabályait követik pontosan:
+    legközelebbi kategóriaszín RGB távolsággal, majd a fekete, kék és zöld
+    különszabályok a szín tényleges értékére. Egy cella 512 színe közül
+    azok, amelyek mind ugyanabba a kategóriába esnek, a kategóriát kapják;
+    a kategóriahatáron átnyúló (vegyes) cellák színei a szabályokkal,
+    pontosan számolódnak. A táblát egyszer kell felépíteni, utána egész
+    NumPy tömbök egy indexeléssel (és a vegyes cellák kis részén egy
+    vektorizált számítással) elnevezhetők.
+    """
+
+    BITS = 5
+    SIZE = 1 << BITS
+    SHIFT = 8 - BITS
+
+    # Vegyes cella jelölése a táblában
+    MIXED = 255
+
+    def __init__(self, color_categories: Dict[str, List[Tuple[int, int, int]]], table: Optional[np.ndarray] = None):
+        self.color_categories = color_categories
+        self.names = tuple(color_categories)
+
+        # Kategóriaszínek a bejárás sorrendjében (azonos távolságnál az első nyer)
+        reference_colors, reference_labels = [], []
+        for index, category_colors in enumerate(color_categories.values()):
+            reference_colors.extend(category_colors)
+            reference_labels.extend([index] * len(category_colors))
+        self.reference_colors = np.array(reference_colors, dtype=np.int32)
+        self.reference_labels = np.array(reference_labels, dtype=np.uint8)
+
+        self.table = table if table is not None else self.build()
+
+    @classmethod
+    def load_or_build(cls, color_categories: Dict[str, List[Tuple[int, int, int]]],
+                      cache_dir: Optional[Path] = None) -> 'ColorNameLUT':
+        """Tábla betöltése a lemezes gyorsítótárból, vagy felépítése és mentése"""
+        if cache_dir is None:
+            return cls(color_categories)
+
+        cache_file = Path(cache_dir) / f"color_lut_{cls.fingerprint(color_categories)}.npy"
+        if cache_file.exists():
+            try:
+                table = np.load(cache_file)
+                if table.shape == (cls.SIZE, cls.SIZE, cls.SIZE):
+                    return cls(color_categories, table)
+            except (OSError, ValueError) as e:
+                print(f"Hibás színtábla gyorsítótár, újraépítés: {e}")
+
+        lut = cls(color_categories)
+        try:
+            # Ideiglenes fájlon át, hogy párhuzamos folyamatok ne lássanak félkész táblát
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_name(f"{cache_file.stem}.{os.getpid()}.tmp")
+            with open(tmp_file, 'wb') as f:
+                np.save(f, lut.table)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Nem sikerült menteni a színtáblát: {e}")
+        return lut
+
+    @staticmethod
+    def fingerprint(color_categories: Dict[str, List[Tuple[int, int, int]]]) -> str:
+        """Kategóriák és szabályverzió ujjlenyomata (gyorsítótár kulcs)"""
+        payload = json.dumps({'version': LUT_VERSION, 'categories': color_categories}, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def to_lab(rgb: np.ndarray) -> np.ndarray:
+        """RGB (0-255) színek CIELAB térbe"""
+        rgb = np.asarray(rgb, dtype=np.float32).reshape(-1, 1, 3) / 255.0
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2Lab).reshape(-1, 3)
+
+    def category(self, name: str) -> int:
+        """Kategória indexe (-1, ha nincs ilyen kategória)"""
+        return self.names.index(name) if name in self.names else -1
+
+    def nearest(self, rgb: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """A legközelebbi kategóriaszín és a legközelebbi nem fekete kategóriaszín indexe (N, 3) színekre"""
+        rgb = np.asarray(rgb, dtype=np.float64).reshape(-1, 3)
+        # Négyzetes RGB távolság a színenként állandó |rgb|^2 tag nélkül (a
+        # legközelebbi és az azonos távolságok sorrendje így is ugyanaz); a
+        # kis egészek szorzatösszege float64-ben is pontos
+        reference = self.reference_colors.astype(np.float64)
+        distances = (reference ** 2).sum(axis=1)[None, :] - 2 * (rgb @ reference.T)
+        closest = np.argmin(distances, axis=1)
+
+        distances[:, self.reference_labels == self.category('black')] = np.inf
+        second = np.argmin(distances, axis=1)
+        return closest, second
+
+    @staticmethod
+    def rule_conditions(rgb: np.ndarray) -> List[np.ndarray]:
+        """A különszabályok lineáris feltételei (N, 3) színekre, a get_color_name küszöbeivel"""
+        rgb = np.asarray(rgb, dtype=np.int32).reshape(-1, 3)
+        r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+        return [
+            r < 40, g < 40, b < 40,
+            b > r, b > g, b > 180, b > 120, r + g < 200, r > 100, g > 100,
+            g > r, g > b, g > 180, r + b < 200, b > 100,
+        ]
+
+    def classify(self, rgb: np.ndarray) -> np.ndarray:
+        """Kategóriaindexek (N,) pontosan a get_color_name szabályaival, (N, 3) RGB színekre"""
+        closest, second = self.nearest(rgb)
+        labels = self.reference_labels[closest]
+
+        # A fekete kategória csak a nagyon sötét színeké: különben a második
+        # legközelebbi (nem fekete) kategória
+        is_black = labels == self.category('black')
+        labels[is_black] = self.reference_labels[second[is_black]]
+
+        (r_dark, g_dark, b_dark, b_over_r, b_over_g, b_bright, b_medium, rg_low, r_light, g_light,
+         g_over_r, g_over_b, g_bright, rb_low, b_light) = self.rule_conditions(rgb)
+        light_blue = b_over_r & b_over_g & b_bright & rg_low
+        light_green = g_over_r & g_over_b & g_bright & rb_low
+
+        # A szabályok a get_color_name sorrendjében: az első találat nyer
+        rules = [
+            (r_dark & g_dark & b_dark, 'black'),
+            (light_blue & (r_light | g_light), 'lightblue'),
+            (light_blue, 'darkblue'),
+            (b_over_r & b_over_g & b_medium, 'blue'),
+            (light_green & (r_light | b_light), 'lightgreen'),
+            (light_green, 'darkgreen'),
+        ]
+        assigned = np.zeros(len(labels), dtype=bool)
+        for mask, name in rules:
+            value = self.category(name)
+            if value < 0:
+                continue
+            mask = mask & ~assigned
+            labels[mask] = value
+            assigned |= mask
+        return labels
+
+    def build(self) -> np.ndarray:
+        """Tábla felépítése a cellák sarokszíneiből
+
+        A legközelebbi kategóriaszín tartománya és a különszabályok
+        feltételei (féltereik) konvexek, így ha egy cella mind a 8 sarka
+        ugyanazt a legközelebbi és második legközelebbi színt adja, és
+        ugyanazokat a feltételeket teljesíti, akkor a cella minden színe is:
+        a cella egységes. A többi cella vegyes, színei kereséskor pontosan
+        számolódnak.
+        """
+        step = 1 << self.SHIFT
+        starts = np.arange(self.SIZE) * step
+        axis = np.stack([starts, starts + step - 1], axis=1).ravel()
+        corners = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+
+        closest, second = self.nearest(corners)
+        # A második legközelebbi szín csak fekete legközelebbinél számít
+        second = np.where(self.reference_labels[closest] == self.category('black'), second, -1)
+        signature = closest.astype(np.int64) * (len(self.reference_colors) + 1) + second + 1
+        for bit, condition in enumerate(self.rule_conditions(corners)):
+            signature = signature | (condition.astype(np.int64) << (16 + bit))
+
+        shape = (self.SIZE, 2, self.SIZE, 2, self.SIZE, 2)
+        signature = signature.reshape(shape)
+        uniform = (signature == signature[:, :1, :, :1, :, :1]).all(axis=(1, 3, 5))
+        labels = self.classify(corners).reshape(shape)[:, 0, :, 0, :, 0]
+        return np.where(uniform, labels, self.MIXED).astype(np.uint8)
+
+    def lookup(self, rgb: np.ndarray) -> np.ndarray:
+        """Kategóriaindexek tetszőleges alakú (..., 3) RGB tömbre
+
+        Egy indexelés a táblán; csak a vegyes cellákba eső színek
+        számolódnak a szabályokkal.
+        """
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        quantized = rgb >> self.SHIFT
+        indices = self.table[quantized[..., 0], quantized[..., 1], quantized[..., 2]]
+        mixed = indices == self.MIXED
+        if mixed.any():
+            indices = np.array(indices, copy=True)
+            indices[mixed] = self.classify(rgb[mixed])
+        return indices
+
+    def name(self, rgb_color: Sequence[int]) -> str:
+        """Egyetlen szín kategórianeve"""
+        return self.names[int(self.lookup(np.array(rgb_color[:3])))]
@@ -0,0 +1,182 @@
+"""
+Elemzési környezet modul - Zászlónkénti, egyszer dekódolt kép és lustán számolt pufferek
+"""
+
+from functools import cached_property
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def downsample(image: np.ndarray, level: int = 1) -> np.ndarray:
+    """Kicsinyítés 2**level-ed részére minden 2**level-edik sor és oszlop megtartásával
+
+    A zászlók egyszínű felületekből állnak: a ritkítás nem kever új
+    átmeneti színeket a képbe (a területátlaggal szemben), így a paletta és
+    a sávszínek a teljes felbontásúéval egyeznek, csak kevesebb pixelből.
+    A ritkítás összetehető, ezért bármely szint közvetlenül a teljes képből
+    készül (páratlan méretnél felfelé kerekítve, mint a szintenkénti felezés).
+    """
+    step = 2 ** level
+    return np.ascontiguousarray(image[::step, ::step])
+
+
+class FlagContext:
+    """Egy zászló elemzési környezete
+
+    A képet egyszer dekódolja (csak RGB példány marad a memóriában), a
+    származtatott puffereket (szürkeárnyalat, élkép, Otsu maszkok,
+    piramisszintek, palettacímkék) első használatkor számolja és megjegyzi,
+    így egyetlen konverzió sem fut kétszer.
+    """
+
+    def __init__(self, rgb: Optional[np.ndarray] = None, image_path: str = "",
+                 gray: Optional[np.ndarray] = None):
+        if rgb is None and gray is None:
+            raise ValueError("Üres elemzési környezet: nincs kép megadva")
+
+        self.rgb = rgb
+        self.image_path = str(image_path)
+        self._memo: Dict[Hashable, Any] = {}
+
+        # Piramisszint: a teljes felbontású környezet és a szint sorszáma
+        self.root = self
+        self.level = 0
+
+        # Csak szürkeárnyalatos bemenet (pl. régi detektorhívások)
+        if gray is not None:
+            self.__dict__['gray'] = gray
+
+    @classmethod
+    def from_path(cls, image_path: str) -> 'FlagContext':
+        """Környezet képfájlból"""
+        image = cv2.imread(str(image_path))
+        if image is None:
+            raise ValueError(f"Nem sikerült betölteni a képet: {image_path}")
+
+        # BGR -> RGB helyben, hogy ne maradjon két példány a memóriában
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        return cls(image, image_path)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, image_path: str = "", min_width: int = 0) -> 'FlagContext':
+        """Környezet memóriában lévő képfájlból (pl. feltöltésből), lemezre írás nélkül
+
+        min_width megadásakor a dekódoló eleve kicsinyít (JPEG-nél 1/2, 1/4
+        vagy 1/8 méretre), amíg a kép legalább ilyen széles marad; egy nagy
+        fényképnél így a dekódolás ideje is töredékére csökken.
+        """
+        flags = cv2.IMREAD_COLOR
+        if min_width:
+            try:
+                with Image.open(BytesIO(data)) as header:
+                    width = header.size[0]
+            except OSError:
+                width = 0
+            for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                    (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if width // factor >= min_width:
+                    flags = reduced
+                    break
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+        if image is None:
+            raise ValueError(f"Nem sikerült dekódolni a képet: {image_path or f'{len(data)} bájt'}")
+
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        return cls(image, image_path)
+
+    @classmethod
+    def from_array(cls, image: np.ndarray) -> 'FlagContext':
+        """Környezet már betöltött RGB vagy szürkeárnyalatos tömbből"""
+        if image.ndim == 2:
+            return cls(gray=image)
+        return cls(image)
+
+    @property
+    def country_code(self) -> str:
+        """Országkód a fájlnévből ({kód}_{név}.png)"""
+        return Path(self.image_path).stem.split('_')[0]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(magasság, szélesség)"""
+        source = self.rgb if self.rgb is not None else self.gray
+        return source.shape[:2]
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        """Szürkeárnyalatos kép"""
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+
+    @cached_property
+    def edges(self) -> np.ndarray:
+        """Canny élkép a szürkeárnyalatos képből"""
+        return cv2.Canny(self.gray, 30, 100, apertureSize=3)
+
+    def otsu(self, x1: int = 0, y1: int = 0, x2: Optional[int] = None, y2: Optional[int] = None) -> np.ndarray:
+        """Otsu küszöbölt bináris maszk a szürkeárnyalatos kép egy téglalapjára"""
+        height, width = self.shape
+        x2 = width if x2 is None else x2
+        y2 = height if y2 is None else y2
+
+        def threshold():
+            _, mask = cv2.threshold(self.gray[y1:y2, x1:x2], 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return mask
+
+        return self.memo(('otsu', x1, y1, x2, y2), threshold)
+
+    def pyramid(self, level: int) -> np.ndarray:
+        """RGB (vagy szürkeárnyalatos) kép a piramis adott szintjén, ehhez a környezethez képest
+
+        Minden szint az előző fele (lásd downsample); a szintek a zászló
+        teljes felbontású környezetében jegyződnek meg, bármely szintről kérik.
+        """
+        if self.root is not self:
+            return self.root.pyramid(self.level + level)
+        if level <= 0:
+            return self.rgb if self.rgb is not None else self.gray
+        return self.memo(('pyramid', level), lambda: downsample(self.pyramid(0), level))
+
+    def level_for_width(self, min_width: int) -> int:
+        """A piramis legdurvább szintje (ehhez a környezethez képest), amely még legalább min_width széles"""
+        level, width = 0, self.shape[1]
+        while (width + 1) // 2 >= min_width:
+            width = (width + 1) // 2
+            level += 1
+        return level
+
+    def at_level(self, level: int) -> 'FlagContext':
+        """Elemzési környezet a piramis adott szintjén, saját megjegyzett pufferekkel"""
+        if level <= 0:
+            return self
+        if self.root is not self:
+            return self.root.at_level(self.level + level)
+
+        def build():
+            image = self.pyramid(level)
+            if image.ndim == 2:
+                ctx = FlagContext(image_path=self.image_path, gray=image)
+            else:
+                ctx = FlagContext(image, self.image_path)
+            ctx.root, ctx.level = self, level
+            return ctx
+
+        return self.memo(('level', level), build)
+
+    def at_width(self, min_width: int) -> 'FlagContext':
+        """A legkisebb, még legalább min_width széles piramisszint környezete
+
+        Az ennél keskenyebb képek környezete önmaga, így a hívás idempotens.
+        """
+        return self.at_level(self.level_for_width(min_width))
+
+    def memo(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Tetszőleges származtatott adat számítása egyszer, kulcs szerint"""
+        if key not in self._memo:
+            self._memo[key] = factory()
+        return self._memo[key]
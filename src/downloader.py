@@ -1,51 +1,306 @@
 """
-Zászlóletöltő modul - Világzászlók letöltése a flagcdn.com API-ról
+Zászlóletöltő modul - Világzászlók letöltése a flagcdn.com API-ról (vagy más zászlóforrásból)
 """
 
 import asyncio
-import aiohttp
 import aiofiles
+import hashlib
 import json
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 from tqdm.asyncio import tqdm
-import requests
+
+try:
+    from .sizes import pick_source, resample_flag
+    from .sources import FlagSource, HttpFlagSource, header_value
+except ImportError:
+    from sizes import pick_source, resample_flag
+    from sources import FlagSource, HttpFlagSource, header_value
+
+
+# Átmeneti hibát jelző HTTP státuszok: ezekre újrapróbálkozás jár
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class RetryPolicy:
+    """Exponenciális visszalépés véletlen szórással az átmeneti hibák újrapróbálásához
+    
+    Az n-edik sikertelen próbálkozás után a várakozás a
+    [cap/2, cap] intervallumból sorsolt, ahol cap = min(max_delay, base_delay * 2^n);
+    a szórás miatt az egyszerre elbukott kérések nem egyszerre térnek vissza.
+    Ha a szerver Retry-After fejlécet küld (429/503), az az irányadó.
+    """
+    
+    def __init__(self, retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 seed: Optional[int] = None):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.random = random.Random(seed)
+    
+    def delay(self, attempt: int, headers: Optional[Dict[str, str]] = None) -> float:
+        """Várakozás másodpercben az attempt-edik (0-tól számolt) sikertelen próbálkozás után"""
+        retry_after = header_value(headers, 'Retry-After')
+        if retry_after is not None:
+            try:
+                return min(self.max_delay, max(0.0, float(retry_after)))
+            except ValueError:
+                pass  # HTTP-dátum formátum: a szokásos visszalépés
+        
+        cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return self.random.uniform(cap / 2, cap)
+
+
+class AdaptiveConcurrency:
+    """AIMD párhuzamosság-szabályozó (a TCP torlódáskezelésének mintájára)
+    
+    A limit lassú indítással körönként duplázódik az első torlódási jelig,
+    utána körönként (limitnyi sikeres kérés) eggyel nő. Torlódási jel a 429
+    válasz (a szerver kifejezett visszaszorítása), ha az átmeneti hibák
+    (5xx, időtúllépés) mozgóátlagos aránya ERROR_TOLERANCE fölé nő - az
+    elszórt, terheléstől független hibák így nem fojtják vissza a letöltést -,
+    valamint ha a késleltetés mozgóátlaga a megfigyelt legkisebb késleltetés
+    LATENCY_TOLERANCE-szorosa (és legalább LATENCY_SLACK másodperccel több)
+    fölé nő; ilyenkor a limit feleződik. A csökkentés után csak a később
+    indult kérések jelzése számít, így egy hibasorozat egyetlen felezést
+    okoz, nem nullázza le a limitet.
+    adaptive=False esetén a limit rögzített (a korábbi viselkedés).
+    """
+    
+    LATENCY_TOLERANCE = 3.0
+    LATENCY_SLACK = 0.05
+    ERROR_TOLERANCE = 0.1
+    INITIAL_LIMIT = 4
+    
+    def __init__(self, maximum: int, minimum: int = 1, adaptive: bool = True):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.adaptive = adaptive
+        self.limit = max(self.minimum, min(self.INITIAL_LIMIT, self.maximum)) if adaptive else self.maximum
+        self.peak = self.limit
+        self.decreases = 0
+        self.in_flight = 0
+        self.slow_start = True
+        self.base_latency: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self._issued = 0
+        self._recovery_ticket = 0
+        self._round_successes = 0
+        self._condition = asyncio.Condition()
+    
+    async def acquire(self) -> int:
+        """Várakozás egy szabad helyre; a visszaadott sorszám a release-hez kell"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self._issued += 1
+            return self._issued
+    
+    async def release(self, ticket: int, latency: Optional[float] = None,
+                      error: bool = False, throttled: bool = False):
+        """Hely felszabadítása a kérés késleltetésével és kimenetelével
+        
+        error: átmeneti hiba (5xx, időtúllépés); throttled: 429 válasz.
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if self.adaptive:
+                self._update(ticket, latency, error, throttled)
+            self._condition.notify_all()
+    
+    def _update(self, ticket: int, latency: Optional[float], error: bool, throttled: bool):
+        failed = error or throttled
+        self.error_rate = 0.95 * self.error_rate + (0.05 if failed else 0.0)
+        congested = throttled or (error and self.error_rate > self.ERROR_TOLERANCE)
+        if latency is not None and not failed:
+            self.base_latency = latency if self.base_latency is None else min(self.base_latency, latency)
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            threshold = max(self.base_latency * self.LATENCY_TOLERANCE, self.base_latency + self.LATENCY_SLACK)
+            congested = self.latency > threshold
+        
+        if congested:
+            # Felezés csak a legutóbbi csökkentés után indult kérések jelzésére
+            if ticket > self._recovery_ticket:
+                self.limit = max(self.minimum, self.limit // 2)
+                self.slow_start = False
+                self.decreases += 1
+                self._recovery_ticket = self._issued
+                self._round_successes = 0
+            return
+        if failed:
+            return
+        
+        self._round_successes += 1
+        if self._round_successes >= self.limit:
+            self._round_successes = 0
+            self.limit = min(self.maximum, self.limit * 2 if self.slow_start else self.limit + 1)
+            self.peak = max(self.peak, self.limit)
+
+
+class DownloadStats:
+    """Egy letöltési futás számlálói az élő és a végső összesítéshez"""
+    
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.done = 0
+        self.succeeded = 0
+        self.skipped = 0
+        self.not_modified = 0
+        self.updated = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+    
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+    
+    def rate(self) -> float:
+        """Befejezett zászlók másodpercenként"""
+        return self.done / self.elapsed if self.elapsed else 0.0
+    
+    def mb_per_second(self) -> float:
+        return self.bytes / (1024 * 1024) / self.elapsed if self.elapsed else 0.0
+
+
+class DownloadManifest:
+    """Letöltési manifest: letöltött elemenként ETag, Last-Modified, tartalomhash és méret
+    
+    Kulcsa "{méret}/{országkód}" a zászlóknál és "codes" az országkódlistánál.
+    A validátorokkal a következő letöltés feltételes kérést küldhet
+    (If-None-Match, If-Modified-Since), így a változatlan elem egy 304-es
+    válaszba kerül; a hash alapján a tartalmilag azonos újraletöltés sem
+    írja felül a fájlt (és nem indít újraelemzést).
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    self.entries = data.get('entries', {})
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Hibás letöltési manifest, figyelmen kívül hagyva: {e}")
+    
+    def get(self, key: str) -> Optional[Dict]:
+        return self.entries.get(key)
+    
+    def record(self, key: str, content: bytes, headers: Dict[str, str], **extra) -> Dict:
+        """Bejegyzés egy 200-as válasz tartalmából és validátoraiból"""
+        entry = {
+            'etag': header_value(headers, 'ETag'),
+            'last_modified': header_value(headers, 'Last-Modified'),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'size': len(content),
+            'checked': datetime.now().isoformat(timespec='seconds'),
+        }
+        entry.update(extra)
+        self.entries[key] = entry
+        return entry
+    
+    def touch(self, key: str):
+        """Sikeres újraellenőrzés (304) időpontja"""
+        if key in self.entries:
+            self.entries[key]['checked'] = datetime.now().isoformat(timespec='seconds')
+    
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Feltételes kérésfejlécek egy bejegyzés validátoraiból"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def save(self):
+        """Manifest mentése (átmeneti fájlon át)"""
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'entries': self.entries}, f,
+                          ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Nem sikerült menteni a letöltési manifestet: {e}")
 
 
 class FlagDownloader:
-    """Zászlóletöltő osztály a flagcdn.com API használatával"""
+    """Zászlóletöltő osztály a flagcdn.com API (vagy egy megadott zászlóforrás) használatával"""
     
-    def __init__(self, base_dir: str = "data"):
+    def __init__(self, base_dir: str = "data", source: Optional[FlagSource] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
         self.base_dir = Path(base_dir)
         self.flags_dir = self.base_dir / "flags"
         self.countries_file = self.base_dir / "countries.json"
+        self.manifest_file = self.base_dir / "download_manifest.json"
+        
+        # Zászlóforrás: alapból a flagcdn.com, de helyi tükör vagy szerver is lehet
+        self.source = source or HttpFlagSource()
+        self.retry_policy = retry_policy or RetryPolicy()
         
-        # API URL-ek
-        self.codes_url = "https://flagcdn.com/en/codes.json"
-        self.flag_base_url = "https://flagcdn.com"
+        # A legutóbbi download_all_flags futás számlálói és párhuzamosság-szabályozója
+        self.stats: Optional[DownloadStats] = None
+        self.concurrency: Optional[AdaptiveConcurrency] = None
         
         # Létrehozzuk a könyvtárakat
         self._create_directories()
+        self.manifest = DownloadManifest(self.manifest_file)
     
     def _create_directories(self):
         """Szükséges könyvtárak létrehozása"""
         self.base_dir.mkdir(exist_ok=True)
         self.flags_dir.mkdir(exist_ok=True)
     
-    def get_country_codes(self) -> Dict[str, str]:
-        """Országkódok és nevek letöltése"""
+    def get_country_codes(self, refresh: bool = False) -> Dict[str, str]:
+        """Országkódok és nevek letöltése
+        
+        A lista a countries.json fájlban gyorsítótárazott: ha ugyanabból a
+        forrásból már letöltöttük, újra nem kérjük le; refresh=True esetén
+        feltételes kéréssel ellenőrizzük (változatlan lista: 304).
+        """
+        entry = self.manifest.get('codes')
+        cached = (self.countries_file.exists() and entry is not None
+                  and entry.get('source') == self.source.describe())
         try:
-            print("Országkódok letöltése...")
-            response = requests.get(self.codes_url, timeout=10)
-            response.raise_for_status()
+            if cached and not refresh:
+                with open(self.countries_file, 'r', encoding='utf-8') as f:
+                    codes = json.load(f)
+                print(f"Országkódok a gyorsítótárból ({self.countries_file}): {len(codes)} ország")
+                return codes
             
-            codes = response.json()
+            print(f"Országkódok letöltése ({self.source.describe()})...")
+            status, content, headers = self.source.fetch_codes(
+                DownloadManifest.conditional_headers(entry) if cached else None)
+            if status == 304:
+                with open(self.countries_file, 'r', encoding='utf-8') as f:
+                    codes = json.load(f)
+                self.manifest.touch('codes')
+                print(f"Az országkódlista nem változott: {len(codes)} ország")
+                return codes
+            if status != 200:
+                raise RuntimeError(f"HTTP {status}")
+            
+            codes = json.loads(content.decode('utf-8'))
             print(f"Összesen {len(codes)} ország található")
             
             # Mentjük a countries.json fájlba
             with open(self.countries_file, 'w', encoding='utf-8') as f:
                 json.dump(codes, f, ensure_ascii=False, indent=2)
+            self.manifest.record('codes', content, headers, source=self.source.describe())
+            self.manifest.save()
             
             return codes
             
@@ -59,88 +314,264 @@ class FlagDownloader:
             
             return {}
     
-    async def download_flag(self, session: aiohttp.ClientSession, 
-                          country_code: str, country_name: str,
-                          size: str = "w320") -> Tuple[str, bool]:
-        """Egyetlen zászló letöltése"""
-        try:
-            # Fájlnév generálása
-            filename = f"{country_code}_{country_name.replace(' ', '_')}.png"
-            filepath = self.flags_dir / filename
+    def flag_path(self, country_code: str, country_name: str, size: Optional[str] = None) -> Path:
+        """Egy zászló fájlja: az elsődleges méret a flags/ könyvtárban, a többi a flags/{méret}/ alatt"""
+        filename = f"{country_code}_{country_name.replace(' ', '_')}.png"
+        if size is None:
+            return self.flags_dir / filename
+        return self.flags_dir / size / filename
+    
+    async def download_flag(self, country_code: str, country_name: str, size: str = "w320",
+                            limiter: Optional[AdaptiveConcurrency] = None,
+                            filepath: Optional[Path] = None, refresh: bool = False,
+                            on_saved: Optional[Callable[[Path, bytes], None]] = None) -> Tuple[str, bool]:
+        """Egyetlen zászló letöltése, átmeneti hibáknál visszalépéses újrapróbálkozással
+        
+        A limiter (ha meg van adva) minden próbálkozást külön enged át, és
+        megkapja a késleltetést és a torlódási jelet; a visszalépés alatt a
+        hely szabad, így más letöltések haladhatnak. refresh=True esetén a
+        meglévő fájl is újraellenőrződik: ha a manifestben vannak
+        validátorai, feltételes kéréssel (változatlan zászló: 304), és a
+        fájl csak akkor íródik felül, ha a tartalma tényleg megváltozott.
+        Az on_saved minden ténylegesen (újra)írt fájlra megkapja az útvonalat
+        és a tartalmat (pl. futószalagos elemzéshez).
+        """
+        filepath = filepath or self.flag_path(country_code, country_name)
+        key = f"{size}/{country_code}"
+        exists = filepath.exists()
+        
+        # Ha már létezik, kihagyjuk (frissítéskor újraellenőrizzük)
+        if exists and not refresh:
+            if self.stats is not None:
+                self.stats.skipped += 1
+            return country_code, True
+        
+        # Feltételes kérés csak ép (a manifest szerinti méretű) helyi fájlra
+        entry = self.manifest.get(key)
+        intact = exists and entry is not None and entry.get('size') == filepath.stat().st_size
+        request_headers = DownloadManifest.conditional_headers(entry) if intact else {}
+        
+        policy = self.retry_policy
+        for attempt in range(policy.retries + 1):
+            ticket = await limiter.acquire() if limiter is not None else 0
+            status, content, headers, error = 0, b'', {}, None
+            start = time.perf_counter()
+            try:
+                status, content, headers = await self.source.fetch_flag(country_code, size,
+                                                                        request_headers or None)
+            except self.source.transient_errors as e:
+                error = e
+            except Exception as e:
+                print(f"Hiba {country_code} ({country_name}) letöltésekor: {e}")
+                return country_code, False
+            finally:
+                transient = error is not None or status in RETRY_STATUSES
+                if limiter is not None:
+                    await limiter.release(ticket, time.perf_counter() - start,
+                                          error=transient and status != 429, throttled=status == 429)
             
-            # Ha már létezik, kihagyjuk
-            if filepath.exists():
+            if status == 304 and intact:
+                self.manifest.touch(key)
+                if self.stats is not None:
+                    self.stats.not_modified += 1
                 return country_code, True
             
-            # URL összeállítása
-            flag_url = f"{self.flag_base_url}/{size}/{country_code}.png"
-            
-            async with session.get(flag_url) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    
-                    async with aiofiles.open(filepath, 'wb') as f:
-                        await f.write(content)
-                    
-                    return country_code, True
+            if status == 200:
+                digest = hashlib.sha256(content).hexdigest()
+                if exists:
+                    current = entry['sha256'] if intact else hashlib.sha256(filepath.read_bytes()).hexdigest()
+                    changed = current != digest
                 else:
-                    print(f"Hiba {country_code} letöltésekor: HTTP {response.status}")
+                    changed = True
+                try:
+                    if changed:
+                        async with aiofiles.open(filepath, 'wb') as f:
+                            await f.write(content)
+                except OSError as e:
+                    print(f"Hiba {country_code} mentésekor: {e}")
                     return country_code, False
-                    
-        except Exception as e:
-            print(f"Hiba {country_code} ({country_name}) letöltésekor: {e}")
-            return country_code, False
+                if changed and on_saved is not None:
+                    on_saved(filepath, content)
+                self.manifest.record(key, content, headers, path=str(filepath.relative_to(self.base_dir)))
+                if self.stats is not None:
+                    self.stats.bytes += len(content)
+                    if exists and changed:
+                        self.stats.updated += 1
+                    elif exists:
+                        self.stats.not_modified += 1
+                return country_code, True
+            
+            if not transient or attempt == policy.retries:
+                break
+            if self.stats is not None:
+                self.stats.retries += 1
+            await asyncio.sleep(policy.delay(attempt, headers))
+        
+        reason = f"{type(error).__name__}: {error}" if error is not None else f"HTTP {status}"
+        print(f"Hiba {country_code} letöltésekor: {reason}")
+        return country_code, False
     
-    async def download_all_flags(self, size: str = "w320", 
-                               max_concurrent: int = 10) -> Dict[str, bool]:
-        """Összes zászló letöltése aszinkron módon"""
+    async def download_all_flags(self, size: str = "w320", max_concurrent: int = 10,
+                                 extra_sizes: Sequence[str] = (), derive_sizes: Sequence[str] = (),
+                                 adaptive: bool = True,
+                                 progress: bool = True, refresh: bool = False,
+                                 on_flag: Optional[Callable[[Path, bytes], None]] = None) -> Dict[str, bool]:
+        """Összes zászló letöltése aszinkron munkáskészlettel
+        
+        A letöltési feladatok (ország x méret) egy korlátos asyncio.Queue-n át
+        jutnak max_concurrent munkáshoz, így a memóriahasználat a feladatok
+        számától (akár több tízezer kép) független. Az egyidejű kérések számát
+        az AdaptiveConcurrency a késleltetés és a hibaarány szerint
+        1 és max_concurrent között szabályozza (adaptive=False: rögzített
+        max_concurrent); az átmeneti hibák (429/5xx, időtúllépés) a
+        RetryPolicy szerint újrapróbálódnak. A `size` méret a flags/
+        könyvtárba, az extra_sizes méretei a flags/{méret}/ alá kerülnek; a
+        derive_sizes méretei (és a letöltendők közül a forrásból hiányzók)
+        ugyanebben a menetben, helyi átméretezéssel készülnek (derive_sizes()).
+        A meglévő fájlok kimaradnak; refresh=True esetén mind feltételes
+        kéréssel újraellenőrződik (lásd DownloadManifest). Az on_flag a
+        `size` méretű, ténylegesen letöltött zászlókra hívódik meg a fájl
+        útvonalával és tartalmával (lásd AnalysisPipeline).
+        
+        Visszatérés: országkód -> siker (a többi méretnél "{méret}/{kód}" kulccsal).
+        """
         
         # Országkódok beszerzése
-        countries = self.get_country_codes()
+        countries = self.get_country_codes(refresh=refresh)
         if not countries:
             print("Nem sikerült az országkódokat letölteni!")
             return {}
         
-        print(f"\nZászlók letöltése kezdődik ({size} méret)...")
-        print(f"Egyidejű letöltések száma: {max_concurrent}")
+        sizes = list(dict.fromkeys([size, *extra_sizes]))
+        for extra in dict.fromkeys([*sizes[1:], *derive_sizes]):
+            if extra != size:
+                (self.flags_dir / extra).mkdir(exist_ok=True)
         
-        # Aszinkron letöltés
-        connector = aiohttp.TCPConnector(limit=max_concurrent)
-        timeout = aiohttp.ClientTimeout(total=30)
+        print(f"\nZászlók letöltése kezdődik ({', '.join(sizes)} méret)...")
+        print(f"Egyidejű letöltések száma: {'legfeljebb ' if adaptive else ''}{max_concurrent}")
         
-        async with aiohttp.ClientSession(
-            connector=connector, 
-            timeout=timeout
-        ) as session:
-            
-            # Létrehozzuk a feladatokat
-            tasks = [
-                self.download_flag(session, code, name, size)
-                for code, name in countries.items()
-            ]
-            
-            # Végrehajtjuk progress bar-ral
-            results = {}
-            
-            # Egyszerű progress tracking
-            print(f"Letöltés {len(tasks)} zászló...")
-            completed_tasks = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for result in completed_tasks:
-                if isinstance(result, tuple):
-                    country_code, success = result
-                    results[country_code] = success
+        if isinstance(self.source, HttpFlagSource):
+            self.source.max_connections = max_concurrent
+        limiter = AdaptiveConcurrency(max_concurrent, adaptive=adaptive)
+        stats = DownloadStats(len(countries) * len(sizes))
+        self.stats, self.concurrency = stats, limiter
+        
+        # Korlátos sor: a termelő csak annyival jár a munkások előtt, amennyi befér
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_concurrent * 2)
+        results: Dict[str, bool] = {}
+        print(f"Letöltés {stats.total} zászló...")
+        bar = tqdm(total=stats.total, unit='zászló', desc='Letöltés', disable=not progress)
+        
+        async def produce():
+            for job_size in sizes:
+                for code, name in countries.items():
+                    await queue.put((code, name, job_size))
+            for _ in range(max_concurrent):
+                await queue.put(None)
+        
+        async def work():
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                code, name, job_size = job
+                filepath = self.flag_path(code, name, None if job_size == size else job_size)
+                try:
+                    _, success = await self.download_flag(code, name, job_size, limiter, filepath, refresh,
+                                                          on_flag if job_size == size else None)
+                except Exception as e:
+                    print(f"Hiba egy letöltés során: {e}")
+                    success = False
+                
+                results[code if job_size == size else f"{job_size}/{code}"] = success
+                stats.done += 1
+                if success:
+                    stats.succeeded += 1
                 else:
-                    print(f"Hiba egy letöltés során: {result}")
+                    stats.failed += 1
+                bar.update(1)
+                bar.set_postfix(párh=limiter.limit, MB_s=f"{stats.mb_per_second():.2f}",
+                                újra=stats.retries, hiba=stats.failed, refresh=False)
+        
+        async with self.source:
+            try:
+                await asyncio.gather(produce(), *(work() for _ in range(max_concurrent)))
+            finally:
+                bar.close()
+                self.manifest.save()
+        
+        # Hiányzó méretek helyben, ugyanebben a menetben
+        derived = await self.derive_sizes(countries, sizes, derive_sizes)
+        for key, success in derived.items():
+            results[key[len(size) + 1:] if key.startswith(f"{size}/") else key] = success
         
         # Eredmények összesítése
-        successful = sum(1 for success in results.values() if success)
-        failed = len(results) - successful
+        print(f"\nLetöltés befejezve ({stats.elapsed:.1f} s, {stats.rate():.1f} zászló/s, "
+              f"{stats.mb_per_second():.2f} MB/s):")
+        print(f"✅ Sikeres: {stats.succeeded} (ebből már meglévő: {stats.skipped}, "
+              f"változatlan: {stats.not_modified}, frissített: {stats.updated})")
+        print(f"❌ Sikertelen: {stats.failed}")
+        print(f"🔁 Újrapróbálkozások: {stats.retries}, párhuzamosság: csúcs {limiter.peak}, "
+              f"végül {limiter.limit}, {limiter.decreases} visszavétel")
         
-        print(f"\nLetöltés befejezve:")
-        print(f"✅ Sikeres: {successful}")
-        print(f"❌ Sikertelen: {failed}")
+        return results
+    
+    async def derive_sizes(self, countries: Dict[str, str], fetched: Sequence[str],
+                           derived: Sequence[str] = (), max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """Hiányzó zászlóméretek előállítása a letöltött képek kicsinyítésével, szálkészletben
         
+        A `derived` méretek minden zászlóra, a `fetched` (letöltött, az első
+        az elsődleges) méretek közül pedig a hiányzók (pl. a forrásban nem
+        létezők) készülnek el a legolcsóbb, elég nagy letöltött képből
+        (pick_source). A meglévő, forrásánál nem régebbi kép kimarad, így
+        újrafuttatáskor csak a frissült zászlók kicsinyítődnek újra.
+
+        Visszatérés: "{méret}/{kód}" -> siker az előállított képekre.
+        """
+        primary = fetched[0]
+        derived = [job_size for job_size in dict.fromkeys(derived) if job_size not in fetched]
+        results: Dict[str, bool] = {}
+        unavailable = 0
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Előbb a hiányzó letöltött méretek, utána ezekből a többi: így
+            # újrafuttatáskor is ugyanaz a forrás választódik, mint elsőre
+            for stage in (fetched, derived):
+                jobs = []
+                for code, name in countries.items():
+                    paths = {job_size: self.flag_path(code, name, None if job_size == primary else job_size)
+                             for job_size in fetched}
+                    available = [(job_size, path) for job_size, path in paths.items() if path.exists()]
+                    for job_size in stage:
+                        target = paths.get(job_size) or self.flag_path(code, name, job_size)
+                        if job_size in fetched and target.exists():
+                            continue
+                        source = pick_source([item for item in available if item[0] != job_size], job_size)
+                        if source is None:
+                            unavailable += 1
+                            continue
+                        if target.exists() and target.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+                            continue
+                        jobs.append((f"{job_size}/{code}", source, target, job_size))
+
+                if jobs and not results:
+                    print(f"\n🖼️ Hiányzó méretek előállítása...")
+                outcomes = await asyncio.gather(*(
+                    loop.run_in_executor(pool, resample_flag, source, target, job_size)
+                    for _, source, target, job_size in jobs
+                ), return_exceptions=True)
+                for (key, _, _, _), outcome in zip(jobs, outcomes):
+                    results[key] = not isinstance(outcome, Exception)
+                    if isinstance(outcome, Exception):
+                        print(f"Hiba {key} előállításakor: {outcome}")
+
+        if unavailable and derived:
+            print(f"⚠️ {unavailable} kép nem állítható elő (nincs elég nagy letöltött forrás)")
+        if results:
+            print(f"✅ Előállítva: {sum(results.values())}/{len(results)} kép "
+                  f"({time.perf_counter() - start:.1f} s)")
         return results
     
     def get_downloaded_flags(self) -> List[Dict[str, str]]:
@@ -0,0 +1,136 @@
+"""
+Műszerezési modul - Elemzési lépések időmérése és profilozása cserélhető fogadókkal
+"""
+
+import cProfile
+import heapq
+import io
+import pstats
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class InstrumentationSink:
+    """Alap (üres) fogadó a FlagAnalyzer elemzési eseményeihez
+
+    A FlagAnalyzer minden analyze_flag lépés (load, extract_dominant_colors,
+    detect_stripes, ...) előtt és után jelez; a zászló végén a lépésenkénti
+    időket egyben is megkapja. Ha a profile attribútum igaz, az elemző a
+    zászlót cProfile alatt futtatja, és a profilozót is átadja.
+    """
+
+    profile = False
+
+    def stage_started(self, country_code: str, stage: str):
+        """Egy lépés indul"""
+
+    def stage_finished(self, country_code: str, stage: str, duration: float):
+        """Egy lépés véget ért (másodpercben mért időtartammal)"""
+
+    def flag_finished(self, country_code: str, timings: Dict[str, float],
+                      profiler: Optional[cProfile.Profile] = None):
+        """A zászló elemzése véget ért (lépésenkénti időkkel)"""
+
+
+class CompositeSink(InstrumentationSink):
+    """Több fogadó egyszerre"""
+
+    def __init__(self, *sinks: InstrumentationSink):
+        self.sinks = list(sinks)
+        self.profile = any(sink.profile for sink in self.sinks)
+
+    def stage_started(self, country_code: str, stage: str):
+        for sink in self.sinks:
+            sink.stage_started(country_code, stage)
+
+    def stage_finished(self, country_code: str, stage: str, duration: float):
+        for sink in self.sinks:
+            sink.stage_finished(country_code, stage, duration)
+
+    def flag_finished(self, country_code: str, timings: Dict[str, float],
+                      profiler: Optional[cProfile.Profile] = None):
+        for sink in self.sinks:
+            sink.flag_finished(country_code, timings, profiler if sink.profile else None)
+
+
+class LoggingSink(InstrumentationSink):
+    """Lépésenkénti idők kiírása a konzolra (a küszöbnél lassabb lépések)"""
+
+    def __init__(self, threshold_ms: float = 0.0):
+        self.threshold_ms = threshold_ms
+
+    def stage_finished(self, country_code: str, stage: str, duration: float):
+        if duration * 1000 >= self.threshold_ms:
+            print(f"  ⏱️ {country_code} {stage}: {duration * 1000:.1f} ms")
+
+
+class StageTimingSink(InstrumentationSink):
+    """Lépésenkénti időtartamok gyűjtése (pl. benchmarkhoz)"""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.flag_totals: Dict[str, float] = {}
+
+    def stage_finished(self, country_code: str, stage: str, duration: float):
+        self.durations[stage].append(duration)
+
+    def flag_finished(self, country_code: str, timings: Dict[str, float],
+                      profiler: Optional[cProfile.Profile] = None):
+        total = sum(timings.values())
+        self.flag_totals[country_code] = max(self.flag_totals.get(country_code, 0.0), total)
+
+    def reset(self):
+        self.durations.clear()
+        self.flag_totals.clear()
+
+
+class SlowestFlagProfiler(InstrumentationSink):
+    """cProfile felvétel a leglassabb N zászlóról
+
+    Minden zászló profilozva fut, de csak az eddigi N leglassabb profilja
+    marad meg (output_dir megadásakor .prof fájlként is, a kiesők törlődnek).
+    Párhuzamos elemzésnél munkafolyamatonként N profil készül.
+    """
+
+    profile = True
+
+    def __init__(self, slowest: int = 5, output_dir: Optional[str] = None):
+        self.slowest = slowest
+        self.output_dir = Path(output_dir) if output_dir else None
+        self._heap: List[Tuple[float, str, pstats.Stats]] = []
+
+    def flag_finished(self, country_code: str, timings: Dict[str, float],
+                      profiler: Optional[cProfile.Profile] = None):
+        if profiler is None or self.slowest <= 0:
+            return
+
+        total = sum(timings.values())
+        if len(self._heap) >= self.slowest and total <= self._heap[0][0]:
+            return
+
+        stats = pstats.Stats(profiler)
+        if self.output_dir:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            stats.dump_stats(self.output_dir / f"{country_code}.prof")
+
+        entry = (total, country_code, stats)
+        if len(self._heap) < self.slowest:
+            heapq.heappush(self._heap, entry)
+        else:
+            _, evicted, _ = heapq.heapreplace(self._heap, entry)
+            if self.output_dir and evicted != country_code:
+                (self.output_dir / f"{evicted}.prof").unlink(missing_ok=True)
+
+    def profiles(self) -> List[Tuple[str, float, pstats.Stats]]:
+        """(országkód, időtartam, statisztika) a leglassabbtól kezdve"""
+        return [(code, total, stats) for total, code, stats in sorted(self._heap, key=lambda x: x[0], reverse=True)]
+
+    def report(self, top: int = 10) -> str:
+        """A megtartott profilok legdrágább függvényei szövegesen"""
+        buffer = io.StringIO()
+        for country_code, total, stats in self.profiles():
+            buffer.write(f"\n🔬 {country_code}: {total * 1000:.1f} ms\n")
+            stats.stream = buffer
+            stats.sort_stats('cumulative').print_stats(top)
+        return buffer.getvalue()
@@ -0,0 +1,78 @@
+"""
+Tudásbázis modul - Országonkénti zászlótények egyetlen verziózott adatfájlból
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, FrozenSet, Mapping, Optional
+
+
+# Az elemző és a kereső közös tényforrása (a forrásfájlok mellett, az adatkönyvtártól független)
+KNOWLEDGE_BASE_FILE = Path(__file__).with_name("knowledge_base.json")
+
+
+class KnowledgeBase:
+    """Zászlótények attribútum és ország szerint indexelve, csak olvasható szerkezetekben
+
+    Az adatfájl attribútumonként vagy országkód -> érték táblát ("facts"),
+    vagy puszta országlistát ("countries") ad meg; utóbbi tagjai True
+    értéket kapnak. A két index ugyanazokat a tényeket tartalmazza:
+    by_attribute[attribútum][ország] és by_country[ország][attribútum].
+    """
+
+    def __init__(self, version: str, attributes: Mapping[str, Mapping[str, Any]],
+                 descriptions: Optional[Mapping[str, str]] = None):
+        self.version = version
+        self.descriptions = MappingProxyType(dict(descriptions or {}))
+        self.by_attribute = MappingProxyType({
+            attribute: MappingProxyType(dict(facts)) for attribute, facts in attributes.items()
+        })
+
+        by_country = {}
+        for attribute, facts in self.by_attribute.items():
+            for country_code, value in facts.items():
+                by_country.setdefault(country_code, {})[attribute] = value
+        self.by_country = MappingProxyType({
+            country_code: MappingProxyType(facts) for country_code, facts in by_country.items()
+        })
+        self._members = {attribute: frozenset(facts) for attribute, facts in self.by_attribute.items()}
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'KnowledgeBase':
+        """Tudásbázis betöltése JSON adatfájlból"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        attributes = {}
+        descriptions = {}
+        for attribute, table in data['attributes'].items():
+            if 'facts' in table:
+                attributes[attribute] = table['facts']
+            else:
+                attributes[attribute] = dict.fromkeys(table['countries'], True)
+            descriptions[attribute] = table.get('description', '')
+        return cls(str(data['version']), attributes, descriptions)
+
+    def facts(self, attribute: str) -> Mapping[str, Any]:
+        """Egy attribútum országkód -> érték táblája"""
+        return self.by_attribute.get(attribute, MappingProxyType({}))
+
+    def countries(self, attribute: str) -> FrozenSet[str]:
+        """Az attribútummal rendelkező országok kódjai"""
+        return self._members.get(attribute, frozenset())
+
+    def lookup(self, attribute: str, country_code: str, default: Any = None) -> Any:
+        """Egy ország adott ténye (vagy default, ha nincs a tudásbázisban)"""
+        return self.facts(attribute).get(country_code, default)
+
+    def country(self, country_code: str) -> Mapping[str, Any]:
+        """Egy ország összes ténye attribútum szerint"""
+        return self.by_country.get(country_code, MappingProxyType({}))
+
+
+@lru_cache(maxsize=None)
+def load_knowledge_base(path: Optional[str] = None) -> KnowledgeBase:
+    """A tudásbázis folyamatonként egyszer betöltve (alapból a KNOWLEDGE_BASE_FILE)"""
+    return KnowledgeBase.from_file(Path(path) if path else KNOWLEDGE_BASE_FILE)
@@ -0,0 +1,129 @@
+"""
+Futószalag modul - Letöltés és elemzés átfedésben, a letöltött képek újraolvasása nélkül
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    from .analyzer import FlagAnalyzer, _analyze_bytes_task, _init_worker, clean_for_json
+    from .store import FeatureCheckpoint, FeatureReader, features_path
+except ImportError:
+    from analyzer import FlagAnalyzer, _analyze_bytes_task, _init_worker, clean_for_json
+    from store import FeatureCheckpoint, FeatureReader, features_path
+
+
+class AnalysisPipeline:
+    """Futószalagos elemzés: a frissen letöltött zászlók bájtjai közvetlenül a folyamatkészlethez
+
+    A letöltő minden újonnan mentett zászlóra meghívja a submit-ot a fájl
+    tartalmával; az elemzés azonnal indul egy munkafolyamatban (a kép a
+    memóriából dekódolódik, cv2.imdecode), miközben a letöltés folytatódik.
+    Az elkészült eredmények beérkezésükkor az elemző ellenőrzőpontjába
+    (JSONL) kerülnek; a befejező analyze_all_flags(keep_checkpoint=True)
+    ezeket átveszi, csak a nem letöltött, de elavult zászlókat elemzi, és
+    összefésüli a jellemzőtárat. Így a setup ideje közel
+    max(letöltés, elemzés), nem a kettő összege.
+    """
+
+    def __init__(self, analyzer: FlagAnalyzer, workers: int = 1, force: bool = False):
+        self.analyzer = analyzer
+        self.workers = max(1, workers)
+        self.force = force
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.analysis_time = 0.0
+        self.started: Optional[float] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._checkpoint: Optional[FeatureCheckpoint] = None
+        self._checkpointed: Dict[str, Dict] = {}
+        self._previous: Dict[str, Dict] = {}
+        self._existing: Optional[FeatureReader] = None
+
+    def start(self) -> 'AnalysisPipeline':
+        """Munkafolyamatok indítása; új force futásnál tiszta lap (gyorsítótár, ellenőrzőpont)"""
+        analyzer = self.analyzer
+        self._checkpoint = FeatureCheckpoint(analyzer.checkpoint_file)
+        self._checkpointed = self._checkpoint.load()
+        if analyzer.analysis_cache is not None:
+            analyzer.analysis_cache.writers = self.workers
+        if self.force and not self._checkpoint.forced:
+            if analyzer.analysis_cache is not None:
+                analyzer.analysis_cache.clear()
+            self._checkpoint.reset(force=True)
+            self._checkpointed = {}
+        # Megszakadt force futás: force nélkül is teljes újraelemzésként folytatódik
+        self.force = self.force or self._checkpoint.forced
+        if not self.force:
+            self._previous = analyzer.load_manifest().get('flags', {})
+        self._existing = FeatureReader(None if self.force else features_path(analyzer.data_dir))
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             initializer=_init_worker,
+                                             initargs=(analyzer,))
+        self.started = time.perf_counter()
+        print(f"Futószalagos elemzés: {self.workers} folyamat, a letöltéssel párhuzamosan")
+        return self
+
+    def submit(self, flag_file: Path, content: bytes):
+        """Egy frissen mentett zászló elemzésének indítása a memóriában lévő tartalomból"""
+        analyzer = self.analyzer
+        country_code = analyzer.extract_country_code_from_path(str(flag_file))
+        entry = analyzer.fingerprint_flag(Path(flag_file), content=content)
+
+        # Érvényes eredmény már van (pl. tartalomra azonos újraletöltés): a
+        # részleges újraszámolást, ha kell, a befejező analyze_all_flags végzi
+        current = (country_code in self._existing and
+                   analyzer.is_entry_current(entry, self._previous.get(country_code)))
+        checkpointed = self._checkpointed.get(country_code)
+        if current or (analyzer.is_entry_current(entry, checkpointed)
+                       and not analyzer.stale_groups(entry, checkpointed)):
+            self.skipped += 1
+            return
+
+        future = self._executor.submit(_analyze_bytes_task, (str(flag_file), content))
+        self.submitted += 1
+        future.add_done_callback(lambda done: self._collect(country_code, entry, done))
+
+    def _collect(self, country_code: str, entry: Dict[str, Any], done: Future):
+        """Beérkezett eredmény azonnali mentése az ellenőrzőpontba (az executor szálán fut)"""
+        try:
+            _, features, elapsed = done.result()
+        except Exception as e:
+            print(f"Hiba a zászló futószalagos elemzésekor ({country_code}): {e}")
+            features, elapsed = {}, 0.0
+
+        with self._lock:
+            # Sikertelen elemzés nem kerül az ellenőrzőpontba: a befejező lépés újrapróbálja
+            if not features:
+                self.failed += 1
+                return
+            self._checkpoint.append(country_code, entry, clean_for_json(features))
+            self.completed += 1
+            self.analysis_time += elapsed
+
+    def close(self, cancel: bool = False):
+        """A folyamatban lévő elemzések bevárása (cancel=True: a még el nem kezdettek elvetése)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=cancel)
+            self._executor = None
+        if self._checkpoint is not None:
+            self._checkpoint.close()
+        if self.started is not None:
+            wall_time = time.perf_counter() - self.started
+            print(f"Futószalagos elemzés: {self.completed} zászló elemezve letöltés közben "
+                  f"({self.analysis_time:.1f} s elemzési idő {wall_time:.1f} s alatt"
+                  + (f", {self.skipped} változatlan" if self.skipped else "")
+                  + (f", {self.failed} sikertelen" if self.failed else "") + ")")
+
+    def __enter__(self) -> 'AnalysisPipeline':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(cancel=exc_type is not None)
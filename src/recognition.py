@@ -0,0 +1,259 @@
+"""
+Felismerő modul - Fényképtűrő zászlófelismerés lokális kulcspont-leírókkal
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+try:
+    from .context import FlagContext
+    from .sizes import SizeResolver
+except ImportError:
+    from context import FlagContext
+    from sizes import SizeResolver
+
+
+DESCRIPTORS_NPZ = "flag_descriptors.npz"
+
+# Az index formátumának verziója; a tárolt paraméterekkel együtt ellenőrzött
+DESCRIPTORS_VERSION = 2
+
+# Bináris leírók (Hamming-távolság): mindkettő FLANN LSH-val kereshető.
+# Az AKAZE nem minden OpenCV buildben érhető el (available_detectors).
+DETECTORS = {
+    'orb': lambda features: cv2.ORB_create(nfeatures=features),
+    'akaze': lambda features: cv2.AKAZE_create(),
+}
+
+# Kulcspontok zászlónként az indexben és egy lekérdező képen
+INDEX_FEATURES = 500
+QUERY_FEATURES = 1000
+
+# A zászlók lapos, éles szélű képek: ekkora szélességen több és stabilabb
+# kulcspont adódik. Ha van legalább ilyen széles letöltött méret (w640,
+# w1280), abból kicsinyítve készül, különben a w320 kép nagyítva; a
+# koordináták a forráskép méretében tárolódnak
+INDEX_WIDTH = 640
+
+# A lekérdező kép hosszabb oldala legfeljebb ennyi pixel (nagyobb fénykép kicsinyítve)
+QUERY_MAX_SIDE = 1024
+
+# FLANN LSH: hosszú kulcs, többszörös próba nélkül - a zászlók sok közel azonos
+# leírója (csíkszélek, csillagok) így nem tölti meg a vödröket, egy lekérdezés
+# ~20 ms a teljes indexen
+LSH_INDEX_PARAMS = {'algorithm': 6, 'table_number': 12, 'key_size': 24, 'multi_probe_level': 0}
+LSH_SEARCH_PARAMS = {'checks': 64}
+
+
+def available_detectors() -> List[str]:
+    """Az aktuális OpenCV buildben elérhető detektorok"""
+    factories = {'orb': 'ORB_create', 'akaze': 'AKAZE_create'}
+    return [name for name in DETECTORS if hasattr(cv2, factories[name])]
+
+
+def flags_signature(flag_files: Sequence[Path]) -> Dict[str, Any]:
+    """Zászlókészlet azonosítója (darabszám, összméret, legújabb mtime) az index érvényességéhez"""
+    stats = [Path(path).stat() for path in flag_files]
+    return {
+        'count': len(stats),
+        'size': sum(stat.st_size for stat in stats),
+        'mtime_ns': max((stat.st_mtime_ns for stat in stats), default=0),
+    }
+
+
+class DescriptorIndex:
+    """Előre számolt kulcspont-leírók minden zászlóra, FLANN LSH kereséssel
+
+    Az index egyetlen tömörített .npz fájl: a leírók (N, bájtok) uint8
+    tömbje, a kulcspontok (N, 2) float32 koordinátái a zászló képén, és
+    zászlónkénti kezdőpozíciók (offsets). Egy lekérdezés: kulcspontok a
+    fényképen, két legközelebbi szomszéd az LSH indexben, arányteszt,
+    zászlónkénti szavazás, majd a legtöbb szavazatot kapott jelöltekre
+    RANSAC homográfia; a rangsor alapja a geometriailag igazolt (inlier)
+    párok száma, így a forgatott, torzított, rosszul megvilágított
+    fényképek is felismerhetők. Az egyszínű sávos zászlókon alig van
+    kulcspont, ezekhez a képaláírás alapú azonosítás (identify) való.
+    """
+
+    def __init__(self, codes: List[str], offsets: np.ndarray, keypoints: np.ndarray,
+                 descriptors: np.ndarray, meta: Dict[str, Any]):
+        self.codes = codes
+        self.offsets = offsets
+        self.keypoints = keypoints
+        self.descriptors = descriptors
+        self.meta = meta
+        self.owners = np.repeat(np.arange(len(codes), dtype=np.int32), np.diff(offsets))
+        self._matcher = None
+        self._detector = None
+
+    @staticmethod
+    def params(detector: str = 'orb') -> Dict[str, Any]:
+        """Az indexet meghatározó paraméterek (eltérés esetén újraépítés)"""
+        return {
+            'version': DESCRIPTORS_VERSION,
+            'detector': detector,
+            'index_features': INDEX_FEATURES,
+            'index_width': INDEX_WIDTH,
+        }
+
+    @classmethod
+    def build(cls, flag_files: Sequence[Path], detector: str = 'orb') -> 'DescriptorIndex':
+        """Leírók kinyerése minden zászlóképből"""
+        if detector not in available_detectors():
+            raise ValueError(f"A(z) '{detector}' detektor nem érhető el ebben az OpenCV buildben "
+                             f"(elérhető: {', '.join(available_detectors())})")
+
+        extractor = DETECTORS[detector](INDEX_FEATURES)
+        codes, counts, keypoints, descriptors = [], [], [], []
+        for flag_file in flag_files:
+            gray = cv2.imread(str(flag_file), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                continue
+
+            scale = INDEX_WIDTH / gray.shape[1]
+            gray = cv2.resize(gray, None, fx=scale, fy=scale,
+                              interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC)
+            found, described = extractor.detectAndCompute(gray, None)
+            codes.append(Path(flag_file).stem.split('_')[0])
+            if described is None:
+                counts.append(0)
+                continue
+
+            counts.append(len(described))
+            keypoints.append(np.array([point.pt for point in found], dtype=np.float32) / scale)
+            descriptors.append(described)
+
+        width = descriptors[0].shape[1] if descriptors else 32
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+        meta = dict(cls.params(detector), source=flags_signature(flag_files))
+        return cls(codes, offsets,
+                   np.concatenate(keypoints) if keypoints else np.empty((0, 2), np.float32),
+                   np.concatenate(descriptors) if descriptors else np.empty((0, width), np.uint8),
+                   meta)
+
+    def save(self, path: Path):
+        """Index mentése egyetlen .npz fájlba (átmeneti fájlon át)"""
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, codes=np.array(self.codes), offsets=self.offsets,
+                                keypoints=self.keypoints, descriptors=self.descriptors,
+                                meta=np.array(json.dumps(self.meta, sort_keys=True)))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['DescriptorIndex']:
+        """Index betöltése; None, ha hiányzik vagy olvashatatlan"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls([str(code) for code in data['codes']], data['offsets'], data['keypoints'],
+                           data['descriptors'], json.loads(str(data['meta'])))
+        except (OSError, KeyError, ValueError) as e:
+            if Path(path).exists():
+                print(f"Hibás leíró index, újraépítés: {e}")
+            return None
+
+    @classmethod
+    def load_or_build(cls, data_dir, detector: str = 'orb') -> Optional['DescriptorIndex']:
+        """Index a data/flag_descriptors.npz fájlból, szükség esetén egyszeri felépítése a zászlókból
+
+        Zászlónként a legolcsóbb, legalább INDEX_WIDTH széles letöltött méret
+        (SizeResolver) a forrás; ha új méret kerül letöltésre, az index újraépül.
+        """
+        data_dir = Path(data_dir)
+        resolver = SizeResolver(data_dir / "flags")
+        flag_files = [resolver.path(Path(primary).stem.split('_')[0], INDEX_WIDTH)
+                      for primary in sorted((data_dir / "flags").glob("*.png"))]
+        if not flag_files:
+            return None
+
+        path = data_dir / DESCRIPTORS_NPZ
+        expected = dict(cls.params(detector), source=flags_signature(flag_files))
+        index = cls.load(path)
+        if index is not None and index.meta == expected:
+            return index
+
+        print(f"🔑 Leíró index építése {len(flag_files)} zászlóból ({detector})...")
+        index = cls.build(flag_files, detector)
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Nem sikerült menteni a leíró indexet: {e}")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def matcher(self) -> cv2.FlannBasedMatcher:
+        """FLANN LSH index a leírókon (első használatkor épül, ~50 ms)"""
+        if self._matcher is None:
+            self._matcher = cv2.FlannBasedMatcher(LSH_INDEX_PARAMS, LSH_SEARCH_PARAMS)
+            self._matcher.add([self.descriptors])
+            self._matcher.train()
+        return self._matcher
+
+    @staticmethod
+    def query_gray(image: Union[bytes, np.ndarray, FlagContext]) -> np.ndarray:
+        """Szürkeárnyalatos lekérdező kép legfeljebb QUERY_MAX_SIDE hosszú oldallal"""
+        if isinstance(image, (bytes, bytearray)):
+            image = FlagContext.from_bytes(bytes(image), min_width=QUERY_MAX_SIDE // 2)
+        elif isinstance(image, np.ndarray):
+            image = FlagContext.from_array(image)
+        gray = image.gray
+
+        scale = QUERY_MAX_SIDE / max(gray.shape)
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def recognize(self, image: Union[bytes, np.ndarray, FlagContext], k: int = 5,
+                  ratio: float = 0.8, min_inliers: int = 10, candidates: int = 8) -> List[Tuple[str, int]]:
+        """Zászló felismerése fényképen: [(országkód, igazolt párok száma)] csökkenő sorrendben
+
+        Csak a legalább min_inliers geometriailag igazolt párral rendelkező
+        zászlók kerülnek a listába; üres lista, ha egyik sem igazolható.
+        """
+        if not len(self.descriptors):
+            return []
+
+        if self._detector is None:
+            self._detector = DETECTORS[self.meta['detector']](QUERY_FEATURES)
+        found, described = self._detector.detectAndCompute(self.query_gray(image), None)
+        if described is None or len(described) < 2:
+            return []
+
+        # Arányteszt: a legjobb pár egyértelműen jobb a második legjobbnál
+        query_indices, train_indices = [], []
+        for pair in self.matcher.knnMatch(described, k=2):
+            if len(pair) == 1 or (len(pair) == 2 and pair[0].distance < ratio * pair[1].distance):
+                query_indices.append(pair[0].queryIdx)
+                train_indices.append(pair[0].trainIdx)
+        if not train_indices:
+            return []
+
+        query_points = np.array([point.pt for point in found], dtype=np.float32)[query_indices]
+        train_indices = np.array(train_indices)
+        owners = self.owners[train_indices]
+        votes = np.bincount(owners, minlength=len(self.codes))
+
+        results = []
+        for flag_index in np.argsort(-votes, kind='stable')[:candidates]:
+            if votes[flag_index] < max(4, min_inliers):
+                break
+            selected = owners == flag_index
+            homography, mask = cv2.findHomography(self.keypoints[train_indices[selected]],
+                                                  query_points[selected], cv2.RANSAC, 5.0)
+            # Tükrözés vagy elfajult leképezés nem lehet egy lefényképezett zászló
+            if homography is None or np.linalg.det(homography[:2, :2]) <= 0:
+                continue
+            inliers = int(mask.sum())
+            if inliers >= min_inliers:
+                results.append((self.codes[flag_index], inliers))
+
+        results.sort(key=lambda result: -result[1])
+        return results[:k]
@@ -7,6 +7,20 @@ import json
 from pathlib import Path
 from typing import Dict, List, Tuple, Any, Optional
 from collections import defaultdict
+from functools import cached_property
+
+import numpy as np
+
+try:
+    from .knowledge import KnowledgeBase, load_knowledge_base
+    from .recognition import DescriptorIndex
+    from .similarity import SimilarityIndex, appearance_part, image_signature
+    from .store import FeatureColumns, features_path, read_features
+except ImportError:
+    from knowledge import KnowledgeBase, load_knowledge_base
+    from recognition import DescriptorIndex
+    from similarity import SimilarityIndex, appearance_part, image_signature
+    from store import FeatureColumns, features_path, read_features
 
 
 class FlagSearchEngine:
@@ -365,14 +379,25 @@ class FlagSearchEngine:
         }
         
         # Betöltjük az adatokat
-        self.flag_features = self.load_flag_features()
+        # Oszlopos tár azonnal (memóriába leképezve), a teljes jellemzők első használatkor
+        self.columns = FeatureColumns.load_or_build(self.data_dir)
         self.countries = self.load_countries()
     
+    @property
+    def knowledge(self) -> KnowledgeBase:
+        """A zászlóelemzővel közös tudásbázis (folyamatonként egyszer betöltve)"""
+        return load_knowledge_base()
+    
+    @cached_property
+    def flag_features(self) -> Dict[str, Dict]:
+        """Teljes, beágyazott zászló jellemzők (lustán betöltve)"""
+        return self.load_flag_features()
+    
     def load_flag_features(self) -> Dict[str, Dict]:
-        """Zászló jellemzők betöltése"""
-        if self.features_file.exists():
-            with open(self.features_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        """Zászló jellemzők betöltése (soronkénti JSONL vagy hagyományos JSON)"""
+        features_file = features_path(self.data_dir)
+        if features_file:
+            return read_features(features_file)
         return {}
     
     def load_countries(self) -> Dict[str, str]:
@@ -524,58 +549,40 @@ class FlagSearchEngine:
         return list(set(countries))  # Duplikátumok eltávolítása
     
     def search_by_colors(self, colors: List[str]) -> List[str]:
-        """Keresés színek alapján"""
-        matching_flags = []
+        """Keresés színek alapján (az oszlopos tár bitmaszkjain)"""
+        if self.columns is None:
+            return []
         
-        for country_code, features in self.flag_features.items():
-            flag_colors = [c.lower() for c in features.get('unique_colors', [])]
-            dominant_colors = features.get('dominant_colors', [])
+        # Minden kért színnek meg kell lennie (bővített logikával)
+        match = np.ones(len(self.columns), dtype=bool)
+        for color in colors:
+            color_lower = color.lower()
             
-            # Ellenőrizzük, hogy minden kért szín megvan-e (bővített logikával)
-            match = True
-            for color in colors:
-                color_lower = color.lower()
-                
-                # Színárnyalatok figyelembevétele
-                color_found = False
-                if color_lower == 'green':
-                    # 'zöld' keresés tartalmazza a világos, sötét és alap zöldet is
-                    if any(green_variant in flag_colors for green_variant in ['green', 'lightgreen', 'darkgreen']):
-                        color_found = True
-                elif color_lower == 'blue':
-                    # 'kék' keresés tartalmazza a világos, sötét és alap kéket is
-                    if any(blue_variant in flag_colors for blue_variant in ['blue', 'lightblue', 'darkblue']):
-                        color_found = True
-                elif color_lower == 'black':
-                    # Fekete színnél ellenőrizzük a dominancia mértékét
-                    # Csak akkor fogadjuk el, ha a fekete legalább 5% a zászlóból
-                    if 'black' in flag_colors:
-                        black_percentage = 0
-                        for color_info in dominant_colors:
-                            if color_info.get('name') == 'black':
-                                black_percentage = color_info.get('percentage', 0)
-                                break
-                        
-                        # Csak akkor fogadjuk el, ha a fekete jelentős része a zászlónak (>= 5%)
-                        if black_percentage >= 5.0:
-                            color_found = True
-                else:
-                    # Egyéb színek esetén pontos egyezés
-                    if color_lower in flag_colors:
-                        color_found = True
-                
-                if not color_found:
-                    match = False
-                    break
+            # Színárnyalatok figyelembevétele
+            if color_lower == 'green':
+                # 'zöld' keresés tartalmazza a világos, sötét és alap zöldet is
+                color_found = (self.columns.has_color('green') | self.columns.has_color('lightgreen')
+                               | self.columns.has_color('darkgreen'))
+            elif color_lower == 'blue':
+                # 'kék' keresés tartalmazza a világos, sötét és alap kéket is
+                color_found = (self.columns.has_color('blue') | self.columns.has_color('lightblue')
+                               | self.columns.has_color('darkblue'))
+            elif color_lower == 'black':
+                # Fekete színnél ellenőrizzük a dominancia mértékét
+                # Csak akkor fogadjuk el, ha a fekete jelentős része a zászlónak (>= 5%)
+                color_found = self.columns.has_color('black') & (self.columns.column('black_percentage') >= 5.0)
+            else:
+                # Egyéb színek esetén pontos egyezés
+                color_found = self.columns.has_color(color_lower)
             
-            if match:
-                matching_flags.append(country_code)
+            match &= color_found
         
-        return matching_flags
+        return self.columns.select(match)
     
     def search_by_patterns(self, patterns: List[str]) -> List[str]:
         """Keresés mintázatok alapján"""
         matching_flags = []
+        real_star_countries = self.knowledge.countries('real_star')
         
         for country_code, features in self.flag_features.items():
             stripes = features.get('stripes', {})
@@ -593,53 +600,6 @@ class FlagSearchEngine:
                         break
                 elif pattern == 'stars':
                     # Csak a valóban jól ismert csillagos zászlók (szigorú lista)
-                    real_star_countries = {
-                        'us',  # USA - 50 fehér csillag
-                        'cn',  # Kína - 5 sárga csillag
-                        'br',  # Brazília - 27 csillag
-                        'au',  # Ausztrália - 6 fehér csillag
-                        'nz',  # Új-Zéland - 4 fehér csillag
-                        'eu',  # EU - 12 sárga csillag
-                        'cl',  # Chile - 1 fehér csillag
-                        'lr',  # Libéria - 1 fehér csillag
-                        'tr',  # Törökország - 1 fehér csillag és hold
-                        'pk',  # Pakisztán - 1 fehér csillag és hold
-                        'so',  # Szomália - 1 fehér csillag
-                        'gh',  # Ghana - 1 fekete csillag
-                        'ma',  # Marokkó - 1 zöld csillag
-                        'my',  # Malajzia - 1 sárga csillag és hold
-                        'sg',  # Szingapúr - 5 fehér csillag
-                        'hn',  # Honduras - 5 kék csillag
-                        've',  # Venezuela - 8 fehér csillag
-                        'sy',  # Szíria - 2 zöld csillag
-                        'vn',  # Vietnám - 1 sárga csillag
-                        'kn',  # Saint Kitts and Nevis - 2 fehér csillag
-                        'gp',  # Guadeloupe - 10 fekete csillag
-                        'ph',  # Fülöp-szigetek - 8 csillag és nap
-                        'dz',  # Algéria - 1 piros csillag és hold
-                        'tn',  # Tunézia - 1 piros csillag és hold
-                        'mr',  # Mauritánia - 1 sárga csillag és hold
-                        'sn',  # Szenegál - 1 zöld csillag
-                        'et',  # Etiópia - 1 sárga csillag
-                        'cm',  # Kamerun - 1 sárga csillag
-                        'tg',  # Togo - 1 fehér csillag
-                        'cv',  # Zöld-foki Köztársaság - 10 sárga csillag
-                        'km',  # Comore-szigetek - 4 fehér csillag és hold
-                        'mm',  # Myanmar - 1 fehér csillag
-                        'np',  # Nepál - nap és hold
-                        'pg',  # Pápua Új-Guinea - 5 fehér csillag
-                        'sb',  # Salamon-szigetek - 5 fehér csillag
-                        'tv',  # Tuvalu - 9 sárga csillag
-                        'nr',  # Nauru - 1 fehér csillag
-                        'mh',  # Marshall-szigetek - 1 fehér csillag
-                        'fm',  # Mikronézia - 4 fehér csillag
-                        'ws',  # Szamoa - 5 fehér csillag
-                        'ck',  # Cook-szigetek - 15 fehér csillag
-                        'as',  # Amerikai Szamoa - fehér csillagok
-                        'pr',  # Puerto Rico - 1 fehér csillag
-                        'um',  # USA külső szigetek - fehér csillagok
-                        'tl',  # Kelet-Timor - 1 fehér csillag
-                    }
                     if country_code not in real_star_countries:
                         match = False
                         break
@@ -688,21 +648,19 @@ class FlagSearchEngine:
     
     def search_by_complexity(self, query: str) -> List[str]:
         """Keresés komplexitás alapján"""
-        matching_flags = []
+        if self.columns is None:
+            return []
+        complexity = self.columns.column('complexity_score')
         
         if 'egyszerű' in query.lower() or 'simple' in query.lower():
             # Alacsony komplexitású zászlók
-            for country_code, features in self.flag_features.items():
-                if features.get('complexity_score', 0) < 3:
-                    matching_flags.append(country_code)
+            return self.columns.select(complexity < 3)
         
         elif 'bonyolult' in query.lower() or 'komplex' in query.lower() or 'complex' in query.lower():
             # Magas komplexitású zászlók
-            for country_code, features in self.flag_features.items():
-                if features.get('complexity_score', 0) > 6:
-                    matching_flags.append(country_code)
+            return self.columns.select(complexity > 6)
         
-        return matching_flags
+        return []
     
     def search_by_star_details(self, query: str) -> List[str]:
         """Speciális csillag keresések (szám, méret, pozíció, szín)"""
@@ -717,111 +675,8 @@ class FlagSearchEngine:
                 break
         
         if star_color:
-            # Ismert csillag színek országonként (tudásbázis alapú)
-            star_color_mapping = {
-                'us': 'white',      # USA - fehér csillagok kék mezőn
-                'cn': 'yellow',     # Kína - sárga csillagok piros mezőn
-                'tr': 'white',      # Törökország - fehér csillag és hold piros mezőn
-                'br': 'yellow',     # Brazília - sárga csillagok kék mezőn
-                'au': 'white',      # Ausztrália - fehér csillagok kék mezőn
-                'nz': 'white',      # Új-Zéland - fehér csillagok kék mezőn
-                'pk': 'white',      # Pakisztán - fehér csillag és hold zöld mezőn
-                'my': 'yellow',     # Malajzia - sárga csillag és hold kék mezőn
-                'sg': 'white',      # Szingapúr - fehér csillagok piros mezőn
-                'cl': 'white',      # Chile - fehér csillag kék mezőn
-                'lr': 'white',      # Libéria - fehér csillag kék mezőn
-                'uy': 'yellow',     # Uruguay - sárga nap (csillag-szerű)
-                'ar': 'yellow',     # Argentína - sárga nap
-                'in': 'blue',       # India - kék kerék (csillag-szerű)
-                'eu': 'yellow',     # EU - sárga csillagok kék mezőn
-                'bo': 'yellow',     # Bolívia - sárga nap
-                'ec': 'yellow',     # Ecuador - sárga nap
-                've': 'yellow',     # Venezuela - sárga csillagok kék mezőn
-                'hn': 'blue',       # Honduras - kék csillagok fehér mezőn
-                'ni': 'blue',       # Nicaragua - kék színek
-                'sv': 'blue',       # Salvador - kék elemek
-                'sy': 'green',      # Szíria - 2 zöld csillag
-                'so': 'white',      # Szomália - fehér csillag kék mezőn
-
-                'et': 'yellow',     # Etiópia - sárga csillag
-                'gh': 'black',      # Ghána - fekete csillag
-                'gp': 'black',      # Guadeloupe - fekete csillagok
-                'us': 'white',      # USA - 50 fehér csillag kék mezőn
-                'lr': 'white',      # Libéria - fehér csillag (USA-hoz hasonlóan)
-                'tg': 'white',      # Togo - fehér csillag
-                'cv': 'yellow',     # Zöld-foki Köztársaság - sárga csillagok
-                'gn': 'red',        # Guinea - piros csillag (ha van)
-                'ml': 'red',        # Mali - piros elemek
-                'sn': 'green',      # Szenegál - zöld csillag
-                'ma': 'green',      # Marokkó - zöld csillag
-                'mr': 'yellow',     # Mauritánia - sárga hold és csillag
-                'dz': 'red',        # Algéria - piros hold és csillag
-                'tn': 'red',        # Tunézia - piros hold és csillag
-                'ma': 'green',      # Marokkó - zöld csillag
-                'ly': 'white',      # Líbia - fehér hold és csillag
-                'eg': 'yellow',     # Egyiptom - sárga sas (csillag-szerű)
-                'sd': 'yellow',     # Szudán - sárga elemek
-                'er': 'yellow',     # Eritrea - sárga elemek
-                'ss': 'yellow',     # Dél-Szudán - sárga csillag
-                'cf': 'yellow',     # Közép-afrikai Köztársaság - sárga csillag
-                'td': 'yellow',     # Csád - sárga elemek
-                'cm': 'yellow',     # Kamerun - sárga csillag
-                'gq': 'yellow',     # Egyenlítői-Guinea - sárga csillagok
-                'ga': 'yellow',     # Gabon - sárga elemek
-                'cg': 'yellow',     # Kongói Köztársaság - sárga elemek
-                'cd': 'yellow',     # Kongói Demokratikus Köztársaság - sárga csillag
-                'ao': 'yellow',     # Angola - sárga elemek
-                'na': 'yellow',     # Namíbia - sárga nap
-                'bw': 'blue',       # Botswana - kék elemek
-                'za': 'yellow',     # Dél-Afrika - sárga elemek
-                'sz': 'yellow',     # Szváziföld - sárga elemek
-                'ls': 'blue',       # Lesotho - kék elemek
-                'mw': 'red',        # Malawi - piros nap
-                'zm': 'red',        # Zambia - piros sas
-                'zw': 'red',        # Zimbabwe - piros csillag
-                'mz': 'yellow',     # Mozambik - sárga csillag
-                'mg': 'white',      # Madagaszkár - fehér elemek
-                'mu': 'yellow',     # Mauritius - sárga elemek
-                'sc': 'yellow',     # Seychelle-szigetek - sárga elemek
-                'km': 'white',      # Comore-szigetek - fehér hold és csillagok
-                'lk': 'yellow',     # Srí Lanka - sárga elemek
-                'bt': 'white',      # Bhután - fehér sárkány
-                'np': 'white',      # Nepál - fehér hold és nap
-                'bd': 'red',        # Banglades - piros kör
-                'mm': 'white',      # Myanmar - fehér csillag
-                'th': 'white',      # Thaiföld - fehér elemek
-                'vn': 'yellow',     # Vietnám - sárga csillag
-                'ph': 'yellow',     # Fülöp-szigetek - sárga nap és csillagok
-                'id': 'red',        # Indonézia - piros-fehér
-                'bn': 'yellow',     # Brunei - sárga elemek
-                'tl': 'white',      # Kelet-Timor - fehér csillag
-                'pg': 'white',      # Pápua Új-Guinea - fehér csillagok
-                'sb': 'white',      # Salamon-szigetek - fehér csillagok
-                'vu': 'yellow',     # Vanuatu - sárga elemek
-
-                'to': 'red',        # Tonga - piros kereszt
-                'ws': 'white',      # Szamoa - fehér csillagok
-                'tv': 'yellow',     # Tuvalu - sárga csillagok
-                'nr': 'white',      # Nauru - fehér csillag
-                'ki': 'yellow',     # Kiribati - sárga nap
-                'mh': 'white',      # Marshall-szigetek - fehér csillag
-                'fm': 'white',      # Mikronézia - fehér csillagok
-                'pw': 'yellow',     # Palau - sárga hold
-                'ck': 'white',      # Cook-szigetek - fehér csillagok
-                'nu': 'yellow',     # Niue - sárga csillagok
-
-                'tk': 'yellow',     # Tokelau - sárga csillagok
-                'as': 'white',      # Amerikai Szamoa - fehér csillagok
-                'gu': 'red',        # Guam - piros elemek
-                'mp': 'blue',       # Északi Mariana-szigetek - kék csillag
-                'vi': 'yellow',     # Amerikai Virgin-szigetek - sárga sas
-                'pr': 'white',      # Puerto Rico - fehér csillag
-                'um': 'white',      # USA külső szigetek - fehér csillagok
-                'kn': 'white',      # Saint Kitts and Nevis - fehér csillagok fekete mezőn
-            }
-            
             # Keresés a tudásbázis alapján - csak azok az országok, amelyek tényleg csillagos zászlók
-            for country_code, expected_color in star_color_mapping.items():
+            for country_code, expected_color in self.knowledge.facts('star_color').items():
                 if expected_color == star_color and country_code in self.flag_features:
                     # Csak azokat az országokat vesszük figyelembe, amelyek a tudásbázisban szerepelnek
                     # Ez kizárja a téves képfelismerési eredményeket (pl. Laosz, Kambodzsa, Maldív-szigetek)
@@ -839,31 +694,7 @@ class FlagSearchEngine:
         
         if star_count:
             # Ismert csillag számok tudásbázis alapján (kiegészítés a képfelismeréshez)
-            known_star_counts = {
-                'sy': 2,    # Szíria - 2 zöld csillag
-                'us': 50,   # USA - 50 fehér csillag
-                'eu': 12,   # EU - 12 sárga csillag
-                'br': 27,   # Brazília - 27 csillag
-                'cn': 5,    # Kína - 5 sárga csillag
-                'au': 6,    # Ausztrália - 6 fehér csillag
-                'nz': 4,    # Új-Zéland - 4 fehér csillag
-                'hn': 5,    # Honduras - 5 kék csillag
-                've': 8,    # Venezuela - 8 fehér csillag
-                'bo': 1,    # Bolívia - 1 nap (csillag-szerű)
-                'cl': 1,    # Chile - 1 fehér csillag
-                'lr': 1,    # Libéria - 1 fehér csillag
-                'my': 1,    # Malajzia - 1 sárga csillag
-                'pk': 1,    # Pakisztán - 1 fehér csillag
-                'tr': 1,    # Törökország - 1 fehér csillag
-                'so': 1,    # Szomália - 1 fehér csillag
-                'gh': 1,    # Ghána - 1 fekete csillag
-                'ma': 1,    # Marokkó - 1 zöld csillag
-                'dz': 1,    # Algéria - 1 piros csillag
-                'tn': 1,    # Tunézia - 1 piros csillag
-                'mr': 1,    # Mauritánia - 1 sárga csillag
-                'kn': 2,    # Saint Kitts and Nevis - 2 fehér csillag
-                'gp': 10,   # Guadeloupe - 10 fekete csillag
-            }
+            known_star_counts = self.knowledge.facts('star_count')
             
             for country_code, features in self.flag_features.items():
                 shapes = features.get('shapes', {})
@@ -895,16 +726,19 @@ class FlagSearchEngine:
                 for country_code, features in self.flag_features.items():
                     shapes = features.get('shapes', {})
                     if shapes.get('stars', 0) > 0:
-                        # USA, Libéria = sarokban, Kína = sarokban, stb.
-                        if star_type == 'corner_star' and country_code in ['us', 'lr', 'my']:
+                        # A csillag helyzete a tudásbázisból (USA, Libéria = sarokban, stb.)
+                        position = self.knowledge.lookup('star_position', country_code)
+                        if star_type == 'corner_star' and position == 'corner':
                             matching_flags.append(country_code)
-                        elif star_type == 'center_star' and country_code in ['so', 'pk', 'tr']:
+                        elif star_type == 'center_star' and position == 'center':
                             matching_flags.append(country_code)
         
         return list(set(matching_flags))  # Duplikátumok eltávolítása
     
     def search_by_color_count(self, query: str) -> List[str]:
         """Keresés színek száma alapján"""
+        if self.columns is None:
+            return []
         matching_flags = []
         
         # Számok keresése a kérésben
@@ -914,20 +748,14 @@ class FlagSearchEngine:
             target_count = int(numbers[0])
             
             if 'szín' in query.lower() or 'color' in query.lower():
-                for country_code, features in self.flag_features.items():
-                    if features.get('color_count', 0) == target_count:
-                        matching_flags.append(country_code)
+                matching_flags.extend(self.columns.select(self.columns.column('color_count') == target_count))
         
         # Speciális esetek
         if 'tricolor' in query.lower() or 'háromszínű' in query.lower():
-            for country_code, features in self.flag_features.items():
-                if features.get('is_tricolor', False):
-                    matching_flags.append(country_code)
+            matching_flags.extend(self.columns.select(self.columns.column('is_tricolor')))
         
         elif 'bicolor' in query.lower() or 'kétszínű' in query.lower():
-            for country_code, features in self.flag_features.items():
-                if features.get('is_bicolor', False):
-                    matching_flags.append(country_code)
+            matching_flags.extend(self.columns.select(self.columns.column('is_bicolor')))
         
         return matching_flags
     
@@ -966,40 +794,7 @@ class FlagSearchEngine:
                     else:
                         # Kizárjuk azokat az országokat, ahol a "has_animal" téves
                         # (csak címerben, túl kicsi, stilizált, vagy nem domináns állat)
-                        false_animal_flags = {
-                            'gf',  # French Guiana - kakas túl kicsi/stilizált
-                            'sb',  # Solomon Islands - sas túl kicsi  
-                            'bb',  # Barbados - hal a szigonyban, nem domináns
-                            'tv',  # Tuvalu - apró halak
-                            'ki',  # Kiribati - madár túl stilizált
-                            'nr',  # Nauru - madár túl kicsi
-                            'pw',  # Palau - hal túl stilizált
-                            'mh',  # Marshall Islands - madár túl kicsi
-                            'fm',  # Micronesia - nincs valódi állat
-                            'vu',  # Vanuatu - disznó fog túl stilizált
-                            'to',  # Tonga - nincs állat, csak növény
-                            'ls',  # Lesotho - ló csak a címerben
-                            'gy',  # Guyana - jaguár csak a címerben
-                            'za',  # South Africa - springbok csak a címerben
-                            'ke',  # Kenya - oroszlán csak a címerben
-                            'ag',  # Antigua and Barbuda - madár túl stilizált
-                            'sz',  # Eswatini - állatok csak a címerben
-                            'md',  # Moldova - sas emberi elemekkel, nem állat-központú
-                            'mw',  # Malawi - oroszlán csak a címerben
-                            'gd',  # Grenada - nutmeg nem igazi állat
-                            'fj',  # Fiji - galamb csak a címerben
-                            'pg',  # Papua New Guinea - madár csak a címerben
-                            'kz',  # Kazakhstan - sas túl stilizált
-                            've',  # Venezuela - ló csak a címerben
-                            'al',  # Albania - sas stilizált, nem domináns
-                            'lk',  # Sri Lanka - oroszlán csak a címerben
-                            'pa',  # Panama - madár csak a címerben
-                            'au',  # Australia - kenguru és emu csak a címerben
-                            'nz',  # New Zealand - kiwi csak a címerben
-                            'mn',  # Mongolia - ló túl stilizált (soyombo)
-                            'kg',  # Kyrgyzstan - sas túl stilizált
-                        }
-                        if country_code in false_animal_flags:
+                        if country_code in self.knowledge.countries('false_animal'):
                             match = False
                             break
                 elif element == 'plant' and not symbolic.get('has_plant', False):
@@ -1167,6 +962,71 @@ class FlagSearchEngine:
         
         return [country_code for country_code, _ in scored_results]
     
+    @cached_property
+    def similarity_index(self) -> Optional[SimilarityIndex]:
+        """Legközelebbi szomszéd index az oszlopos tár beágyazásain (None, ha nincsenek beágyazások)"""
+        embeddings = self.columns.embeddings() if self.columns is not None else None
+        if embeddings is None:
+            return None
+        return SimilarityIndex(self.columns.codes, embeddings)
+    
+    @cached_property
+    def identification_index(self) -> Optional[SimilarityIndex]:
+        """Képaláírás index (szín- és rácsblokk + méretarány) a feltöltött képek azonosításához"""
+        embeddings = self.columns.embeddings() if self.columns is not None else None
+        if embeddings is None:
+            return None
+        signatures = image_signature(appearance_part(embeddings), self.columns.column('layout.aspect_ratio'))
+        return SimilarityIndex(self.columns.codes, signatures)
+    
+    def identify(self, signature: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
+        """Egy képaláíráshoz (FlagAnalyzer.query_signature) legközelebbi k zászló
+        
+        Visszaad: [(országkód, távolság)] növekvő távolság szerint, ahol a
+        távolság 1 - koszinusz-hasonlóság (0 = azonos aláírás).
+        """
+        index = self.identification_index
+        if index is None:
+            return []
+        return [(code, round(1.0 - score, 4)) for code, score in index.query(signature, k)]
+    
+    @cached_property
+    def descriptor_index(self) -> Optional[DescriptorIndex]:
+        """Kulcspont-leíró index a fényképek felismeréséhez (None, ha nincsenek letöltött zászlók)"""
+        return DescriptorIndex.load_or_build(self.data_dir)
+    
+    def recognize_photo(self, image, k: int = 5) -> List[Tuple[str, int]]:
+        """Zászló felismerése fényképen lokális leírókkal: [(országkód, igazolt párok száma)]
+        
+        A forgatott, torzított, rosszul megvilágított képekhez; üres lista,
+        ha egyik zászló sem igazolható geometriailag (ilyenkor az identify
+        képaláírás alapú keresése használható).
+        """
+        index = self.descriptor_index
+        if index is None:
+            return []
+        return index.recognize(image, k)
+    
+    def resolve_country(self, name_or_code: str) -> Optional[str]:
+        """Országkód egy kódból vagy (magyar/angol) országnévből"""
+        code = name_or_code.strip().lower()
+        if code in self.countries:
+            return code
+        matches = self.extract_countries(name_or_code)
+        return matches[0] if len(matches) == 1 else None
+    
+    def find_similar(self, code: str, k: int = 5) -> List[Tuple[str, float]]:
+        """A k vizuálisan leghasonlóbb zászló (országkód, koszinusz-hasonlóság) párokban
+        
+        A keresés csak a mentett beágyazásokat használja, képet nem tölt be.
+        Ismeretlen országnál vagy beágyazások hiányában üres listát ad.
+        """
+        index = self.similarity_index
+        country_code = self.resolve_country(code)
+        if index is None or country_code not in index:
+            return []
+        return index.neighbours(country_code, k)
+    
     def get_flag_details(self, country_codes: List[str]) -> List[Dict]:
         """Zászló részletek lekérése"""
         details = []
@@ -0,0 +1,157 @@
+"""
+Hasonlósági modul - Rögzített hosszú vizuális beágyazás és legközelebbi szomszéd keresés
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from .colors import ColorNameLUT
+except ImportError:
+    from colors import ColorNameLUT
+
+
+# Térbeli színrács mérete (sorok, oszlopok): minden cella átlagszíne CIELAB-ban
+EMBEDDING_GRID = (4, 6)
+
+# Szerkezeti jellemzők: (pontozott útvonal a jellemzőkben, skála); az érték/skála 1-nél levágva
+STRUCTURE_FIELDS = (
+    ('layout.aspect_ratio', 2.0),
+    ('stripes.horizontal_stripe_count', 13),
+    ('stripes.vertical_stripe_count', 13),
+    ('color_count', 5),
+    ('shapes.circles', 1),
+    ('shapes.triangles', 1),
+    ('shapes.stars', 1),
+    ('shapes.crosses', 1),
+)
+
+# A beágyazás blokkjainak súlya: minden blokk egységnyi hosszra normált, majd
+# a súly gyökével szorzott, így a koszinusz-hasonlóságba súlyarányosan számít
+EMBEDDING_WEIGHTS = {
+    'colors': 1.0,
+    'grid': 1.0,
+    'structure': 0.5,
+}
+
+# A méretarány súlya a képaláírásban (a szín- és rácsblokk hossza 1-1)
+SIGNATURE_ASPECT_WEIGHT = 0.5
+
+
+def color_grid(rgb: np.ndarray, grid: Tuple[int, int] = EMBEDDING_GRID) -> np.ndarray:
+    """Lekicsinyített színrács (sorok x oszlopok x 3) CIELAB-ban, nagyjából 0-1 tartományra skálázva"""
+    rows, cols = grid
+    cells = cv2.resize(np.ascontiguousarray(rgb), (cols, rows), interpolation=cv2.INTER_AREA)
+    lab = ColorNameLUT.to_lab(cells)
+    return (lab / np.array([100.0, 128.0, 128.0], dtype=np.float32)).reshape(rows, cols, 3)
+
+
+def structure_vector(features: Dict[str, Any]) -> np.ndarray:
+    """A szerkezeti jellemzők vektora a STRUCTURE_FIELDS sorrendjében"""
+    values = []
+    for path, scale in STRUCTURE_FIELDS:
+        value = features
+        for key in path.split('.'):
+            value = value.get(key, 0) if isinstance(value, dict) else 0
+        values.append(min(float(value or 0) / scale, 1.0))
+    return np.array(values, dtype=np.float32)
+
+
+def weighted_blocks(blocks: Dict[str, np.ndarray]) -> np.ndarray:
+    """Blokkok egységnyi hosszra normálva, az EMBEDDING_WEIGHTS súlyaival összefűzve"""
+    weighted = []
+    for name, block in blocks.items():
+        block = np.asarray(block, dtype=np.float32).ravel()
+        norm = np.linalg.norm(block)
+        weighted.append(block / norm * np.sqrt(EMBEDDING_WEIGHTS[name]) if norm > 0 else block)
+    return np.concatenate(weighted).astype(np.float32)
+
+
+def flag_embedding(color_fractions: np.ndarray, grid: np.ndarray, features: Dict[str, Any]) -> np.ndarray:
+    """Vizuális beágyazás: színkategória-arányok + térbeli színrács + szerkezeti jellemzők
+
+    A hossz csak a színkategóriák számától és az EMBEDDING_GRID mérettől
+    függ, így minden zászlóé azonos. A szerkezeti blokk van a végén, így a
+    szín- és rácsblokk (appearance_part) a teljes elemzés nélkül is előáll.
+    """
+    return weighted_blocks({
+        'colors': color_fractions,
+        'grid': grid,
+        'structure': structure_vector(features),
+    })
+
+
+def appearance_part(embeddings: np.ndarray) -> np.ndarray:
+    """A beágyazás(ok) szín- és rácsblokkja (a szerkezeti blokk nélkül)"""
+    return embeddings[..., :embeddings.shape[-1] - len(STRUCTURE_FIELDS)]
+
+
+def image_signature(appearance: np.ndarray, aspect_ratio) -> np.ndarray:
+    """Képaláírás azonosításhoz: szín- és rácsblokk + súlyozott méretarány
+
+    Egy vagy több aláírásra is működik (aspect_ratio lehet tömb).
+    """
+    aspect = np.minimum(np.asarray(aspect_ratio, dtype=np.float32) / 2.0, 1.0) * SIGNATURE_ASPECT_WEIGHT
+    return np.concatenate([np.asarray(appearance, dtype=np.float32), aspect[..., None]], axis=-1)
+
+
+class SimilarityIndex:
+    """Pontos koszinusz-hasonlósági keresés a zászlók beágyazásain
+
+    A vektorokból levonja a készlet átlagát (így a minden zászlóban közös
+    összetevők nem számítanak), majd egységnyi hosszra normálja őket; egy
+    lekérdezés egyetlen mátrix-vektor szorzat és egy argpartition. Néhány
+    száz zászlónál ez gyorsabb bármilyen faszerkezetnél. Az üres (csupa
+    nulla) beágyazású zászlók nem vesznek részt a keresésben.
+    """
+
+    def __init__(self, codes: Sequence[str], embeddings: np.ndarray):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        valid = np.any(embeddings != 0, axis=1) if embeddings.size else np.zeros(len(codes), dtype=bool)
+
+        self.codes = [code for code, keep in zip(codes, valid) if keep]
+        self.positions = {code: index for index, code in enumerate(self.codes)}
+        self.mean = embeddings[valid].mean(axis=0) if valid.any() else np.zeros(embeddings.shape[1:], np.float32)
+        self.vectors = self.normalize(embeddings[valid])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, country_code: str) -> bool:
+        return country_code in self.positions
+
+    def normalize(self, vectors: np.ndarray) -> np.ndarray:
+        """Átlag levonása és egységnyi hosszra normálás (egy vagy több vektorra)"""
+        centered = np.asarray(vectors, dtype=np.float32) - self.mean
+        norms = np.linalg.norm(centered, axis=-1, keepdims=True)
+        return centered / np.maximum(norms, 1e-12)
+
+    def query(self, vector: np.ndarray, k: int = 5,
+              exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """A k leghasonlóbb zászló egy tetszőleges beágyazáshoz: [(országkód, koszinusz)]"""
+        if not self.codes:
+            return []
+        scores = self.vectors @ self.normalize(vector)
+        if exclude in self.positions:
+            scores[self.positions[exclude]] = -np.inf
+        return self.top(scores, k)
+
+    def neighbours(self, country_code: str, k: int = 5) -> List[Tuple[str, float]]:
+        """A k leghasonlóbb zászló egy indexelt zászlóhoz (önmaga nélkül)"""
+        if country_code not in self.positions:
+            raise KeyError(country_code)
+        # A tárolt vektor már normált, közvetlenül szorozható
+        scores = self.vectors @ self.vectors[self.positions[country_code]]
+        scores[self.positions[country_code]] = -np.inf
+        return self.top(scores, k)
+
+    def top(self, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """A k legnagyobb pontszám csökkenő sorrendben (a kizárt, -inf pontszámúak nélkül)"""
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.codes[index], round(float(scores[index]), 4)) for index in top]
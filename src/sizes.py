@@ -0,0 +1,129 @@
+"""
+Méretkezelő modul - Több méretű zászlóképek: méretjelölések, helyi átméretezés és méretfüggő útvonalak
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+
+
+# A flags/ könyvtár közvetlen képeinek mérete; a többi méret a flags/{méret}/ alatt van
+PRIMARY_SIZE = "w320"
+
+# Ajánlott méretkészlet: bélyegkép, rács, elemzés, nagy felbontás
+DEFAULT_SIZES = ('w40', 'w160', 'w320', 'w1280')
+
+
+def parse_size(size: str) -> Tuple[str, int]:
+    """flagcdn méretjelölés -> (tengely, pixel), pl. 'w160' -> ('w', 160), 'h40' -> ('h', 40)"""
+    if len(size) < 2 or size[0] not in ('w', 'h') or not size[1:].isdigit() or int(size[1:]) <= 0:
+        raise ValueError(f"Érvénytelen zászlóméret: {size!r} (pl. w160 vagy h40)")
+    return size[0], int(size[1:])
+
+
+def target_shape(size: str, height: int, width: int) -> Tuple[int, int]:
+    """Az arányokat megtartó célméret (magasság, szélesség) egy méretjelöléshez"""
+    axis, pixels = parse_size(size)
+    if axis == 'w':
+        return max(1, round(height * pixels / width)), pixels
+    return pixels, max(1, round(width * pixels / height))
+
+
+def resample_flag(source: Path, target: Path, size: str) -> Path:
+    """Egy zászlókép átméretezése a megadott méretre (átmeneti fájlon át írva)
+
+    Kicsinyítéshez területátlagolás (INTER_AREA): a vékony csíkok és a
+    szélek nem recésednek. Az OpenCV a dekódolás, az átméretezés és a
+    kódolás alatt elengedi a GIL-t, így szálkészletben párhuzamosan fut.
+    """
+    image = cv2.imread(str(source), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Nem sikerült betölteni a képet: {source}")
+
+    height, width = image.shape[:2]
+    new_height, new_width = target_shape(size, height, width)
+    interpolation = cv2.INTER_AREA if new_width < width else cv2.INTER_CUBIC
+    resized = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.stem}.{os.getpid()}.tmp.png")
+    if not cv2.imwrite(str(tmp), resized):
+        raise OSError(f"Nem sikerült menteni: {target}")
+    tmp.replace(target)
+    return target
+
+
+def pick_source(available: Sequence[Tuple[str, Path]], size: str) -> Optional[Path]:
+    """A legolcsóbb megfelelő forráskép egy méret előállításához (csak kicsinyítés)
+
+    available: (méret, útvonal) párok a meglévő képekre. Szélesség szerinti
+    célhoz a legkisebb, legalább ekkora szélességű w-méret; magasság szerinti
+    célhoz (a szélességből nem következik a magasság) a legnagyobb w-méret.
+    Nagyítással nem készül kép: az nem ad új részletet, a SizeResolver
+    ilyenkor a legnagyobb meglévő méretet adja.
+    """
+    axis, pixels = parse_size(size)
+    widths = sorted((parse_size(name)[1], path) for name, path in available if name[0] == 'w')
+    if not widths:
+        return None
+    if axis == 'h':
+        return widths[-1][1]
+    adequate = [path for width, path in widths if width >= pixels]
+    return adequate[0] if adequate else None
+
+
+class SizeResolver:
+    """Méretfüggő útvonalfeloldó: egy zászló legolcsóbb, még elég nagy képe
+
+    A flags/ közvetlen képei PRIMARY_SIZE méretűek, a flags/w*/ könyvtárak a
+    további szélességeket tartalmazzák. A path(kód, min_width) a legkisebb,
+    legalább min_width széles meglévő képet adja, ennek hiányában a
+    legnagyobbat; így a felület bélyegképekhez a kis, az elemzés a nagy
+    változatot olvassa, ha van. A könyvtárak listája első használatkor
+    készül; új letöltések után a refresh() frissíti.
+    """
+
+    def __init__(self, flags_dir: Path, primary: str = PRIMARY_SIZE):
+        self.flags_dir = Path(flags_dir)
+        self.primary = primary
+        self._index: Optional[List[Tuple[int, Dict[str, Path]]]] = None
+
+    def refresh(self):
+        """A könyvtárlista újraolvasása"""
+        self._index = None
+
+    def _directories(self) -> List[Tuple[int, Path]]:
+        directories = [(parse_size(self.primary)[1], self.flags_dir)]
+        if self.flags_dir.exists():
+            for directory in self.flags_dir.iterdir():
+                if directory.is_dir() and directory.name[:1] == 'w' and directory.name[1:].isdigit():
+                    directories.append((int(directory.name[1:]), directory))
+        return sorted(directories, key=lambda item: item[0])
+
+    def index(self) -> List[Tuple[int, Dict[str, Path]]]:
+        """[(szélesség, {országkód: útvonal})] növekvő szélesség szerint"""
+        if self._index is None:
+            self._index = [
+                (width, {path.stem.split('_')[0]: path for path in directory.glob('*.png')})
+                for width, directory in self._directories()
+            ]
+        return self._index
+
+    def sizes(self, country_code: str) -> List[int]:
+        """Egy zászló elérhető szélességei"""
+        return [width for width, files in self.index() if country_code in files]
+
+    def path(self, country_code: str, min_width: int = 0) -> Optional[Path]:
+        """A legkisebb, legalább min_width széles kép (hiányában a legnagyobb meglévő)"""
+        largest = None
+        for width, files in self.index():
+            path = files.get(country_code)
+            if path is None:
+                continue
+            if width >= min_width:
+                return path
+            largest = path
+        return largest
@@ -0,0 +1,434 @@
+"""
+Zászlóforrás modul - Cserélhető letöltési források (flagcdn HTTP, helyi tükör, helyi HTTP szerver)
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import tarfile
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+import requests
+
+
+FLAGCDN_URL = "https://flagcdn.com"
+
+# A flagcdn által kiszolgált PNG méretek (szélesség, ill. magasság szerint)
+FLAGCDN_SIZES = ('w20', 'w40', 'w80', 'w160', 'w320', 'w640', 'w1280', 'w2560',
+                 'h20', 'h24', 'h40', 'h60', 'h80', 'h120', 'h240')
+
+# Egy letöltés eredménye: (HTTP státusz, tartalom, válaszfejlécek)
+FetchResult = Tuple[int, bytes, Dict[str, str]]
+
+
+def header_value(headers: Optional[Dict[str, str]], name: str) -> Optional[str]:
+    """Fejléc értéke kis- és nagybetűtől függetlenül (None, ha nincs)"""
+    name = name.lower()
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def not_modified(validators: Dict[str, str], request_headers: Optional[Dict[str, str]]) -> bool:
+    """Feltételes kérés kiértékelése (RFC 9110): igaz, ha 304 a válasz
+
+    Az If-None-Match elsőbbséget élvez; If-Modified-Since csak nélküle számít.
+    """
+    if_none_match = header_value(request_headers, 'If-None-Match')
+    if if_none_match is not None:
+        etag = validators.get('ETag')
+        return etag is not None and (if_none_match.strip() == '*' or
+                                     etag in (tag.strip() for tag in if_none_match.split(',')))
+
+    if_modified_since = header_value(request_headers, 'If-Modified-Since')
+    last_modified = validators.get('Last-Modified')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+class FlagSource:
+    """Zászlóforrás: országkódok és zászlóképek (méret szerint)
+
+    A források aszinkron környezetkezelőként nyitják és zárják az
+    erőforrásaikat (HTTP munkamenet, tarball); a fetch_flag a flagcdn
+    szerinti HTTP státuszt adja vissza akkor is, ha nincs hálózat
+    (a helyi tükörben hiányzó kép 404). A kérésfejlécek feltételes
+    kéréshez (If-None-Match, If-Modified-Since) adhatók meg: változatlan
+    tartalomra 304 és üres tartalom a válasz.
+    """
+
+    name = 'source'
+
+    # Átmeneti hibák: a letöltő ezekre (és a 429/5xx státuszokra) újrapróbálkozik
+    transient_errors: Tuple[type, ...] = (asyncio.TimeoutError,)
+
+    async def __aenter__(self) -> 'FlagSource':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def describe(self) -> str:
+        """Rövid leírás a naplóüzenetekhez"""
+        return self.name
+
+    def fetch_codes(self, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Az országkódlista (codes.json) nyers letöltése"""
+        raise NotImplementedError
+
+    def country_codes(self) -> Dict[str, str]:
+        """Országkód -> angol név"""
+        status, content, _ = self.fetch_codes()
+        if status != 200:
+            raise RuntimeError(f"Az országkódlista nem érhető el: HTTP {status}")
+        return json.loads(content.decode('utf-8'))
+
+    async def fetch_flag(self, country_code: str, size: str = "w320",
+                         headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Egy zászlókép letöltése"""
+        raise NotImplementedError
+
+
+class HttpFlagSource(FlagSource):
+    """flagcdn.com szerkezetű HTTP forrás (/en/codes.json, /{méret}/{kód}.png)
+
+    Alapból a valódi flagcdn.com; a base_url-lel bármely azonos szerkezetű
+    tükör vagy a LocalFlagServer is használható.
+    """
+
+    name = 'http'
+    transient_errors = (asyncio.TimeoutError, aiohttp.ClientError)
+
+    def __init__(self, base_url: str = FLAGCDN_URL, max_connections: int = 10, timeout: float = 30):
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def codes_url(self) -> str:
+        """Az országkódlista URL-je"""
+        return f"{self.base_url}/en/codes.json"
+
+    def flag_url(self, country_code: str, size: str = "w320") -> str:
+        """Egy zászlókép URL-je"""
+        return f"{self.base_url}/{size}/{country_code}.png"
+
+    def describe(self) -> str:
+        return self.base_url
+
+    async def __aenter__(self) -> 'HttpFlagSource':
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def fetch_codes(self, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        response = requests.get(self.codes_url, headers=headers, timeout=10)
+        content = response.content if response.status_code == 200 else b''
+        return response.status_code, content, dict(response.headers)
+
+    async def fetch_flag(self, country_code: str, size: str = "w320",
+                         headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        if self.session is None:
+            raise RuntimeError("A HTTP forrás nincs megnyitva (async with forrás: ...)")
+        async with self.session.get(self.flag_url(country_code, size), headers=headers) as response:
+            content = await response.read() if response.status == 200 else b''
+            return response.status, content, dict(response.headers)
+
+
+class FlagMirror:
+    """Helyi zászlótükör: könyvtár vagy tarball (.tar, .tar.gz, .tgz)
+
+    Felismert fájlnevek: flagcdn szerkezet ({méret}/{kód}.png), a
+    data/flags szerkezet ({kód}_{név}.png) és egyszerű {kód}.png. Méret
+    nélküli képek bármely kért méretre kiszolgálódnak. Az országkódok a
+    codes.json / countries.json fájlból, ennek hiányában a fájlnevekből jönnek.
+    A validátorok (ETag, Last-Modified) a fájl méretéből és módosítási
+    idejéből képződnek, így a feltételes kérések tartalomolvasás nélkül
+    válaszolhatók meg.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.tar: Optional[tarfile.TarFile] = None
+        self._lock = threading.Lock()
+        self._tar_members: Dict[str, tarfile.TarInfo] = {}
+        self.images: Dict[Tuple[str, Optional[str]], str] = {}
+        self.names: Dict[str, str] = {}
+        self.codes_member: Optional[str] = None
+
+        if self.path.is_dir():
+            members = [str(file.relative_to(self.path)) for file in self.path.rglob('*') if file.is_file()]
+        elif self.path.is_file() and tarfile.is_tarfile(self.path):
+            self.tar = tarfile.open(self.path)
+            # A getmember lineáris keresés: tagonkénti index a gyors eléréshez
+            self._tar_members = {member.name: member for member in self.tar.getmembers() if member.isfile()}
+            members = list(self._tar_members)
+        else:
+            raise FileNotFoundError(f"Nem található zászlótükör (könyvtár vagy tarball): {self.path}")
+
+        for member in members:
+            self._index(member)
+
+    def _index(self, member: str):
+        """Egy tükörbeli fájl felvétele az indexbe (kódlista vagy zászlókép)"""
+        parts = Path(member).parts
+        filename = parts[-1]
+        if filename in ('codes.json', 'countries.json'):
+            # A legfelső szintű (legrövidebb útvonalú) kódlista a mérvadó
+            if self.codes_member is None or len(parts) < len(Path(self.codes_member).parts):
+                self.codes_member = member
+            return
+        if not filename.endswith('.png'):
+            return
+
+        stem = filename[:-4]
+        code, _, name = stem.partition('_')
+        size = parts[-2] if len(parts) >= 2 and parts[-2][:1] in ('w', 'h') and parts[-2][1:].isdigit() else None
+        self.images[(code.lower(), size)] = member
+        if name:
+            self.names.setdefault(code.lower(), name.replace('_', ' '))
+
+    def read(self, member: str) -> bytes:
+        """Egy tükörbeli fájl tartalma"""
+        if self.tar is None:
+            return (self.path / member).read_bytes()
+        # A tarfile nem szálbiztos: egyszerre egy olvasás
+        with self._lock:
+            return self.tar.extractfile(self._tar_members[member]).read()
+
+    def validators(self, member: str) -> Dict[str, str]:
+        """ETag és Last-Modified egy tükörbeli fájlhoz (méret és módosítási idő alapján)"""
+        if self.tar is None:
+            stat = (self.path / member).stat()
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        else:
+            info = self._tar_members[member]
+            size, mtime_ns = info.size, int(info.mtime * 1e9)
+        return {
+            'ETag': f'"{size:x}-{mtime_ns:x}"',
+            'Last-Modified': formatdate(mtime_ns / 1e9, usegmt=True),
+        }
+
+    def find(self, country_code: str, size: str = "w320") -> Optional[str]:
+        """A kért méretű kép, ennek hiányában a méret nélküli példány"""
+        return self.images.get((country_code, size)) or self.images.get((country_code, None))
+
+    def country_codes(self) -> Dict[str, str]:
+        """Országkód -> név a tükör kódlistájából vagy fájlneveiből"""
+        if self.codes_member is not None:
+            return json.loads(self.read(self.codes_member).decode('utf-8'))
+        codes = {code: self.names.get(code, code.upper()) for code, _ in self.images}
+        return dict(sorted(codes.items()))
+
+    def codes_document(self) -> Tuple[bytes, Dict[str, str]]:
+        """A kódlista JSON-ként, validátorokkal (fájlnevekből képzett listánál tartalomhash ETag)"""
+        if self.codes_member is not None:
+            return self.read(self.codes_member), self.validators(self.codes_member)
+        content = json.dumps(self.country_codes(), ensure_ascii=False).encode('utf-8')
+        return content, {'ETag': f'"{hashlib.sha256(content).hexdigest()[:16]}"'}
+
+    def close(self):
+        """A tarball lezárása (könyvtárnál nincs teendő)"""
+        if self.tar is not None:
+            self.tar.close()
+            self.tar = None
+
+
+class MirrorFlagSource(FlagSource):
+    """Hálózat nélküli forrás egy helyi könyvtárból vagy tarballból (FlagMirror)"""
+
+    name = 'mirror'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.mirror: Optional[FlagMirror] = None
+
+    def describe(self) -> str:
+        return str(self.path)
+
+    def _mirror(self) -> FlagMirror:
+        if self.mirror is None:
+            self.mirror = FlagMirror(self.path)
+        return self.mirror
+
+    async def __aexit__(self, *exc_info):
+        if self.mirror is not None:
+            self.mirror.close()
+            self.mirror = None
+
+    def country_codes(self) -> Dict[str, str]:
+        return self._mirror().country_codes()
+
+    def fetch_codes(self, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        content, validators = self._mirror().codes_document()
+        if not_modified(validators, headers):
+            return 304, b'', validators
+        return 200, content, dict(validators, **{'Content-Type': 'application/json'})
+
+    async def fetch_flag(self, country_code: str, size: str = "w320",
+                         headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        mirror = self._mirror()
+        member = mirror.find(country_code, size)
+        if member is None:
+            return 404, b'', {}
+        validators = mirror.validators(member)
+        if not_modified(validators, headers):
+            return 304, b'', validators
+        content = await asyncio.to_thread(mirror.read, member)
+        return 200, content, dict(validators, **{'Content-Type': 'image/png', 'Content-Length': str(len(content))})
+
+
+class _FlagHTTPServer(ThreadingHTTPServer):
+    # Nagy párhuzamosságnál az alapértelmezett 5-ös listen sor eldobott
+    # kapcsolatokat (1 s-os SYN újraküldést) okozna, ami torzítaná a mérést
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class LocalFlagServer:
+    """Helyi HTTP szerver flagcdn szerkezettel, egy zászlótükör (pl. data/flags) tartalmával
+
+    Háttérszálon fut (ThreadingHTTPServer), így a letöltő hálózat nélkül,
+    valódi HTTP úton terhelhető. Késleltetés (latency + véletlen jitter,
+    másodpercben), hibaarány (503 válaszok) és kapacitás (az ennél több
+    egyidejű kérés 429-et kap, mint egy sebességkorlátozó CDN-nél) állítható
+    a terheléses mérésekhez. Használat:
+
+        with LocalFlagServer("data/flags") as server:
+            source = HttpFlagSource(server.url)
+    """
+
+    def __init__(self, path, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 capacity: Optional[int] = None, seed: Optional[int] = None):
+        self.mirror = FlagMirror(path)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.active = 0
+        self._lock = threading.Lock()
+        self.server = _FlagHTTPServer((host, port), self._handler_class())
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server.active += 1
+                    overloaded = server.capacity is not None and server.active > server.capacity
+                try:
+                    if overloaded:
+                        self.send_error(429)
+                    else:
+                        self.serve()
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def serve(self):
+                delay = server.latency + server.random.uniform(0, server.jitter) if server.jitter else server.latency
+                if delay:
+                    time.sleep(delay)
+                if server.error_rate and server.random.random() < server.error_rate:
+                    self.send_error(503)
+                    return
+
+                status, content, headers = server.resolve(self.path, dict(self.headers))
+                if status not in (200, 304):
+                    self.send_error(status)
+                    return
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if status == 200:
+                    self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                if status == 200:
+                    self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def resolve(self, path: str, request_headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Kérésútvonal -> (státusz, tartalom, válaszfejlécek) a flagcdn szerkezet szerint
+
+        Feltételes kérésre (If-None-Match, If-Modified-Since) változatlan
+        tartalomnál 304 a válasz, a fájl beolvasása nélkül.
+        """
+        parts = path.split('?', 1)[0].strip('/').split('/')
+        if parts == ['en', 'codes.json']:
+            content, validators = self.mirror.codes_document()
+            content_type = 'application/json'
+        elif len(parts) == 2 and parts[1].endswith('.png'):
+            member = self.mirror.find(parts[1][:-4].lower(), parts[0])
+            if member is None:
+                return 404, b'', {}
+            validators, content_type = self.mirror.validators(member), 'image/png'
+            content = None
+        else:
+            return 404, b'', {}
+
+        if not_modified(validators, request_headers):
+            return 304, b'', validators
+        if content is None:
+            content = self.mirror.read(member)
+        return 200, content, dict(validators, **{'Content-Type': content_type})
+
+    def start(self) -> 'LocalFlagServer':
+        """Kiszolgálás indítása háttérszálon"""
+        self.thread = threading.Thread(target=self.server.serve_forever, name='local-flag-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Szerver leállítása és a tükör lezárása"""
+        self.server.shutdown()
+        self.server.server_close()
+        self.mirror.close()
+
+    def __enter__(self) -> 'LocalFlagServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def source_from_spec(spec: Optional[str] = None) -> FlagSource:
+    """Forrás egy megadott értékből: 'flagcdn' (vagy üres), http(s) URL, illetve könyvtár/tarball útvonal"""
+    if not spec or spec == 'flagcdn':
+        return HttpFlagSource()
+    if spec.startswith(('http://', 'https://')):
+        return HttpFlagSource(spec)
+    return MirrorFlagSource(spec)
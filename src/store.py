@@ -0,0 +1,412 @@
+"""
+Jellemzőtár modul - Soronkénti (JSONL) és hagyományos JSON jellemzőfájlok kezelése
+"""
+
+import json
+import os
+from pathlib import Path
+from collections import Counter
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+FEATURES_JSON = "flag_features.json"
+FEATURES_JSONL = "flag_features.jsonl"
+CHECKPOINT_JSONL = "flag_features.checkpoint.jsonl"
+COLUMNS_NPY = "flag_features.columns.npy"
+STRINGS_JSON = "flag_features.strings.json"
+
+# Az oszlopos tár formátumverziója - oszlopváltozáskor növelendő
+COLUMNS_VERSION = 2
+
+# Oszlopos tár mezői: (pontozott útvonal a jellemzőkben, NumPy típus)
+COLUMN_FIELDS = [
+    ('color_count', 'u1'),
+    ('complexity_score', 'f4'),
+    ('has_red', '?'), ('has_blue', '?'), ('has_green', '?'),
+    ('has_yellow', '?'), ('has_white', '?'), ('has_black', '?'),
+    ('is_tricolor', '?'), ('is_bicolor', '?'),
+    ('stripes.has_horizontal_stripes', '?'), ('stripes.has_vertical_stripes', '?'),
+    ('stripes.has_horizontal_bands', '?'), ('stripes.has_vertical_bands', '?'),
+    ('stripes.horizontal_stripe_count', 'u2'), ('stripes.vertical_stripe_count', 'u2'),
+    ('shapes.circles', 'u2'), ('shapes.triangles', 'u2'), ('shapes.rectangles', 'u2'),
+    ('shapes.stars', 'u2'), ('shapes.crosses', 'u2'), ('shapes.total_shapes', 'u2'),
+    ('layout.aspect_ratio', 'f4'), ('layout.width', 'u2'), ('layout.height', 'u2'),
+    ('layout.is_square', '?'), ('layout.is_horizontal', '?'), ('layout.is_vertical', '?'),
+    ('symbolic.has_human', '?'), ('symbolic.has_animal', '?'), ('symbolic.has_plant', '?'),
+    ('symbolic.has_weapon', '?'), ('symbolic.has_building', '?'), ('symbolic.has_celestial', '?'),
+    ('symbolic.has_union_jack', '?'), ('symbolic.has_cross', '?'), ('symbolic.has_crescent', '?'),
+]
+
+
+def features_path(data_dir) -> Optional[Path]:
+    """Az elérhető jellemzőfájl: a JSONL, ha legalább olyan friss, mint a JSON
+
+    A tárolóban csak a hagyományos JSON van; a JSONL helyben, elemzéskor
+    készül mellé. Ha a JSON újabb (pl. frissebb változat érkezett), az nyer.
+    """
+    jsonl_path = Path(data_dir) / FEATURES_JSONL
+    json_path = Path(data_dir) / FEATURES_JSON
+    if jsonl_path.exists() and (not json_path.exists()
+                                or jsonl_path.stat().st_mtime_ns >= json_path.stat().st_mtime_ns):
+        return jsonl_path
+    if json_path.exists():
+        return json_path
+    return None
+
+
+def iter_jsonl(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(bájtpozíció, rekord) párok egy JSONL fájlból
+
+    A hibás (pl. összeomláskor félbemaradt) sorokat kihagyja.
+    """
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            line_offset, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            try:
+                yield line_offset, json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Hibás sor kihagyva ({path.name}, {line_offset}. bájt)")
+
+
+def read_features(path: Path) -> Dict[str, Dict]:
+    """Jellemzők betöltése JSONL vagy JSON fájlból"""
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        return {record['country_code']: record['features'] for _, record in iter_jsonl(path)}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_record(path: Path, offset: int) -> Dict[str, Any]:
+    """Egyetlen JSONL rekord beolvasása a megadott bájtpozícióról"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+
+def load_features(data_dir) -> Dict[str, Dict]:
+    """Mentett jellemzők betöltése az adatkönyvtárból (bármelyik formátumban)"""
+    path = features_path(data_dir)
+    return read_features(path) if path else {}
+
+
+def write_features(data_dir, records: Iterable[Tuple[str, Dict]]) -> int:
+    """Jellemzők kiírása folyamatosan JSONL és JSON formátumban
+
+    A rekordok egyenként kerülnek a fájlokba, így a memóriában egyszerre
+    csak egy zászló jellemzői (és az oszlopos tár egy kis sora) vannak. Az
+    ideiglenes fájlok a végén atomikusan cserélik a régieket, majd mellettük
+    elkészül az oszlopos tár. Visszaadja a kiírt zászlók számát.
+    """
+    data_dir = Path(data_dir)
+    jsonl_path = data_dir / FEATURES_JSONL
+    json_path = data_dir / FEATURES_JSON
+    jsonl_tmp = jsonl_path.with_suffix('.jsonl.tmp')
+    json_tmp = json_path.with_suffix('.json.tmp')
+
+    count = 0
+    columns = FeatureColumnsBuilder()
+    with open(jsonl_tmp, 'w', encoding='utf-8') as jsonl_file, open(json_tmp, 'w', encoding='utf-8') as json_file:
+        json_file.write('{')
+        for country_code, features in records:
+            jsonl_file.write(json.dumps({'country_code': country_code, 'features': features},
+                                        ensure_ascii=False) + '\n')
+
+            # Ugyanaz a kimenet, mint json.dump(..., indent=2) az egész szótárra
+            entry = json.dumps(features, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            json_file.write(f'{"," if count else ""}\n  {json.dumps(country_code)}: {entry}')
+            columns.add(country_code, features)
+            count += 1
+        json_file.write('\n}' if count else '}')
+
+    os.replace(jsonl_tmp, jsonl_path)
+    os.replace(json_tmp, json_path)
+    # Azonos időbélyeg: a két fájl ugyanazt tartalmazza, a JSONL marad az elsődleges
+    os.utime(jsonl_path, ns=(jsonl_path.stat().st_atime_ns, json_path.stat().st_mtime_ns))
+    columns.save(data_dir, jsonl_path)
+    return count
+
+
+class FeatureReader(Mapping):
+    """Meglévő jellemzőtár olvasása zászlónként ({országkód: jellemzők} leképezés)
+
+    JSONL esetén csak a sorok pozícióit tartja a memóriában, és a kért
+    zászlót a fájlból olvassa; a régi JSON formátumot egyben tölti be.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._offsets: Dict[str, int] = {}
+        self._features: Dict[str, Dict] = {}
+
+        if self.path is None or not self.path.exists():
+            return
+        if self.path.suffix == '.jsonl':
+            for offset, record in iter_jsonl(self.path):
+                self._offsets[record['country_code']] = offset
+        else:
+            self._features = read_features(self.path)
+
+    def __contains__(self, country_code: str) -> bool:
+        return country_code in self._offsets or country_code in self._features
+
+    def __getitem__(self, country_code: str) -> Dict:
+        if country_code in self._features:
+            return self._features[country_code]
+        if country_code in self._offsets:
+            return read_record(self.path, self._offsets[country_code])['features']
+        raise KeyError(country_code)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets or self._features)
+
+    def __len__(self) -> int:
+        return len(self._offsets) or len(self._features)
+
+    def get(self, country_code: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Egy zászló jellemzői (vagy default)"""
+        return self[country_code] if country_code in self else default
+
+
+class FeatureCheckpoint:
+    """Összeomlás-biztos ellenőrzőpont: zászlónként egy, azonnal lemezre írt JSONL sor
+
+    Minden sor tartalmazza az országkódot, a manifest bejegyzést és a
+    jellemzőket; újraindításkor a még érvényes sorok zászlói kimaradnak.
+    Teljes (force) újraelemzésnél az első sor ezt rögzíti, így a megszakadt
+    futás folytatása is teljes újraelemzésként fejeződik be.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.offsets: Dict[str, int] = {}
+        self.entries: Dict[str, Dict] = {}
+        self.forced = False
+        self._file = None
+
+    def load(self) -> Dict[str, Dict]:
+        """Korábbi (megszakadt) futás befejezett zászlói: {országkód: manifest bejegyzés}"""
+        if self.path.exists():
+            for offset, record in iter_jsonl(self.path):
+                if 'country_code' not in record:
+                    self.forced = bool(record.get('run', {}).get('force'))
+                    continue
+                self.offsets[record['country_code']] = offset
+                self.entries[record['country_code']] = record['manifest']
+        return dict(self.entries)
+
+    def reset(self, force: bool = False):
+        """Ellenőrzőpont törlése; force=True esetén egy teljes újraelemzés kezdetének rögzítése"""
+        self.close()
+        self.offsets.clear()
+        self.entries.clear()
+        if self.path.exists():
+            self.path.unlink()
+        self.forced = force
+        if force:
+            self._write({'run': {'force': True}})
+
+    def append(self, country_code: str, entry: Dict[str, Any], features: Dict[str, Any]):
+        """Egy zászló eredményének hozzáfűzése és lemezre kényszerítése"""
+        offset = self._write({'country_code': country_code, 'manifest': entry, 'features': features})
+        self.offsets[country_code] = offset
+        self.entries[country_code] = entry
+
+    def _write(self, record: Dict[str, Any]) -> int:
+        """Egy sor hozzáfűzése és lemezre kényszerítése; visszaadja a sor bájtpozícióját"""
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+            # Félbemaradt utolsó sor lezárása, hogy az új sor különálló legyen
+            if self._file.tell() and not self._ends_with_newline():
+                self._file.write(b'\n')
+
+        line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+        offset = self._file.tell()
+        self._file.write(line)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return offset
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def get(self, country_code: str) -> Dict:
+        """Egy ellenőrzőpontba írt zászló jellemzői"""
+        return read_record(self.path, self.offsets[country_code])['features']
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def source_signature(path: Path) -> Dict[str, Any]:
+    """Jellemzőfájl azonosítója (név, méret, mtime) az oszlopos tár érvényességéhez"""
+    stat = Path(path).stat()
+    return {'file': Path(path).name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class FeatureColumnsBuilder:
+    """Oszlopos tár sorainak gyűjtése zászlónként (kis, fix méretű sorok)"""
+
+    def __init__(self):
+        self.codes: List[str] = []
+        self.colors: List[str] = []
+        self.rows: List[tuple] = []
+        self.embeddings: List[Optional[List[float]]] = []
+
+    def add(self, country_code: str, features: Dict[str, Any]):
+        values = []
+        for path, _ in COLUMN_FIELDS:
+            value = features
+            for key in path.split('.'):
+                value = value.get(key, 0) if isinstance(value, dict) else 0
+            values.append(value or 0)
+
+        # Színek bitmaszkként a szövegtábla színlistájára
+        color_mask = 0
+        for color in features.get('unique_colors', []):
+            if color not in self.colors:
+                self.colors.append(color)
+            color_mask |= 1 << self.colors.index(color)
+
+        black_percentage = next((color.get('percentage', 0) for color in features.get('dominant_colors', [])
+                                 if color.get('name') == 'black'), 0)
+
+        self.codes.append(country_code)
+        self.rows.append((color_mask, black_percentage, *values))
+        self.embeddings.append(features.get('embedding'))
+
+    def to_array(self) -> np.ndarray:
+        if len(self.colors) > 64:
+            raise ValueError(f"Túl sok színnév az oszlopos tárhoz: {len(self.colors)}")
+        dtype = [('colors', 'u8'), ('black_percentage', 'f4')] + COLUMN_FIELDS
+
+        # Vizuális beágyazás rögzített hosszú oszlopként; a hiányzó vagy eltérő
+        # hosszú (régebbi elemzésből származó) sorok nullvektort kapnak
+        dimension = next((len(embedding) for embedding in self.embeddings if embedding), 0)
+        if not dimension:
+            return np.array(self.rows, dtype=dtype)
+
+        empty = (0.0,) * dimension
+        rows = [row + (tuple(embedding) if embedding and len(embedding) == dimension else empty,)
+                for row, embedding in zip(self.rows, self.embeddings)]
+        return np.array(rows, dtype=dtype + [('embedding', 'f4', (dimension,))])
+
+    def save(self, data_dir, source: Path):
+        """Oszlopos tár és szövegtábla mentése (a forrás JSONL azonosítójával)"""
+        data_dir = Path(data_dir)
+        columns_tmp = data_dir / (COLUMNS_NPY + '.tmp')
+        strings_tmp = data_dir / (STRINGS_JSON + '.tmp')
+
+        with open(columns_tmp, 'wb') as f:
+            np.save(f, self.to_array())
+        with open(strings_tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': COLUMNS_VERSION,
+                'source': source_signature(source),
+                'codes': self.codes,
+                'colors': self.colors,
+            }, f, ensure_ascii=False)
+
+        os.replace(columns_tmp, data_dir / COLUMNS_NPY)
+        os.replace(strings_tmp, data_dir / STRINGS_JSON)
+
+
+class FeatureColumns:
+    """Memóriába leképezett oszlopos jellemzőtár (struct-of-arrays nézetek)
+
+    A numerikus és logikai jellemzők egy strukturált .npy tömbben vannak,
+    amelyet np.load mmap módban nyit meg: a betöltés a zászlók számától
+    függetlenül csak a fejlécet olvassa, az oszlopok másolás nélküli nézetek.
+    Az országkódok és színnevek egy kis JSON szövegtáblában vannak; a
+    vizuális beágyazás (ha van) egy rögzített hosszú embedding oszlop.
+    """
+
+    def __init__(self, table: np.ndarray, codes: List[str], colors: List[str]):
+        self.table = table
+        self.codes = codes
+        self.colors = colors
+
+    @classmethod
+    def load(cls, data_dir) -> Optional['FeatureColumns']:
+        """Oszlopos tár megnyitása; None, ha hiányzik vagy a jellemzőfájlnál régebbi"""
+        data_dir = Path(data_dir)
+        columns_file = data_dir / COLUMNS_NPY
+        strings_file = data_dir / STRINGS_JSON
+        source = features_path(data_dir)
+        if source is None or not columns_file.exists() or not strings_file.exists():
+            return None
+
+        try:
+            with open(strings_file, 'r', encoding='utf-8') as f:
+                strings = json.load(f)
+            if strings.get('version') != COLUMNS_VERSION or strings.get('source') != source_signature(source):
+                return None
+            table = np.load(columns_file, mmap_mode='r')
+        except (OSError, ValueError, json.JSONDecodeError) as e:
+            print(f"Hibás oszlopos tár, a JSON jellemzők használata: {e}")
+            return None
+
+        return cls(table, strings['codes'], strings['colors'])
+
+    @classmethod
+    def load_or_build(cls, data_dir) -> Optional['FeatureColumns']:
+        """Oszlopos tár megnyitása, szükség esetén egyszeri felépítése a jellemzőfájlból"""
+        columns = cls.load(data_dir)
+        if columns is not None:
+            return columns
+
+        source = features_path(data_dir)
+        if source is None:
+            return None
+
+        builder = FeatureColumnsBuilder()
+        for country_code, features in read_features(source).items():
+            builder.add(country_code, features)
+        try:
+            builder.save(data_dir, source)
+        except OSError as e:
+            print(f"Nem sikerült menteni az oszlopos tárat: {e}")
+            return cls(builder.to_array(), builder.codes, builder.colors)
+        return cls.load(data_dir)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def column(self, name: str) -> np.ndarray:
+        """Egy oszlop másolás nélküli nézete (pl. 'shapes.stars')"""
+        return self.table[name]
+
+    def has_color(self, color_name: str) -> np.ndarray:
+        """Logikai maszk: a zászló színei között szerepel-e a szín (kis-nagybetű független)"""
+        mask = np.zeros(len(self.table), dtype=bool)
+        for index, color in enumerate(self.colors):
+            if color.lower() == color_name.lower():
+                mask |= (self.table['colors'] & np.uint64(1 << index)) != 0
+        return mask
+
+    def select(self, mask: np.ndarray) -> List[str]:
+        """A maszk szerinti zászlók országkódjai (tárolási sorrendben)"""
+        return [self.codes[index] for index in np.flatnonzero(mask)]
+
+    def embeddings(self) -> Optional[np.ndarray]:
+        """A zászlók vizuális beágyazásai (zászlók x dimenzió), ha a jellemzők tartalmazzák"""
+        if 'embedding' not in (self.table.dtype.names or ()):
+            return None
+        return self.table['embedding']
+
+    def color_counts(self) -> Counter:
+        """Hány zászlón szerepel az egyes színek"""
+        return Counter({
+            color: int(np.count_nonzero(self.table['colors'] & np.uint64(1 << index)))
+            for index, color in enumerate(self.colors)
+        })
@@ -0,0 +1,141 @@
+"""
+Közös tesztkörnyezet - Kis zászlókészlet ideiglenes adatkönyvtárban, hamis zászlóforrás
+"""
+
+import asyncio
+import json
+import shutil
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from src.analyzer import FlagAnalyzer
+from src.downloader import FlagDownloader
+from src.sources import FlagSource, not_modified
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+FLAGS_DIR = DATA_DIR / "flags"
+
+# Kis, változatos mintakészlet: trikolórok, csillagok, kereszt, Union Jack, nem téglalap alakú zászló
+SAMPLE_CODES = ['br', 'ch', 'de', 'fr', 'gb', 'hu', 'it', 'jp', 'ng', 'np', 'ro', 'se', 'td', 'us']
+
+
+def flag_file(country_code: str) -> Path:
+    """A tárolóban lévő zászlókép ({kód}_{név}.png)"""
+    return next(FLAGS_DIR.glob(f"{country_code}_*.png"))
+
+
+def flag_names(codes=SAMPLE_CODES) -> Dict[str, str]:
+    """Országkód -> név a tárolóban lévő fájlnevekből (a letöltő ugyanezt a fájlnevet adja)"""
+    return {code: flag_file(code).stem.split('_', 1)[1].replace('_', ' ') for code in codes}
+
+
+def copy_flags(data_dir: Path, codes=SAMPLE_CODES) -> Path:
+    """Zászlók másolása egy adatkönyvtár flags/ mappájába"""
+    flags_dir = Path(data_dir) / "flags"
+    flags_dir.mkdir(parents=True, exist_ok=True)
+    for country_code in codes:
+        shutil.copy2(flag_file(country_code), flags_dir)
+    return flags_dir
+
+
+def count_analyses(monkeypatch):
+    """analyze_flag hívások számlálása (soros futásnál a tesztfolyamatban futnak)"""
+    calls = []
+    original = FlagAnalyzer.analyze_flag
+
+    def counting(self, image_path, *args, **kwargs):
+        calls.append(Path(image_path).name)
+        return original(self, image_path, *args, **kwargs)
+
+    monkeypatch.setattr(FlagAnalyzer, 'analyze_flag', counting)
+    return calls
+
+
+@pytest.fixture
+def data_dir(tmp_path) -> Path:
+    """Ideiglenes adatkönyvtár a mintakészlet zászlóival (az elemzés ide ír)"""
+    copy_flags(tmp_path)
+    return tmp_path
+
+
+class FakeSource(FlagSource):
+    """Memóriabeli zászlóforrás forgatókönyv szerinti hibákkal, késleltetéssel és kapacitással
+
+    content: országkódonként a kiszolgált bájtok (alapból "png:{kód}:1");
+    failures: országkódonként a sikeres válasz előtt visszaadott státuszok;
+    broken: ezekre mindig 500 a válasz; capacity: ennél több egyidejű
+    kérésre 429 a válasz (túlterhelt szerver). A feltételes kéréseket az
+    ETag és Last-Modified validátorokkal értékeli ki (ignore_validators:
+    mindig 200, mint egy validátorokat nem ismerő szerver).
+    """
+
+    name = 'fake'
+
+    def __init__(self, codes: Dict[str, str], content: Optional[Dict[str, bytes]] = None,
+                 failures: Optional[Dict[str, List[int]]] = None,
+                 broken=(), capacity: Optional[int] = None, latency: float = 0.0):
+        self.codes = codes
+        self.content = dict(content) if content is not None else \
+            {code: f"png:{code}:1".encode() for code in codes}
+        self.versions = {code: 1 for code in self.content}
+        self.failures = {code: list(statuses) for code, statuses in (failures or {}).items()}
+        self.broken = set(broken)
+        self.ignore_validators = False
+        self.capacity = capacity
+        self.latency = latency
+        self.requests: List[tuple] = []
+        self.statuses: List[int] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def validators(self, code: str) -> Dict[str, str]:
+        version = self.versions[code]
+        return {'ETag': f'"{code}-{version}"', 'Last-Modified': formatdate(1_700_000_000 + version, usegmt=True)}
+
+    def update(self, code: str, content: Optional[bytes] = None):
+        """Új zászlóváltozat a forrásban (új tartalom és validátorok)"""
+        self.versions[code] += 1
+        self.content[code] = content if content is not None else f"png:{code}:{self.versions[code]}".encode()
+
+    def fetch_codes(self, headers: Optional[Dict[str, str]] = None):
+        return 200, json.dumps(self.codes).encode(), {'ETag': '"codes"'}
+
+    async def fetch_flag(self, country_code: str, size: str = "w320", headers: Optional[Dict[str, str]] = None):
+        self.requests.append((country_code, size, dict(headers or {})))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            status, content, response_headers = self._respond(country_code, headers)
+        finally:
+            self.in_flight -= 1
+        self.statuses.append(status)
+        return status, content, response_headers
+
+    def _respond(self, country_code: str, headers: Optional[Dict[str, str]]):
+        if self.capacity is not None and self.in_flight > self.capacity:
+            return 429, b'', {}
+        if country_code in self.broken:
+            return 500, b'', {}
+        pending = self.failures.get(country_code)
+        if pending:
+            status = pending.pop(0)
+            return status, b'', {'Retry-After': '0'} if status == 429 else {}
+        if country_code not in self.content:
+            return 404, b'', {}
+        validators = self.validators(country_code)
+        if not self.ignore_validators and not_modified(validators, headers):
+            return 304, b'', validators
+        return 200, self.content[country_code], validators
+
+
+def flag_source(codes=SAMPLE_CODES) -> FakeSource:
+    """Hamis forrás, amely a tárolóban lévő valódi zászlóképeket szolgálja ki"""
+    return FakeSource(flag_names(codes), content={code: flag_file(code).read_bytes() for code in codes})
+
+
+def download(downloader: FlagDownloader, **kwargs) -> Dict[str, bool]:
+    return asyncio.run(downloader.download_all_flags(progress=False, **kwargs))
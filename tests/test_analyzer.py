@@ -0,0 +1,241 @@
+"""
+Elemző tesztek - Párhuzamos és soros futás, manifest, ellenőrzőpont, részleges újraszámolás
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.analyzer import FlagAnalyzer
+from src.context import FlagContext
+from src.store import FeatureCheckpoint, write_features
+
+from conftest import DATA_DIR, SAMPLE_CODES, count_analyses, flag_file
+
+
+def analyze(data_dir, **kwargs):
+    """Teljes készlet elemzése gyorsítótár nélkül, a mentett jellemzők szótárként"""
+    analyzer = FlagAnalyzer(data_dir, cache_bytes=0)
+    return dict(analyzer.analyze_all_flags(**kwargs))
+
+
+def test_parallel_matches_serial(data_dir):
+    """Több folyamattal ugyanazok a jellemzők, ugyanabban a sorrendben, mint sorosan"""
+    serial = analyze(data_dir, workers=1)
+    parallel = analyze(data_dir, workers=3, chunksize=2, force=True)
+
+    assert list(serial) == sorted(SAMPLE_CODES)
+    assert list(parallel) == list(serial)
+    assert parallel == serial
+
+
+def test_manifest_skips_unchanged_and_detects_changes(data_dir, monkeypatch):
+    """Változatlan tartalom kimarad (az mtime nem számít), a módosított és törölt zászló igen"""
+    first = analyze(data_dir)
+    manifest = FlagAnalyzer(data_dir).load_manifest()
+    assert sorted(manifest['flags']) == sorted(SAMPLE_CODES)
+    assert all('mtime_ns' not in entry for entry in manifest['flags'].values())
+
+    calls = count_analyses(monkeypatch)
+    flags_dir = data_dir / "flags"
+
+    # Csak az időbélyeg változik: a hash alapján nincs újraelemzés
+    os.utime(flags_dir / "hu_Hungary.png", ns=(0, 0))
+    assert analyze(data_dir) == first
+    assert calls == []
+
+    # Más tartalom ugyanazon a néven: csak ez a zászló elemződik újra
+    shutil.copyfile(flag_file('ro'), flags_dir / "td_Chad.png")
+    (flags_dir / "se_Sweden.png").unlink()
+    second = analyze(data_dir)
+    assert calls == ["td_Chad.png"]
+    assert 'se' not in second
+    assert second['td']['dominant_colors'] == second['ro']['dominant_colors']
+    assert {code: second[code] for code in second if code != 'td'} == \
+        {code: first[code] for code in first if code not in ('td', 'se')}
+
+
+def test_palette_engine_agrees_with_kmeans():
+    """A paletta-kvantálás ugyanazokat a színneveket adja, mint a K-means, közel azonos arányokkal"""
+    analyzer = FlagAnalyzer(DATA_DIR, cache_bytes=0)
+    # Nepál: a bíbor szegély pontos színnévként (crimson) jön át a palettán
+    for country_code in [code for code in SAMPLE_CODES if code != 'np']:
+        ctx = FlagContext.from_path(flag_file(country_code))
+        kmeans = analyzer.extract_dominant_colors(ctx, engine='kmeans')
+        palette = analyzer.extract_dominant_colors(ctx, engine='palette')
+
+        assert sorted(color['name'] for color in palette) == sorted(color['name'] for color in kmeans), country_code
+        assert [color['percentage'] for color in palette] == \
+            pytest.approx([color['percentage'] for color in kmeans], abs=1.0), country_code
+
+
+def test_weighted_kmeans_picks_the_best_start():
+    """A többkezdéses Lloyd a legkisebb hibájú kezdést választja, determinisztikusan"""
+    rng = np.random.default_rng(0)
+    centers = np.array([[200.0, 20.0, 30.0], [20.0, 40.0, 180.0], [240.0, 240.0, 240.0]])
+    points = np.concatenate([center + rng.normal(0, 4, (40, 3)) for center in centers])
+    weights = rng.integers(1, 50, len(points)).astype(np.float64)
+
+    # Rossz kezdés (helyi minimum): két középpont az első klaszterben, egy a másik kettő között
+    bad = np.array([centers[0] - 5, centers[0] + 5, centers[1:].mean(axis=0)])
+    starts = [bad] + [FlagAnalyzer.farthest_point_seeds(points, weights, first, 3) for first in range(4)]
+    labels, inertia = FlagAnalyzer.weighted_kmeans(points, weights, np.stack(starts))
+
+    best = labels[int(np.argmin(inertia))]
+    assert [len(set(best[i:i + 40])) for i in (0, 40, 80)] == [1, 1, 1]
+    assert len(set(best)) == 3
+    assert inertia[0] > inertia.min()
+
+    again, _ = FlagAnalyzer.weighted_kmeans(points, weights, np.stack(starts))
+    assert np.array_equal(again, labels)
+
+
+def band_colors(bands):
+    """Egy tengely sávszínei sorrendben"""
+    return [segment['color'] for segment in bands['segments']]
+
+
+def test_bands_on_known_flags():
+    """Ismert zászlók sávjai: irány, szám, színsorrend és arányok"""
+    analyzer = FlagAnalyzer(DATA_DIR, cache_bytes=0)
+
+    def stripes(country_code):
+        return analyzer.detect_stripes(FlagContext.from_path(flag_file(country_code)))
+
+    france = stripes('fr')
+    assert france['has_vertical_bands'] and not france['has_horizontal_bands']
+    assert band_colors(france['bands']['vertical']) == ['blue', 'white', 'red']
+    assert france['bands']['vertical']['equal_width']
+
+    germany = stripes('de')
+    assert germany['has_horizontal_bands'] and not germany['has_vertical_bands']
+    assert band_colors(germany['bands']['horizontal']) == ['black', 'red', 'yellow']
+
+    hungary = stripes('hu')['bands']['horizontal']
+    assert band_colors(hungary) == ['red', 'white', 'darkgreen']
+
+    # Nem egyenlő sávok: Kolumbia sárga sávja a zászló fele
+    colombia = stripes('co')['bands']['horizontal']
+    assert band_colors(colombia) == ['yellow', 'blue', 'red']
+    assert not colombia['equal_width']
+    assert [segment['share'] for segment in colombia['segments']] == pytest.approx([0.5, 0.25, 0.25], abs=0.01)
+
+    # Sok keskeny csík: USA 13 váltakozó csíkja
+    usa = stripes('us')
+    assert usa['has_horizontal_stripes'] and usa['horizontal_stripe_count'] == 13
+    assert band_colors(usa['bands']['horizontal']) == ['red', 'white'] * 6 + ['red']
+
+
+def test_band_boundaries_on_synthetic_flag():
+    """Szintetikus sávos kép: a sávhatárok az eredeti pixelekben, pontosan"""
+    image = np.zeros((300, 600, 3), dtype=np.uint8)
+    image[:60] = (255, 0, 0)
+    image[60:240] = (255, 255, 255)
+    image[240:] = (0, 0, 255)
+
+    bands = FlagAnalyzer(DATA_DIR, cache_bytes=0).segment_bands(FlagContext.from_array(image))
+    horizontal = bands['horizontal']
+    assert [(segment['start'], segment['width']) for segment in horizontal['segments']] == \
+        [(0, 60), (60, 180), (240, 60)]
+    assert band_colors(horizontal) == ['red', 'white', 'blue']
+    assert horizontal['purity'] == 1.0
+    assert bands['vertical']['count'] == 0
+
+
+def crash_after(monkeypatch, n_flags):
+    """Az ellenőrzőpont n_flags zászló kiírása után megszakítja a futást"""
+    original = FeatureCheckpoint.append
+    written = []
+
+    def append(self, country_code, *args):
+        if len(written) == n_flags:
+            raise KeyboardInterrupt
+        original(self, country_code, *args)
+        written.append(country_code)
+
+    monkeypatch.setattr(FeatureCheckpoint, 'append', append)
+    return written
+
+
+def test_checkpoint_resume_after_crash(data_dir, monkeypatch):
+    """Megszakadt futás után csak a hiányzó zászlók elemződnek, az eredmény azonos"""
+    analyzer = FlagAnalyzer(data_dir, cache_bytes=0)
+    with monkeypatch.context() as patch:
+        written = crash_after(patch, 5)
+        with pytest.raises(KeyboardInterrupt):
+            analyzer.analyze_all_flags()
+    assert analyzer.checkpoint_file.exists()
+
+    # Összeomláskor félbemaradt utolsó sor: kihagyódik
+    with open(analyzer.checkpoint_file, 'ab') as f:
+        f.write(b'{"country_code": "zz", "manif')
+
+    calls = count_analyses(monkeypatch)
+    resumed = analyze(data_dir)
+    assert sorted(calls) == sorted(flag_file(code).name for code in SAMPLE_CODES if code not in written)
+    assert not analyzer.checkpoint_file.exists()
+
+    assert analyze(data_dir, force=True) == resumed
+
+
+def test_interrupted_forced_run_resumes_as_forced(data_dir, monkeypatch):
+    """Megszakadt force futás: a folytatás (force-szal vagy anélkül) a maradékot is újraelemzi"""
+    analyze(data_dir)
+    analyzer = FlagAnalyzer(data_dir, cache_bytes=0)
+
+    for force in (False, True):
+        with monkeypatch.context() as patch:
+            written = crash_after(patch, 4)
+            with pytest.raises(KeyboardInterrupt):
+                analyzer.analyze_all_flags(force=True)
+
+        with monkeypatch.context() as patch:
+            calls = count_analyses(patch)
+            analyze(data_dir, force=force)
+        assert sorted(calls) == sorted(flag_file(code).name for code in SAMPLE_CODES if code not in written)
+        assert not analyzer.checkpoint_file.exists()
+
+
+def test_stage_selective_recompute(data_dir, monkeypatch):
+    """Kinyerőverzió emelése vagy --stages: csak a csoport és függői számolódnak újra, a rekord többi része marad"""
+    analyzer = FlagAnalyzer(data_dir, cache_bytes=0)
+    assert analyzer.groups_with_dependents(['shapes']) == ['shapes', 'complexity_score', 'embedding']
+    assert analyzer.groups_with_dependents(['symbolic']) == ['symbolic', 'complexity_score']
+    with pytest.raises(ValueError):
+        analyzer.analyze_all_flags(stages=['nincs_ilyen'])
+
+    first = analyze(data_dir)
+
+    # Megjelölt mező egy változatlan csoportban: a részleges újraszámolás nem írhatja felül
+    marked = {code: dict(features, layout=dict(features['layout'], marker=True)) for code, features in first.items()}
+    write_features(data_dir, marked.items())
+
+    calls = count_analyses(monkeypatch)
+    refreshed = []
+    original = FlagAnalyzer.refresh_features
+
+    def refresh(self, image_path, features, groups):
+        refreshed.append((Path(image_path).name, tuple(groups)))
+        return original(self, image_path, features, groups)
+
+    monkeypatch.setattr(FlagAnalyzer, 'refresh_features', refresh)
+    monkeypatch.setitem(FlagAnalyzer.FEATURE_GROUPS, 'shapes', ('2', ('stripes',)))
+
+    second = analyze(data_dir)
+    assert calls == []
+    assert sorted(refreshed) == sorted((flag_file(code).name, ('shapes', 'complexity_score', 'embedding'))
+                                       for code in SAMPLE_CODES)
+    assert second == marked
+    assert all(entry['extractors']['shapes'] == '2'
+               for entry in FlagAnalyzer(data_dir).load_manifest()['flags'].values())
+
+    # Már friss verziók: nincs teendő; kért csoport: csak az és a függői
+    refreshed.clear()
+    analyze(data_dir)
+    assert refreshed == []
+    analyze(data_dir, stages=['symbolic'])
+    assert {groups for _, groups in refreshed} == {('symbolic', 'complexity_score')}
+    assert calls == []
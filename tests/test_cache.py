@@ -0,0 +1,79 @@
+"""
+Gyorsítótár tesztek - Tartalomcímzett kulcsok, LRU kilakoltatás és méretkorlát több írónál
+"""
+
+import os
+
+import numpy as np
+
+from src.cache import AnalysisCache, image_digest
+
+
+def entry(index: int) -> dict:
+    """Kb. 1 kB-os bejegyzés"""
+    return {'index': index, 'payload': 'x' * 1000}
+
+
+def age(cache: AnalysisCache, key: str, seconds: int):
+    """Bejegyzés utolsó használati idejének beállítása (determinisztikus LRU sorrend)"""
+    os.utime(cache.path(key), (seconds, seconds))
+
+
+def test_put_get_and_corrupt_entry(tmp_path):
+    """Mentés és visszaolvasás, találat/hiány számlálás; a sérült bejegyzés hiánynak számít"""
+    cache = AnalysisCache(tmp_path)
+    key = AnalysisCache.key('digest', '1.7', 'params')
+    assert cache.get(key) is None
+    cache.put(key, {'a': [1, 2]})
+    assert cache.get(key) == {'a': [1, 2]}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Más verzió vagy paraméter más kulcs
+    assert AnalysisCache.key('digest', '1.8', 'params') != key
+    assert AnalysisCache.key('digest', '1.7', 'other') != key
+
+    cache.path(key).write_text('{"a": [1,', encoding='utf-8')
+    assert cache.get(key) is None
+
+
+def test_image_digest_is_content_addressed():
+    """A kulcs a pixelekből és a méretből jön, nem a tömb példányából"""
+    image = np.zeros((4, 6, 3), dtype=np.uint8)
+    assert image_digest(image) == image_digest(image.copy())
+    assert image_digest(image) != image_digest(image.reshape(6, 4, 3))
+    changed = image.copy()
+    changed[0, 0, 0] = 1
+    assert image_digest(image) != image_digest(changed)
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    """Korlát túllépésekor a legrégebben használt bejegyzések törlődnek, a frissen olvasott marad"""
+    cache = AnalysisCache(tmp_path, max_bytes=10_000)
+    keys = [AnalysisCache.key(str(index), '1', 'p') for index in range(9)]
+    for index, key in enumerate(keys):
+        cache.put(key, entry(index))
+        age(cache, key, 1_000 + index)
+
+    # A legrégebbi bejegyzés olvasása frissíti a használati idejét
+    assert cache.get(keys[0])['index'] == 0
+
+    for index in range(9, 12):
+        key = AnalysisCache.key(str(index), '1', 'p')
+        cache.put(key, entry(index))
+        keys.append(key)
+
+    assert cache.disk_usage() <= cache.max_bytes
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[-1]) is not None
+
+
+def test_concurrent_writers_stay_under_limit(tmp_path):
+    """Két, egymás írásait nem látó író együtt sem lépi túl a korlátot"""
+    writers = [AnalysisCache(tmp_path, max_bytes=20_000, writers=2) for _ in range(2)]
+    for index in range(60):
+        writers[index % 2].put(AnalysisCache.key(str(index), '1', 'p'), entry(index))
+        assert writers[0].disk_usage() <= 20_000
+
+    writers[0].clear()
+    assert writers[0].disk_usage() == 0
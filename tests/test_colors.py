@@ -0,0 +1,106 @@
+"""
+Színelnevezés tesztek - A keresőtábla az eredeti get_color_name szabályait adja vissza
+"""
+
+import json
+from itertools import product
+
+import numpy as np
+import webcolors
+
+from src.analyzer import FlagAnalyzer
+from src.colors import exact_color_names
+
+from conftest import DATA_DIR
+
+
+def baseline_color_name(categories, rgb_color):
+    """Az eredeti, tábla nélküli get_color_name (összehasonlítási alap)"""
+    try:
+        return webcolors.rgb_to_name(rgb_color)
+    except ValueError:
+        min_distance = float('inf')
+        closest_category = 'unknown'
+        for category, category_colors in categories.items():
+            for cat_color in category_colors:
+                distance = sum((a - b) ** 2 for a, b in zip(rgb_color, cat_color))
+                if distance < min_distance:
+                    min_distance = distance
+                    closest_category = category
+
+        r, g, b = rgb_color
+        if max(r, g, b) < 40:
+            return 'black'
+        if b > r and b > g:
+            if b > 180 and (r + g) < 200:
+                if r > 100 or g > 100:
+                    return 'lightblue'
+                else:
+                    return 'darkblue'
+            elif b > 120:
+                return 'blue'
+        if g > r and g > b:
+            if g > 180 and (r + b) < 200:
+                if r > 100 or b > 100:
+                    return 'lightgreen'
+                else:
+                    return 'darkgreen'
+
+        if closest_category == 'black' and max(r, g, b) >= 40:
+            second_min_distance = float('inf')
+            second_category = 'unknown'
+            for category, category_colors in categories.items():
+                if category == 'black':
+                    continue
+                for cat_color in category_colors:
+                    distance = sum((a - b) ** 2 for a, b in zip(rgb_color, cat_color))
+                    if distance < second_min_distance:
+                        second_min_distance = distance
+                        second_category = category
+            return second_category
+
+        return closest_category
+
+
+def sample_colors():
+    """Véletlen színek, a kategóriaszínek környéke és a szabályok küszöbértékei"""
+    rng = np.random.default_rng(0)
+    colors = [tuple(int(c) for c in rgb) for rgb in rng.integers(0, 256, (6000, 3))]
+
+    categories = FlagAnalyzer(DATA_DIR, cache_bytes=0).color_categories
+    for category_colors in categories.values():
+        for rgb in category_colors:
+            for offset in product((-9, 0, 9), repeat=3):
+                colors.append(tuple(int(np.clip(c + d, 0, 255)) for c, d in zip(rgb, offset)))
+
+    thresholds = (0, 39, 40, 41, 99, 100, 101, 119, 120, 121, 179, 180, 181, 199, 200, 255)
+    colors.extend(product(thresholds, repeat=3))
+    return colors
+
+
+def test_lut_matches_baseline_names(tmp_path):
+    """Minden mintaszín neve egyezik az eredeti szabályokéval, egyenként és tömbben is"""
+    analyzer = FlagAnalyzer(tmp_path, cache_bytes=0)
+    categories = analyzer.color_categories
+    colors = sample_colors()
+
+    expected = [baseline_color_name(categories, rgb) for rgb in colors]
+    assert [analyzer.get_color_name(rgb) for rgb in colors] == expected
+
+    # Tömbös keresés: a pontos CSS3 neveket a get_color_name a tábla előtt nézi
+    exact = exact_color_names()
+    labels = analyzer.color_lut.lookup(np.array(colors))
+    table_names = [analyzer.color_lut.names[label] for label in labels]
+    assert [name for rgb, name in zip(colors, table_names) if rgb not in exact] == \
+        [name for rgb, name in zip(colors, expected) if rgb not in exact]
+
+
+def test_shipped_features_use_baseline_names():
+    """A tárolóban lévő jellemzők domináns színneve az eredeti szabályokét követi"""
+    categories = FlagAnalyzer(DATA_DIR, cache_bytes=0).color_categories
+    with open(DATA_DIR / "flag_features.json", 'r', encoding='utf-8') as f:
+        features = json.load(f)
+
+    for country_code, record in features.items():
+        for color in record['dominant_colors']:
+            assert color['name'] == baseline_color_name(categories, tuple(color['rgb'])), country_code
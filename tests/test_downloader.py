@@ -0,0 +1,168 @@
+"""
+Letöltő tesztek - Újrapróbálkozás, AIMD párhuzamosság és feltételes újraletöltés egy hamis forrással
+"""
+
+import asyncio
+from email.utils import formatdate
+from typing import Dict
+
+from src.downloader import AdaptiveConcurrency, FlagDownloader, RetryPolicy
+from src.sources import not_modified
+
+from conftest import FakeSource, download
+
+
+def make_codes(count: int) -> Dict[str, str]:
+    return {f"c{index:03d}": f"Country {index}" for index in range(count)}
+
+
+def fast_retries(retries: int = 3) -> RetryPolicy:
+    return RetryPolicy(retries=retries, base_delay=0.001, max_delay=0.002, seed=0)
+
+
+def test_retry_policy_delays():
+    """Exponenciális, szórt, felülről korlátos várakozás; a Retry-After az irányadó"""
+    policy = RetryPolicy(base_delay=0.5, max_delay=4.0, seed=1)
+    for attempt, cap in enumerate([0.5, 1.0, 2.0, 4.0, 4.0]):
+        assert cap / 2 <= policy.delay(attempt) <= cap
+    assert policy.delay(0, {'retry-after': '3'}) == 3.0
+    assert policy.delay(0, {'Retry-After': '120'}) == 4.0
+    assert RetryPolicy(seed=7).delay(2) == RetryPolicy(seed=7).delay(2)
+
+
+def test_transient_errors_are_retried(tmp_path):
+    """Átmeneti hibák (5xx, 429) újrapróbálódnak, a végleges (404) és a kimerült nem"""
+    codes = make_codes(6)
+    source = FakeSource(codes, failures={'c000': [503, 502], 'c001': [429]}, broken={'c002'})
+    del source.content['c003']
+    downloader = FlagDownloader(tmp_path, source=source, retry_policy=fast_retries(3))
+
+    results = download(downloader, max_concurrent=3)
+    assert results == {'c000': True, 'c001': True, 'c002': False, 'c003': False, 'c004': True, 'c005': True}
+
+    attempts = {code: sum(1 for request in source.requests if request[0] == code) for code in codes}
+    assert attempts == {'c000': 3, 'c001': 2, 'c002': 4, 'c003': 1, 'c004': 1, 'c005': 1}
+    assert downloader.stats.retries == 2 + 1 + 3
+    assert downloader.flag_path('c000', codes['c000']).read_bytes() == b'png:c000:1'
+    assert not downloader.flag_path('c003', codes['c003']).exists()
+
+
+def test_adaptive_concurrency_backs_off_when_throttled(tmp_path):
+    """Túlterhelt szerveren (429 a kapacitás felett) a limit visszaesik, és minden zászló letöltődik"""
+    source = FakeSource(make_codes(120), capacity=6, latency=0.002)
+    downloader = FlagDownloader(tmp_path, source=source, retry_policy=fast_retries(8))
+
+    results = download(downloader, max_concurrent=32)
+    assert all(results.values()) and len(results) == 120
+
+    limiter = downloader.concurrency
+    assert limiter.decreases >= 1
+    assert limiter.limit < 32
+    assert source.max_in_flight <= 32
+
+
+def test_aimd_slow_start_and_single_halving_per_window():
+    """Lassú indítás körönként duplázva; egy ablak több torlódási jele csak egy felezést okoz"""
+
+    async def scenario():
+        limiter = AdaptiveConcurrency(maximum=64)
+        assert limiter.limit == 4
+
+        async def succeed(count):
+            tickets = [await limiter.acquire() for _ in range(count)]
+            for ticket in tickets:
+                await limiter.release(ticket, latency=0.01)
+
+        await succeed(4)
+        assert limiter.limit == 8
+        await succeed(8)
+        assert limiter.limit == 16
+
+        # Egyszerre futó kérések mind 429-et kapnak: egyetlen felezés
+        tickets = [await limiter.acquire() for _ in range(10)]
+        for ticket in tickets:
+            await limiter.release(ticket, throttled=True)
+        assert (limiter.limit, limiter.decreases) == (8, 1)
+        assert not limiter.slow_start
+
+        # Torlódás után lineáris növekedés: limitnyi siker után +1
+        await succeed(8)
+        assert limiter.limit == 9
+
+    asyncio.run(scenario())
+
+
+def test_fixed_concurrency_is_respected(tmp_path):
+    """adaptive=False: a limit rögzített, az egyidejű kérések száma nem lépi túl"""
+    source = FakeSource(make_codes(40), latency=0.002)
+    downloader = FlagDownloader(tmp_path, source=source)
+
+    assert all(download(downloader, max_concurrent=5, adaptive=False).values())
+    assert downloader.concurrency.limit == 5
+    assert source.max_in_flight <= 5
+
+
+def test_conditional_request_evaluation():
+    """If-None-Match elsőbbsége, '*' és több ETag; If-Modified-Since csak nélküle"""
+    validators = {'ETag': '"a-1"', 'Last-Modified': formatdate(1_700_000_000, usegmt=True)}
+    assert not_modified(validators, {'If-None-Match': '"x", "a-1"'})
+    assert not_modified(validators, {'if-none-match': '*'})
+    assert not not_modified(validators, {'If-None-Match': '"a-0"',
+                                         'If-Modified-Since': formatdate(1_800_000_000, usegmt=True)})
+    assert not_modified(validators, {'If-Modified-Since': formatdate(1_700_000_000, usegmt=True)})
+    assert not not_modified(validators, {'If-Modified-Since': formatdate(1_600_000_000, usegmt=True)})
+    assert not not_modified(validators, {})
+
+
+def test_refresh_revalidates_with_etags(tmp_path):
+    """Frissítéskor feltételes kérés: változatlan zászló 304, csak a megváltozott íródik újra"""
+    codes = make_codes(5)
+    source = FakeSource(codes)
+    downloader = FlagDownloader(tmp_path, source=source)
+    assert all(download(downloader).values())
+
+    entry = downloader.manifest.get('w320/c000')
+    assert entry['etag'] == '"c000-1"' and entry['size'] == len(b'png:c000:1')
+    paths = {code: downloader.flag_path(code, name) for code, name in codes.items()}
+    mtimes = {code: path.stat().st_mtime_ns for code, path in paths.items()}
+
+    # Új futás, a mentett manifestből: minden kérés feltételes, minden válasz 304
+    source.requests.clear()
+    saved = []
+    downloader = FlagDownloader(tmp_path, source=source)
+    assert all(download(downloader, refresh=True, on_flag=lambda path, content: saved.append(path.name)).values())
+    assert all(request[2].get('If-None-Match') == f'"{request[0]}-1"' for request in source.requests)
+    assert downloader.stats.not_modified == 5 and downloader.stats.updated == 0
+    assert saved == []
+    assert {code: path.stat().st_mtime_ns for code, path in paths.items()} == mtimes
+
+    # Egy zászló megváltozik a forrásban: csak az íródik felül és kerül elemzésre
+    source.update('c002')
+    assert all(download(downloader, refresh=True, on_flag=lambda path, content: saved.append(path.name)).values())
+    assert downloader.stats.updated == 1 and downloader.stats.not_modified == 4
+    assert saved == [paths['c002'].name]
+    assert paths['c002'].read_bytes() == b'png:c002:2'
+    assert downloader.manifest.get('w320/c002')['etag'] == '"c002-2"'
+
+
+def test_refresh_without_server_validators_keeps_identical_files(tmp_path):
+    """Validátorokat figyelmen kívül hagyó szerver: azonos tartalom nem íródik újra; sérült fájl javul"""
+    codes = make_codes(3)
+    source = FakeSource(codes)
+    downloader = FlagDownloader(tmp_path, source=source)
+    download(downloader)
+    paths = {code: downloader.flag_path(code, name) for code, name in codes.items()}
+    mtime = paths['c000'].stat().st_mtime_ns
+
+    # Csonka helyi fájl: a manifest mérete nem egyezik, feltétel nélküli kérés
+    paths['c001'].write_bytes(b'png')
+    source.ignore_validators = True
+    source.requests.clear()
+    saved = []
+    assert all(download(downloader, refresh=True, on_flag=lambda path, content: saved.append(path.name)).values())
+
+    assert paths['c000'].stat().st_mtime_ns == mtime
+    assert paths['c001'].read_bytes() == b'png:c001:1'
+    assert saved == [paths['c001'].name]
+    assert [request[2] for request in source.requests if request[0] == 'c001'] == [{}]
+    assert downloader.stats.not_modified == 2 and downloader.stats.updated == 1
@@ -0,0 +1,52 @@
+"""
+Futószalag tesztek - Letöltés közbeni elemzés a memóriában lévő bájtokból
+"""
+
+from src.analyzer import FlagAnalyzer
+from src.downloader import FlagDownloader
+from src.pipeline import AnalysisPipeline
+
+from conftest import SAMPLE_CODES, count_analyses, download, flag_file, flag_source
+
+
+def streamed_setup(data_dir, source, workers=2, **kwargs):
+    """Letöltés futószalagos elemzéssel, majd a befejező analyze_all_flags (mint a main.py setup-ja)"""
+    analyzer = FlagAnalyzer(data_dir, cache_bytes=0)
+    pipeline = AnalysisPipeline(analyzer, workers=workers)
+    with pipeline:
+        results = download(FlagDownloader(data_dir, source=source), on_flag=pipeline.submit, **kwargs)
+    assert all(results.values())
+    return pipeline
+
+
+def test_streamed_analysis_matches_download_then_analyze(tmp_path, monkeypatch):
+    """A letöltés közben elemzett zászlókat a befejező lépés átveszi, az eredmény a külön elemzésével azonos"""
+    pipeline = streamed_setup(tmp_path, flag_source())
+    assert (pipeline.submitted, pipeline.completed, pipeline.failed) == (len(SAMPLE_CODES), len(SAMPLE_CODES), 0)
+
+    calls = count_analyses(monkeypatch)
+    streamed = dict(FlagAnalyzer(tmp_path, cache_bytes=0).analyze_all_flags(keep_checkpoint=True))
+    assert calls == []
+    assert list(streamed) == sorted(SAMPLE_CODES)
+
+    reference = dict(FlagAnalyzer(tmp_path, cache_bytes=0).analyze_all_flags(force=True))
+    assert sorted(calls) == sorted(flag_file(code).name for code in SAMPLE_CODES)
+    assert streamed == reference
+
+
+def test_refresh_streams_only_changed_flags(tmp_path, monkeypatch):
+    """Frissítéskor csak a forrásban megváltozott zászló kerül a futószalagra"""
+    source = flag_source()
+    streamed_setup(tmp_path, source)
+    first = dict(FlagAnalyzer(tmp_path, cache_bytes=0).analyze_all_flags(keep_checkpoint=True))
+
+    source.update('hu', flag_file('ro').read_bytes())
+    pipeline = streamed_setup(tmp_path, source, refresh=True)
+    assert (pipeline.submitted, pipeline.completed) == (1, 1)
+
+    calls = count_analyses(monkeypatch)
+    second = dict(FlagAnalyzer(tmp_path, cache_bytes=0).analyze_all_flags(keep_checkpoint=True))
+    assert calls == []
+    assert second['hu']['dominant_colors'] == first['ro']['dominant_colors']
+    assert {code: second[code] for code in second if code != 'hu'} == \
+        {code: first[code] for code in first if code != 'hu'}
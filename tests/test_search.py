@@ -0,0 +1,101 @@
+"""
+Kereső tesztek - Hasonló zászlók, képből azonosítás és fényképes felismerés ismert zászlókon
+"""
+
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from src.analyzer import FlagAnalyzer
+from src.search import FlagSearchEngine
+
+from conftest import DATA_DIR, SAMPLE_CODES, copy_flags, flag_file
+
+# Címeres, mintás zászlók: elég kulcspontjuk van a fényképes felismeréshez
+TEXTURED_CODES = ['bt', 'br', 'ca', 'es', 'lk', 'mx', 'pt']
+
+# Ugyanaz a zászló két területhez: az azonosítás bármelyiket adhatja első helyen
+SAME_FLAG = {'fr': {'fr', 'mf'}, 'us': {'us', 'um'}}
+
+
+@pytest.fixture(scope="module")
+def search_dir(tmp_path_factory):
+    """Adatkönyvtár a tárolóban lévő jellemzőkkel és a mintakészlet zászlóival"""
+    data_dir = tmp_path_factory.mktemp("search")
+    for name in ("countries.json", "flag_features.json"):
+        shutil.copy2(DATA_DIR / name, data_dir)
+    copy_flags(data_dir, SAMPLE_CODES + TEXTURED_CODES)
+    return data_dir
+
+
+@pytest.fixture(scope="module")
+def engine(search_dir):
+    return FlagSearchEngine(search_dir)
+
+
+def test_find_similar_on_known_flags(engine):
+    """Csád és Románia szinte azonos; a keresés névvel is működik, önmagát nem adja vissza"""
+    similar = engine.find_similar('td', 5)
+    assert len(similar) == 5
+    assert similar[0][0] == 'ro' and similar[0][1] > 0.99
+    assert 'td' not in [code for code, _ in similar]
+    assert [score for _, score in similar] == sorted((score for _, score in similar), reverse=True)
+
+    assert engine.find_similar('ro', 1)[0][0] == 'td'
+    assert engine.find_similar('id', 1)[0][0] == 'mc'
+    assert engine.find_similar('ie', 1)[0][0] == 'ci'
+    assert engine.find_similar('Csád', 5) == similar
+    assert engine.find_similar('nincs ilyen ország', 5) == []
+
+
+def jpeg(image: np.ndarray, quality: int = 80) -> bytes:
+    """Kép JPEG bájtokként (veszteséges újrakódolás, mint egy letöltött vagy feltöltött képnél)"""
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return encoded.tobytes()
+
+
+def test_identify_known_flags_from_upload(engine, tmp_path):
+    """A zászló PNG-je és egy háromszorosra nagyított JPEG változata is önmagát találja meg"""
+    analyzer = FlagAnalyzer(tmp_path, cache_bytes=0)
+    for country_code in SAMPLE_CODES:
+        expected = SAME_FLAG.get(country_code, {country_code})
+
+        exact = engine.identify(analyzer.query_signature(flag_file(country_code).read_bytes()), 3)
+        assert exact[0][0] in expected and exact[0][1] == 0.0, country_code
+
+        image = cv2.imread(str(flag_file(country_code)))
+        enlarged = cv2.resize(image, (image.shape[1] * 3, image.shape[0] * 3), interpolation=cv2.INTER_LINEAR)
+        code, distance = engine.identify(analyzer.query_signature(jpeg(enlarged)), 3)[0]
+        assert code in expected and distance < 0.01, country_code
+
+    with pytest.raises(ValueError):
+        analyzer.query_signature(b'nem kep')
+
+
+def photo(country_code: str) -> bytes:
+    """Fényképszerű kép: perspektívában torzított, forgatott, sötétebb zászló háttér előtt, JPEG-ben"""
+    image = cv2.imread(str(flag_file(country_code)))
+    height, width = image.shape[:2]
+    canvas = np.full((height * 3, width * 3, 3), (90, 120, 100), dtype=np.uint8)
+    corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    placed = np.float32([[0.7, 0.8], [2.3, 0.6], [2.2, 2.3], [0.8, 2.1]]) * np.float32([width, height])
+    warped = cv2.warpPerspective(image, cv2.getPerspectiveTransform(corners, placed), canvas.shape[1::-1],
+                                 dst=canvas, borderMode=cv2.BORDER_TRANSPARENT)
+    return jpeg(cv2.convertScaleAbs(warped, alpha=0.8, beta=10), quality=85)
+
+
+def test_recognize_photo_of_textured_flags(engine):
+    """Mintás zászló torzított fényképe geometriailag igazolt első találat"""
+    for country_code in TEXTURED_CODES:
+        matches = engine.recognize_photo(photo(country_code), 3)
+        assert matches and matches[0][0] == country_code, (country_code, matches)
+        assert matches[0][1] >= 20
+
+
+def test_recognize_photo_without_keypoints_finds_nothing(engine):
+    """Egyszínű sávos zászlón nincs igazolható egyezés: üres lista (nem téves találat)"""
+    for country_code in ['de', 'fr', 'hu', 'it', 'ro', 'td']:
+        assert engine.recognize_photo(photo(country_code), 3) == [], country_code
@@ -0,0 +1,82 @@
+"""
+Méretkezelő tesztek - Méretjelölések, forrásválasztás, helyi méretelőállítás és méretfüggő útvonalak
+"""
+
+from pathlib import Path
+
+import cv2
+import pytest
+
+from src.downloader import FlagDownloader
+from src.sizes import SizeResolver, parse_size, pick_source, target_shape
+
+from conftest import download, flag_file, flag_source
+
+CODES = ['ch', 'hu', 'np', 'us']
+
+
+def test_parse_size_and_target_shape():
+    """Szélesség és magasság szerinti jelölések, arányos célméret; hibás jelölés ValueError"""
+    assert parse_size('w160') == ('w', 160)
+    assert parse_size('h40') == ('h', 40)
+    for size in ('160', 'x40', 'w', 'w0', 'w-5', 'wide'):
+        with pytest.raises(ValueError):
+            parse_size(size)
+
+    assert target_shape('w40', 160, 320) == (20, 40)
+    assert target_shape('w40', 390, 320) == (49, 40)
+    assert target_shape('h40', 160, 320) == (40, 80)
+
+
+def test_pick_source_prefers_the_cheapest_adequate_width():
+    """A legkisebb elég széles kép; magasság szerint a legnagyobb; nagyítás nincs"""
+    available = [('w1280', Path('w1280.png')), ('w320', Path('w320.png')), ('h80', Path('h80.png'))]
+    assert pick_source(available, 'w160') == Path('w320.png')
+    assert pick_source(available, 'w320') == Path('w320.png')
+    assert pick_source(available, 'w640') == Path('w1280.png')
+    assert pick_source(available, 'w2560') is None
+    assert pick_source(available, 'h40') == Path('w1280.png')
+    assert pick_source([('h80', Path('h80.png'))], 'w40') is None
+
+
+def test_derived_sizes_and_resolver(tmp_path):
+    """A hiányzó méretek kicsinyítéssel készülnek (csak a frissültek újra), a SizeResolver a legolcsóbbat adja"""
+    source = flag_source(CODES)
+    downloader = FlagDownloader(tmp_path, source=source)
+    results = download(downloader, derive_sizes=('w40', 'w160'))
+    assert all(results.values())
+    assert sorted(key for key in results if '/' in key) == \
+        sorted(f"{size}/{code}" for size in ('w40', 'w160') for code in CODES)
+    assert {request[1] for request in source.requests} == {'w320'}
+
+    names = source.codes
+    for code in CODES:
+        original = cv2.imread(str(flag_file(code)), cv2.IMREAD_UNCHANGED)
+        for size in ('w40', 'w160'):
+            image = cv2.imread(str(downloader.flag_path(code, names[code], size)), cv2.IMREAD_UNCHANGED)
+            assert image.shape[:2] == target_shape(size, *original.shape[:2]), (code, size)
+            assert image.shape[2:] == original.shape[2:], (code, size)
+
+    # Újrafuttatás: semmi sem készül újra; frissült zászló: csak az ő méretei
+    derived = {code: downloader.flag_path(code, names[code], 'w40').stat().st_mtime_ns for code in CODES}
+    assert [key for key in download(downloader, derive_sizes=('w40', 'w160')) if '/' in key] == []
+    source.update('hu', flag_file('ro').read_bytes())
+    results = download(downloader, derive_sizes=('w40', 'w160'), refresh=True)
+    assert sorted(key for key in results if '/' in key) == ['w160/hu', 'w40/hu']
+    assert {code: downloader.flag_path(code, names[code], 'w40').stat().st_mtime_ns
+            for code in CODES if code != 'hu'} == {code: derived[code] for code in CODES if code != 'hu'}
+
+    resolver = SizeResolver(downloader.flags_dir)
+    assert resolver.sizes('hu') == [40, 160, 320]
+    assert resolver.path('hu') == downloader.flag_path('hu', names['hu'], 'w40')
+    assert resolver.path('hu', 41) == downloader.flag_path('hu', names['hu'], 'w160')
+    assert resolver.path('hu', 200) == downloader.flag_path('hu', names['hu'])
+    assert resolver.path('hu', 1280) == downloader.flag_path('hu', names['hu'])
+    assert resolver.path('xx') is None
+
+    # Új méretkönyvtár csak refresh() után látszik
+    download(downloader, derive_sizes=('w80',))
+    assert resolver.sizes('hu') == [40, 160, 320]
+    resolver.refresh()
+    assert resolver.sizes('hu') == [40, 80, 160, 320]
+    assert resolver.path('hu', 60) == downloader.flag_path('hu', names['hu'], 'w80')
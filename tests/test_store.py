@@ -0,0 +1,89 @@
+"""
+Jellemzőtár tesztek - JSONL/JSON és oszlopos tár oda-vissza írása
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.store import (COLUMN_FIELDS, FEATURES_JSON, FEATURES_JSONL, FeatureColumns, FeatureReader,
+                       features_path, write_features)
+
+from conftest import DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def shipped_features():
+    """A tárolóban lévő jellemzők"""
+    with open(DATA_DIR / FEATURES_JSON, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def field(features, path):
+    """Pontozott útvonalú mező értéke (hiányzó mező: 0, mint az oszlopos tárban)"""
+    value = features
+    for key in path.split('.'):
+        value = value.get(key, 0) if isinstance(value, dict) else 0
+    return value or 0
+
+
+def test_jsonl_and_json_round_trip(tmp_path, shipped_features):
+    """A kiírt JSONL és JSON ugyanazt adja vissza, a JSON bájtra a szabványos json.dump kimenete"""
+    assert write_features(tmp_path, shipped_features.items()) == len(shipped_features)
+    assert features_path(tmp_path).name == FEATURES_JSONL
+
+    reader = FeatureReader(tmp_path / FEATURES_JSONL)
+    assert list(reader) == list(shipped_features)
+    assert dict(reader) == shipped_features
+    assert reader.get('xx') is None
+    with pytest.raises(KeyError):
+        reader['xx']
+
+    expected = json.dumps(shipped_features, ensure_ascii=False, indent=2)
+    assert (tmp_path / FEATURES_JSON).read_text(encoding='utf-8') == expected
+
+    # Újabb JSON (pl. frissebb változat érkezett): az nyer, amíg a JSONL újra nem íródik
+    stat = (tmp_path / FEATURES_JSONL).stat()
+    os.utime(tmp_path / FEATURES_JSON, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert features_path(tmp_path).name == FEATURES_JSON
+
+
+def test_columnar_store_round_trip(tmp_path, shipped_features):
+    """Az oszlopos tár minden mezője és a beágyazás egyezik a jellemzőkkel"""
+    write_features(tmp_path, shipped_features.items())
+    columns = FeatureColumns.load(tmp_path)
+    assert columns is not None
+    assert columns.codes == list(shipped_features)
+
+    records = list(shipped_features.values())
+    for path, dtype in COLUMN_FIELDS:
+        expected = np.array([field(record, path) for record in records], dtype=dtype)
+        if dtype == 'f4':
+            np.testing.assert_allclose(columns.column(path), expected, rtol=1e-6)
+        else:
+            np.testing.assert_array_equal(columns.column(path), expected, err_msg=path)
+
+    np.testing.assert_allclose(columns.embeddings(), np.array([record['embedding'] for record in records]),
+                               rtol=1e-6, atol=1e-7)
+
+    for color in columns.colors:
+        assert columns.select(columns.has_color(color)) == \
+            [code for code, record in shipped_features.items() if color in record['unique_colors']]
+
+
+def test_columnar_store_rebuilds_when_stale(tmp_path, shipped_features):
+    """Régebbi oszlopos tár nem töltődik be, a load_or_build újraépíti a friss jellemzőfájlból"""
+    write_features(tmp_path, shipped_features.items())
+
+    changed = dict(shipped_features)
+    changed['hu'] = dict(changed['hu'], color_count=9)
+    with open(tmp_path / FEATURES_JSON, 'w', encoding='utf-8') as f:
+        json.dump(changed, f)
+    stat = (tmp_path / FEATURES_JSONL).stat()
+    os.utime(tmp_path / FEATURES_JSON, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert FeatureColumns.load(tmp_path) is None
+    columns = FeatureColumns.load_or_build(tmp_path)
+    assert columns.column('color_count')[columns.codes.index('hu')] == 9